@@ -0,0 +1,4 @@
+"""Headless core of the topology drawer: model, files, import, layout, export and journal.
+
+Nothing here imports tkinter; topo.py is the UI and command-line entry point.
+"""
@@ -0,0 +1,253 @@
+"""Edge bundling: links merged into trunks between clusters, routed on a worker thread."""
+
+import threading
+from array import array
+
+from .model import NODE_RADIUS
+
+
+# ───────────────── Edge bundling (headless) ─────────────────
+#
+# Bundled links are not drawn one by one. The ends of links are clustered on
+# a grid of about BUNDLE_CELLS cells across the topology, and the cells again
+# into parents of BUNDLE_FANOUT x BUNDLE_FANOUT cells. All links between two
+# clusters share one trunk from centroid to centroid, bent toward the
+# centers of the two parents (when those differ) so that trunks between
+# neighboring clusters run together; each cluster adds one fan from its
+# centroid out to its nodes. A trunk's shape depends only on the centroids of
+# its two clusters, so when nodes move only the links touching them are routed
+# again and only the fans and trunks of the clusters they left or joined change.
+
+BUNDLE_CELLS = 16        # clusters across the longer side of the topology
+BUNDLE_FANOUT = 4        # clusters per parent, along each axis
+BUNDLE_BETA = 0.8        # pull of the parent centers on a trunk: 0 straight, 1 right through them
+BUNDLE_RESIZE = 2.0      # topology grew or shrank by more than this factor: cluster it again
+
+
+class EdgeBundles:
+    """Routing of links through trunks between grid clusters of their ends (see update).
+
+    Shapes are ("trunk", cluster, cluster) and ("fan", cluster), clusters
+    being grid cells (column, row); update() reports those that changed.
+    """
+
+    def __init__(self):
+        self.cell = None      # cluster size (world units); None: not chosen yet
+        self.span = 0.0       # longer side of the topology when cell was chosen
+        self.links = {}       # link_id -> (a, b), links routed so far
+        self.at = {}          # node_id -> {link_id}: routed links of the node (ends only)
+        self.pos = {}         # node_id -> (x, y) it was routed at
+        self.cluster = {}     # node_id -> cluster
+        self.members = {}     # cluster -> {node_id}
+        self.sums = {}        # cluster -> [sum of x, sum of y] of its members
+        self.trunks = {}      # (cluster, cluster), sorted -> links between them
+        self.trunks_at = {}   # cluster -> {trunk key}
+        self.drawn = set()    # shapes reported and not deleted since
+
+    def update(self, ids, xs, ys, links, hidden=frozenset()):
+        """Route the links of a snapshot ({link_id: (a, b)}; links touching hidden are left out).
+
+        Returns {shape: (world coords, links or nodes) or None} for every shape
+        that changed since the last call; None means the shape is gone.
+        """
+        if hidden:
+            links = {ln: ends for ln, ends in links.items() if ends[0] not in hidden and ends[1] not in hidden}
+        pos = dict(zip(ids, zip(xs, ys)))
+        span = max(max(xs) - min(xs), max(ys) - min(ys)) if ids else 0.0
+        out = {}
+        if self.cell is None or not self.span / BUNDLE_RESIZE <= span <= self.span * BUNDLE_RESIZE:
+            out = dict.fromkeys(self.drawn)  # clustered again from scratch: every shape drawn so far goes
+            self.__init__()
+            self.cell = max(span / BUNDLE_CELLS, 4 * NODE_RADIUS)
+            self.span = span
+
+        dirty = set()   # clusters whose members changed
+        counts = set()  # trunks whose link count changed (then also those whose ends moved)
+        for ln in self.links.keys() - links.keys():
+            self._unlink(ln, dirty, counts)
+        again = set()
+        for node, p in self.pos.items():
+            if pos.get(node) != p:
+                again.update(self.at[node])
+        for ln in again:
+            self._unlink(ln, dirty, counts)
+        for ln in links.keys() - self.links.keys():  # new links, and those of moved nodes
+            a, b = links[ln]
+            self._link(ln, a, b, pos, dirty, counts)
+
+        for cluster in dirty:
+            counts.update(self.trunks_at.get(cluster, ()))
+            self._report(out, ("fan", cluster), len(self.members.get(cluster, ())) > 1)
+        for key in counts:
+            self._report(out, ("trunk", *key), key in self.trunks)
+        return out
+
+    def _report(self, out, shape, exists):
+        if exists:
+            out[shape] = self._fan(shape[1]) if shape[0] == "fan" else self._trunk(shape[1], shape[2])
+            self.drawn.add(shape)
+        elif shape in self.drawn:
+            out[shape] = None
+            self.drawn.discard(shape)
+
+    def _link(self, link, a, b, pos, dirty, counts):
+        self.links[link] = (a, b)
+        if a == b:
+            return
+        ka = self._add_end(a, link, pos[a], dirty)
+        kb = self._add_end(b, link, pos[b], dirty)
+        if ka != kb:
+            key = (ka, kb) if ka < kb else (kb, ka)
+            if key not in self.trunks:
+                self.trunks[key] = 0
+                self.trunks_at.setdefault(ka, set()).add(key)
+                self.trunks_at.setdefault(kb, set()).add(key)
+            self.trunks[key] += 1
+            counts.add(key)
+
+    def _unlink(self, link, dirty, counts):
+        a, b = self.links.pop(link)
+        if a == b:
+            return
+        ka, kb = self.cluster[a], self.cluster[b]
+        if ka != kb:
+            key = (ka, kb) if ka < kb else (kb, ka)
+            self.trunks[key] -= 1
+            if not self.trunks[key]:
+                del self.trunks[key]
+                for cluster in key:
+                    self.trunks_at[cluster].discard(key)
+                    if not self.trunks_at[cluster]:
+                        del self.trunks_at[cluster]
+            counts.add(key)
+        self._remove_end(a, link, dirty)
+        self._remove_end(b, link, dirty)
+
+    def _add_end(self, node, link, p, dirty):
+        at = self.at.get(node)
+        if at is None:
+            at = self.at[node] = set()
+            cluster = self.cluster[node] = (int(p[0] // self.cell), int(p[1] // self.cell))
+            self.pos[node] = p
+            self.members.setdefault(cluster, set()).add(node)
+            sums = self.sums.setdefault(cluster, [0.0, 0.0])
+            sums[0] += p[0]
+            sums[1] += p[1]
+            dirty.add(cluster)
+        at.add(link)
+        return self.cluster[node]
+
+    def _remove_end(self, node, link, dirty):
+        at = self.at[node]
+        at.discard(link)
+        if at:
+            return
+        del self.at[node]
+        x, y = self.pos.pop(node)
+        cluster = self.cluster.pop(node)
+        members = self.members[cluster]
+        members.discard(node)
+        if members:
+            sums = self.sums[cluster]
+            sums[0] -= x
+            sums[1] -= y
+        else:
+            del self.members[cluster]
+            del self.sums[cluster]
+        dirty.add(cluster)
+
+    def _centroid(self, cluster):
+        sx, sy = self.sums[cluster]
+        n = len(self.members[cluster])
+        return sx / n, sy / n
+
+    def _fan(self, cluster):
+        cx, cy = self._centroid(cluster)
+        pos = self.pos
+        coords = []
+        for node in self.members[cluster]:
+            coords += (cx, cy, *pos[node])
+        return coords, len(self.members[cluster])
+
+    def _trunk(self, ka, kb):
+        ax, ay = self._centroid(ka)
+        bx, by = self._centroid(kb)
+        pa = (ka[0] // BUNDLE_FANOUT, ka[1] // BUNDLE_FANOUT)
+        pb = (kb[0] // BUNDLE_FANOUT, kb[1] // BUNDLE_FANOUT)
+        coords = [ax, ay]
+        if pa != pb:  # through the centers of both parents, pulled toward the straight line by 1 - BUNDLE_BETA
+            size = self.cell * BUNDLE_FANOUT
+            for t, (px, py) in ((1 / 3, pa), (2 / 3, pb)):
+                coords += (BUNDLE_BETA * (px + 0.5) * size + (1 - BUNDLE_BETA) * (ax + t * (bx - ax)),
+                           BUNDLE_BETA * (py + 0.5) * size + (1 - BUNDLE_BETA) * (ay + t * (by - ay)))
+        coords += (bx, by)
+        return coords, self.trunks[(ka, kb)]
+
+
+class EdgeBundler:
+    """Keeps EdgeBundles up to date on a worker thread.
+
+    update() takes a flat copy of the model on the calling (UI) thread; a
+    snapshot still waiting when the next one arrives is replaced, so the worker
+    only ever routes the newest state. The UI polls take() for the shapes
+    that changed. Failures end the worker and are kept in .error.
+    """
+
+    def __init__(self):
+        self.bundles = EdgeBundles()
+        self.error = None
+        self._next = None       # newest snapshot not routed yet
+        self._working = False
+        self._out = {}          # changed shapes not taken yet
+        self._stop = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bundles", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def update(self, model):
+        snapshot = (array("q", model.ids), array("d", model.xs), array("d", model.ys), dict(model.links),
+                    frozenset(model.sites.hidden))
+        with self._lock:
+            self._next = snapshot
+        self._wake.set()
+
+    def busy(self):
+        """True while a snapshot is waiting or being routed."""
+        with self._lock:
+            return self._next is not None or self._working
+
+    def take(self):
+        """Shapes changed since the last call: {shape: (world coords, count) or None}."""
+        with self._lock:
+            out, self._out = self._out, {}
+        return out
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+
+    def _run(self):
+        try:
+            while True:
+                self._wake.wait()
+                self._wake.clear()
+                if self._stop:
+                    return
+                with self._lock:
+                    snapshot, self._next = self._next, None
+                    self._working = snapshot is not None
+                if snapshot is None:
+                    continue
+                out = self.bundles.update(*snapshot)
+                with self._lock:
+                    self._out.update(out)
+                    self._working = False
+        except Exception as e:  # a worker thread has nobody to raise to: the UI reads .error
+            self.error = e
+            with self._lock:
+                self._next = None
+                self._working = False
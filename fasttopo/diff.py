@@ -0,0 +1,125 @@
+"""Structural diff between two versions of a topology."""
+
+from .model import NODE_KINDS
+
+
+# ───────────────── Diff (headless) ─────────────────
+#
+# Two versions of a topology are matched by node identity: a node's name
+# (attrs["name"]) when no other node of its version has the same one, else its
+# id, which saving and opening keep. Links are matched by the unordered pair
+# of their ends' identities. Each side is walked once, in row order, with dict
+# lookups only, so a diff costs O(N + E). Matched nodes are moved when their
+# position changed by more than DIFF_MOVE_EPS, changed when their type or
+# attributes differ; matched links are changed when their attributes differ.
+
+DIFF_MOVE_EPS = 0.5   # world units
+
+
+def _diff_names(model):
+    """node_id -> name for the nodes identified by name (see above); the others go by id."""
+    names = {}
+    for node, attrs in model.attrs.items():
+        name = attrs.get("name")
+        if name is not None and name != "":
+            name = str(name)
+            names[name] = None if name in names else node
+    return {node: name for name, node in names.items() if node is not None}
+
+
+def _diff_node(model, node, key):
+    row = model.nodes[node]
+    rec = {"key": key, "id": node, "type": NODE_KINDS[model.kinds[row]], "x": model.xs[row], "y": model.ys[row]}
+    if node in model.attrs:
+        rec["attrs"] = model.attrs[node]
+    return rec
+
+
+def diff_topologies(old, new, eps=DIFF_MOVE_EPS):
+    """What changed from model old to model new, as a JSON-ready dict.
+
+    nodes: added / removed (records as export_json writes them, plus "key",
+    the identity), moved ("from" and "to" positions) and changed ("old" and
+    "new" type and attributes); links: added / removed / changed, with "ends"
+    given as identities. "id" is always the id in the version the element is
+    in ("old_id": its id in old, for elements in both). Lists follow the row
+    order of their version.
+    """
+    old_names, new_names = _diff_names(old), _diff_names(new)
+    old_by_name = {name: node for node, name in old_names.items()}
+    new_by_name = {name: node for node, name in new_names.items()}
+    old_rows, new_rows = old.nodes, new.nodes
+    oxs, oys, okinds, oattrs, nattrs = old.xs, old.ys, old.kinds, old.attrs, new.attrs
+    nodes = {"added": [], "removed": [], "moved": [], "changed": []}
+    unstable = set()  # ids not matched to the same id in the other version: their links go by identity
+    # Both passes walk the columns in row order; each node costs a few dict lookups
+    for node, x1, y1, kind in zip(new.ids, new.xs, new.ys, new.kinds):
+        name = new_names.get(node)
+        if name is None:
+            was = node if node in old_rows and node not in old_names else None
+        else:
+            was = old_by_name.get(name)
+        key = node if name is None else name
+        if was is None:
+            nodes["added"].append(_diff_node(new, node, key))
+            unstable.add(node)
+            continue
+        if was != node:
+            unstable.add(node)
+            unstable.add(was)
+        i = old_rows[was]
+        x0, y0 = oxs[i], oys[i]
+        if abs(x1 - x0) > eps or abs(y1 - y0) > eps:
+            nodes["moved"].append({"key": key, "id": node, "old_id": was, "from": [x0, y0], "to": [x1, y1]})
+        if okinds[i] != kind or oattrs.get(was) != nattrs.get(node):
+            nodes["changed"].append({"key": key, "id": node, "old_id": was,
+                                     "old": {"type": NODE_KINDS[okinds[i]], "attrs": oattrs.get(was)},
+                                     "new": {"type": NODE_KINDS[kind], "attrs": nattrs.get(node)}})
+    for node in old.ids:
+        name = old_names.get(node)
+        if name is None:
+            gone = node not in new_rows or node in new_names
+        else:
+            gone = name not in new_by_name
+        if gone:
+            nodes["removed"].append(_diff_node(old, node, node if name is None else name))
+            unstable.add(node)
+
+    # A link with the same id between the same (stable) ends in both is the same
+    # link; only the others are matched by the pair of their ends' identities
+    olinks, nlinks, olattrs, nlattrs = old.links, new.links, old.link_attrs, new.link_attrs
+    links = {"added": [], "removed": [], "changed": []}
+    unmatched = {}
+    for link, (a, b) in olinks.items():
+        if nlinks.get(link) != (a, b) or a in unstable or b in unstable:
+            unmatched[frozenset((old_names.get(a, a), old_names.get(b, b)))] = link
+    for link, (a, b) in nlinks.items():
+        if olinks.get(link) == (a, b) and a not in unstable and b not in unstable:
+            if (olattrs or nlattrs) and olattrs.get(link) != nlattrs.get(link):
+                links["changed"].append({"id": link, "old_id": link, "ends": [new_names.get(a, a), new_names.get(b, b)],
+                                         "old": olattrs.get(link), "new": nlattrs.get(link)})
+            continue
+        ends = [new_names.get(a, a), new_names.get(b, b)]
+        was = unmatched.pop(frozenset(ends), None)
+        if was is None:
+            links["added"].append({"id": link, "ends": ends, "attrs": nlattrs.get(link)})
+        elif olattrs.get(was) != nlattrs.get(link):
+            links["changed"].append({"id": link, "old_id": was, "ends": ends,
+                                     "old": olattrs.get(was), "new": nlattrs.get(link)})
+    links["removed"] = [{"id": link, "ends": [old_names.get(a, a), old_names.get(b, b)], "attrs": olattrs.get(link)}
+                        for link in unmatched.values() for a, b in (olinks[link],)]
+    return {"old": {"nodes": len(old.nodes), "links": len(old.links)},
+            "new": {"nodes": len(new.nodes), "links": len(new.links)},
+            "nodes": nodes, "links": links}
+
+
+def diff_summary(diff):
+    """One line of counts, e.g. "nodes +2 -1, 5 moved, 0 changed; links +3 -1, 0 changed"."""
+    nodes, links = diff["nodes"], diff["links"]
+    return (f"nodes +{len(nodes['added']):,} -{len(nodes['removed']):,}, {len(nodes['moved']):,} moved, "
+            f"{len(nodes['changed']):,} changed; links +{len(links['added']):,} -{len(links['removed']):,}, "
+            f"{len(links['changed']):,} changed")
+
+
+def diff_is_empty(diff):
+    return not any(diff["nodes"].values()) and not any(diff["links"].values())
@@ -0,0 +1,458 @@
+"""Drawing export to SVG, PNG and PDF, straight from the model."""
+
+import collections
+import gzip
+import html
+import math
+import os
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized paths fall back to pure Python
+    np = None
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # optional: PNG export rasterizes with NumPy instead
+    Image = ImageDraw = ImageFont = None
+
+from .theme import (
+    CANVAS_BG, EDGE_COLOR, EDGE_WIDTH, LABEL_COLOR, LEGEND_BG, LEGEND_OUTLINE, NODE_COLORS, PIN_COLOR, PIN_WIDTH,
+)
+from .model import NODE_KINDS, NODE_RADIUS, node_label
+
+
+# ───────────────── Export (headless: SVG, PNG, PDF) ─────────────────
+#
+# Drawings are rendered straight from the model, never through a canvas: no
+# display is needed and every element is drawn, whatever the window shows.
+# _paint walks the model once and hands chunks of links, nodes and labels to a
+# painter per format, which writes them out as they come: SVG and PDF are
+# streamed element by element, PNG is rasterized one band of rows at a time
+# (with Pillow when it is installed, else with NumPy), so memory stays bounded.
+
+EXPORT_FORMATS = {".svg": "svg", ".svgz": "svg", ".png": "png", ".pdf": "pdf"}
+EXPORT_PAD = 3 * NODE_RADIUS       # world margin around the topology
+EXPORT_MAX_PX = 8192               # longest PNG side; bigger drawings are scaled down to fit
+EXPORT_BAND_PX = 2 ** 23           # PNG pixels rasterized at a time (24 MB of RGB)
+EXPORT_CHUNK = 2048                # elements handed to a painter at a time
+EXPORT_SAMPLES = 2 ** 20           # pixels stamped per NumPy pass
+EXPORT_LABEL_SIZE = 11             # label font size at scale 1
+EXPORT_MIN_LABEL_PX = 4            # labels smaller than this are left out
+EXPORT_LEGEND = (10, 10, 170, 112)  # x, y, width, height of the legend box above the drawing (px)
+
+
+def _export_geometry(model, scale, legend, max_side=None):
+    """(x0, y0, scale, top, width, height): a world point lands at ((x - x0) * scale, top + (y - y0) * scale)."""
+    x0, y0, x1, y1 = model.bbox() or (0.0, 0.0, 0.0, 0.0)
+    x0, y0, x1, y1 = x0 - EXPORT_PAD, y0 - EXPORT_PAD, x1 + EXPORT_PAD, y1 + EXPORT_PAD
+    lx, ly, lw, lh = EXPORT_LEGEND
+    top = ly + lh if legend else 0
+    if max_side is not None:
+        scale = min(scale, (max_side - top) / max(x1 - x0, y1 - y0))
+    width = max(math.ceil((x1 - x0) * scale), 2 * lx + lw if legend else 1)
+    height = top + math.ceil((y1 - y0) * scale)
+    return x0, y0, scale, top, width, height
+
+
+def _hex_rgb(color):
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _paint(model, painter, geometry, labels=True, legend=True, rows=None):
+    """Draw links, then nodes, then labels and the legend; rows=(top, bottom) limits it to a band."""
+    x0, y0, scale, top, width, _height = geometry
+    r = NODE_RADIUS * scale
+    edge = EDGE_WIDTH * scale
+    size = EXPORT_LABEL_SIZE * scale
+    labels = labels and size >= EXPORT_MIN_LABEL_PX
+    if rows is None:
+        links, nodes = model.links, model.ids
+    else:
+        margin = r + edge + (2 * size if labels else 0)
+        wy0 = y0 + (rows[0] - top - margin) / scale
+        wy1 = y0 + (rows[1] - top + margin) / scale
+        wx0, wx1 = x0 - margin / scale, x0 + (width + margin) / scale
+        links = model.links_in_rect(wx0, wy0, wx1, wy1)
+        nodes = model.nodes_in_rect(wx0, wy0, wx1, wy1)
+    xs, ys, kinds, rowof, attrs = model.xs, model.ys, model.kinds, model.nodes, model.attrs
+
+    segs = []
+    for ln in links:
+        a, b = model.links[ln]
+        ra, rb = rowof[a], rowof[b]
+        segs.append(((xs[ra] - x0) * scale, top + (ys[ra] - y0) * scale,
+                     (xs[rb] - x0) * scale, top + (ys[rb] - y0) * scale))
+        if len(segs) == EXPORT_CHUNK:
+            painter.lines(segs, EDGE_COLOR, edge)
+            segs = []
+    if segs:
+        painter.lines(segs, EDGE_COLOR, edge)
+
+    batches = {}  # (kind index, pinned) -> centers
+    for node in nodes:
+        row = rowof[node]
+        key = (kinds[row], bool(attrs.get(node, {}).get("pinned")))
+        batch = batches.setdefault(key, [])
+        batch.append(((xs[row] - x0) * scale, top + (ys[row] - y0) * scale))
+        if len(batch) == EXPORT_CHUNK:
+            _paint_nodes(painter, key, batch, r, scale)
+            batches[key] = []
+    for key, batch in batches.items():
+        if batch:
+            _paint_nodes(painter, key, batch, r, scale)
+
+    if labels:
+        for node in nodes:
+            label = node_label(model, node) if node in attrs else None
+            if label:
+                row = rowof[node]
+                painter.text((xs[row] - x0) * scale, top + (ys[row] - y0) * scale + r + size,
+                             label, LABEL_COLOR, size, "middle")
+
+    if legend and (rows is None or rows[0] < top):
+        _paint_legend(model, painter)
+
+
+def _paint_nodes(painter, key, centers, r, scale):
+    kind, pinned = key
+    outline, outline_width = (PIN_COLOR, PIN_WIDTH * scale) if pinned else (None, 0)
+    painter.shapes("oval" if NODE_KINDS[kind] == "router" else "rect", centers, r,
+                   NODE_COLORS[NODE_KINDS[kind]], outline, outline_width)
+
+
+def _paint_legend(model, painter):
+    """The canvas legend's swatches, with element counts instead of key hints."""
+    lx, ly, lw, lh = EXPORT_LEGEND
+    painter.rect(lx, ly, lx + lw, ly + lh, LEGEND_BG, LEGEND_OUTLINE)
+    painter.text(lx + lw / 2, ly + 20, "LEGEND", "#ffffff", 11, "middle")
+    counts = collections.Counter(model.kinds)
+    rows = (("oval", NODE_COLORS["router"], "Routers", counts[NODE_KINDS.index("router")]),
+            ("rect", NODE_COLORS["switch"], "Switches", counts[NODE_KINDS.index("switch")]),
+            ("line", EDGE_COLOR, "Links", len(model.links)))
+    for i, (shape, color, name, count) in enumerate(rows):
+        cy = ly + 42 + 24 * i
+        if shape == "line":
+            painter.lines([(lx + 14, cy, lx + 34, cy)], color, EDGE_WIDTH)
+        else:
+            painter.shapes(shape, [(lx + 24, cy)], 9, color, None, 0)
+        painter.text(lx + 46, cy + 4, f"{name} ({count:,})", "#ffffff", 11, "start")
+
+
+class _SvgPainter:
+    def __init__(self, f):
+        self.f = f
+
+    def _write(self, text):
+        self.f.write(text.encode("utf-8"))
+
+    def begin(self, width, height):
+        self._write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                    f'viewBox="0 0 {width} {height}" font-family="Arial, Helvetica, sans-serif">\n'
+                    f'<rect width="100%" height="100%" fill="{CANVAS_BG}"/>\n')
+
+    def end(self):
+        self._write("</svg>\n")
+
+    def lines(self, segs, color, width):
+        d = "".join("M%.1f %.1fL%.1f %.1f" % s for s in segs)
+        self._write(f'<path fill="none" stroke="{color}" stroke-width="{width:.2f}" '
+                    f'stroke-linecap="round" d="{d}"/>\n')
+
+    def shapes(self, shape, centers, r, fill, outline, outline_width):
+        if shape == "oval":
+            body = "".join('<circle cx="%.1f" cy="%.1f" r="%.2f"/>' % (x, y, r) for x, y in centers)
+        else:
+            body = "".join('<rect x="%.1f" y="%.1f" width="%.2f" height="%.2f"/>' % (x - r, y - r, 2 * r, 2 * r)
+                           for x, y in centers)
+        stroke = f' stroke="{outline}" stroke-width="{outline_width:.2f}"' if outline else ""
+        self._write(f'<g fill="{fill}"{stroke}>{body}</g>\n')
+
+    def rect(self, x0, y0, x1, y1, fill, outline):
+        self._write(f'<rect x="{x0}" y="{y0}" width="{x1 - x0}" height="{y1 - y0}" fill="{fill}" stroke="{outline}"/>\n')
+
+    def text(self, x, y, text, color, size, anchor):
+        self._write(f'<text x="{x:.1f}" y="{y:.1f}" fill="{color}" font-size="{size:.1f}" '
+                    f'text-anchor="{anchor}">{html.escape(text)}</text>\n')
+
+
+class _PdfPainter:
+    """One-page PDF; the page content is a single deflated stream written as it is produced."""
+
+    def __init__(self, f):
+        self.f = f
+        self.offsets = []
+        self.z = zlib.compressobj(6)
+        self.length = 0
+
+    def _object(self, body):
+        self.offsets.append(self.f.tell())
+        self.f.write(f"{len(self.offsets)} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+
+    def _emit(self, ops):
+        data = self.z.compress(ops.encode("latin-1", "replace"))
+        self.f.write(data)
+        self.length += len(data)
+
+    def begin(self, width, height):
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object("<< /Type /Catalog /Pages 2 0 R >>")
+        self._object("<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+        self._object(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+                     "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>")
+        self._object("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self.offsets.append(self.f.tell())
+        self.f.write(b"5 0 obj\n<< /Length 6 0 R /Filter /FlateDecode >>\nstream\n")
+        # Flip to the canvas' top-left origin, then paint the background
+        self._emit(f"1 0 0 -1 0 {height} cm\n%.3f %.3f %.3f rg 0 0 {width} {height} re f\n" % self._rgb(CANVAS_BG))
+
+    def end(self):
+        data = self.z.flush()
+        self.f.write(data)
+        self.length += len(data)
+        self.f.write(b"\nendstream\nendobj\n")
+        self._object(str(self.length))
+        xref = self.f.tell()
+        self.f.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        self.f.write("".join("%010d 00000 n \n" % off for off in self.offsets).encode("latin-1"))
+        self.f.write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+                     .encode("latin-1"))
+
+    @staticmethod
+    def _rgb(color):
+        return tuple(c / 255 for c in _hex_rgb(color))
+
+    def lines(self, segs, color, width):
+        self._emit("%.3f %.3f %.3f RG %.2f w 1 J\n" % (*self._rgb(color), width)
+                   + "".join("%.1f %.1f m %.1f %.1f l\n" % s for s in segs) + "S\n")
+
+    def shapes(self, shape, centers, r, fill, outline, outline_width):
+        ops = ["%.3f %.3f %.3f rg\n" % self._rgb(fill)]
+        if outline:
+            ops.append("%.3f %.3f %.3f RG %.2f w\n" % (*self._rgb(outline), outline_width))
+        if shape == "oval":
+            k = 0.5523 * r  # cubic Bezier handle length for a quarter circle
+            for x, y in centers:
+                ops.append("%.1f %.1f m %.1f %.1f %.1f %.1f %.1f %.1f c %.1f %.1f %.1f %.1f %.1f %.1f c "
+                           "%.1f %.1f %.1f %.1f %.1f %.1f c %.1f %.1f %.1f %.1f %.1f %.1f c h\n"
+                           % (x + r, y, x + r, y + k, x + k, y + r, x, y + r, x - k, y + r, x - r, y + k, x - r, y,
+                              x - r, y - k, x - k, y - r, x, y - r, x + k, y - r, x + r, y - k, x + r, y))
+        else:
+            ops.extend("%.1f %.1f %.2f %.2f re\n" % (x - r, y - r, 2 * r, 2 * r) for x, y in centers)
+        ops.append("B\n" if outline else "f\n")
+        self._emit("".join(ops))
+
+    def rect(self, x0, y0, x1, y1, fill, outline):
+        self._emit("%.3f %.3f %.3f rg %.3f %.3f %.3f RG 1 w %.1f %.1f %.1f %.1f re B\n"
+                   % (*self._rgb(fill), *self._rgb(outline), x0, y0, x1 - x0, y1 - y0))
+
+    def text(self, x, y, text, color, size, anchor):
+        if anchor == "middle":
+            x -= 0.26 * size * len(text)  # about half the width of average Helvetica text
+        text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        # The text matrix flips back the page flip, or glyphs would be upside down
+        self._emit("BT /F1 %.1f Tf %.3f %.3f %.3f rg 1 0 0 -1 %.1f %.1f Tm (%s) Tj ET\n"
+                   % (size, *self._rgb(color), x, y, text))
+
+
+class _PilBand:
+    """Rasterizes a band of PNG rows with Pillow."""
+
+    def __init__(self, width):
+        self.width = width
+        self.fonts = {}
+
+    def begin_band(self, top, rows):
+        self.top = top
+        self.image = Image.new("RGB", (self.width, rows), CANVAS_BG)
+        self.draw = ImageDraw.Draw(self.image)
+
+    def rows(self):
+        raw = self.image.tobytes()
+        stride = 3 * self.width
+        return b"".join(b"\0" + raw[i:i + stride] for i in range(0, len(raw), stride))
+
+    def lines(self, segs, color, width):
+        line, top, width = self.draw.line, self.top, max(1, round(width))
+        for x1, y1, x2, y2 in segs:
+            line((x1, y1 - top, x2, y2 - top), fill=color, width=width)
+
+    def shapes(self, shape, centers, r, fill, outline, outline_width):
+        draw = self.draw.ellipse if shape == "oval" and r >= 2 else self.draw.rectangle
+        width = max(1, round(outline_width)) if outline else 0
+        top = self.top
+        for x, y in centers:
+            y -= top
+            draw((x - r, y - r, x + r, y + r), fill=fill, outline=outline, width=width)
+
+    def rect(self, x0, y0, x1, y1, fill, outline):
+        self.draw.rectangle((x0, y0 - self.top, x1, y1 - self.top), fill=fill, outline=outline)
+
+    def text(self, x, y, text, color, size, anchor):
+        size = round(size)
+        font = self.fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.load_default(size)
+            except TypeError:  # Pillow < 10.1: one bitmap size only
+                font = ImageFont.load_default()
+            self.fonts[size] = font
+        if anchor == "middle":
+            x -= self.draw.textlength(text, font=font) / 2
+        self.draw.text((x, y - self.top - size), text, fill=color, font=font)
+
+
+class _NumpyBand:
+    """Rasterizes a band of PNG rows into a NumPy array (shapes only: text needs Pillow).
+
+    Pixels are packed into one uint32 each, so stamping a color is a single
+    flat scatter rather than one per channel.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.stamps = {}
+
+    @staticmethod
+    def _pixel(color):
+        r, g, b = _hex_rgb(color)
+        return np.array([r, g, b, 0], dtype=np.uint8).view(np.uint32)[0]
+
+    def begin_band(self, top, rows):
+        self.top = top
+        self.px = np.empty((rows, self.width), dtype=np.uint32)
+        self.px[:] = self._pixel(CANVAS_BG)
+
+    def rows(self):
+        out = np.zeros((self.px.shape[0], 1 + 3 * self.width), dtype=np.uint8)  # column 0: PNG filter "none"
+        out[:, 1:] = self.px.view(np.uint8).reshape(self.px.shape[0], self.width, 4)[:, :, :3].reshape(
+            self.px.shape[0], -1)
+        return out.tobytes()
+
+    def _stamp_offsets(self, shape, r):
+        """(dy, dx) of the pixels covered by a shape of radius r centered on a pixel."""
+        key = (shape, round(r * 4))
+        offsets = self.stamps.get(key)
+        if offsets is None:
+            k = max(0, math.floor(r))
+            dy, dx = np.mgrid[-k:k + 1, -k:k + 1]
+            if shape == "oval":
+                keep = dy * dy + dx * dx <= max(r, 0.5) ** 2
+                dy, dx = dy[keep], dx[keep]
+            offsets = self.stamps[key] = (dy.ravel(), dx.ravel())
+        return offsets
+
+    def _stamp(self, xs, ys, offsets, color):
+        dy, dx = offsets
+        rows, cols = self.px.shape
+        yi = np.rint(ys).astype(np.intp)
+        xi = np.rint(xs).astype(np.intp)
+        if len(dy) > 1:
+            yi = (yi[:, None] + dy).ravel()
+            xi = (xi[:, None] + dx).ravel()
+        keep = (yi >= 0) & (yi < rows) & (xi >= 0) & (xi < cols)
+        self.px.ravel()[yi[keep] * cols + xi[keep]] = self._pixel(color)
+
+    def lines(self, segs, color, width):
+        s = np.asarray(segs, dtype=np.float64)
+        x1, y1, x2, y2 = s[:, 0], s[:, 1] - self.top, s[:, 2], s[:, 3] - self.top
+        # Clip to the band (Liang-Barsky) so a long link only costs its visible pixels
+        pad = width + 1
+        dx, dy = x2 - x1, y2 - y1
+        t0, t1 = np.zeros(len(s)), np.ones(len(s))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for p, q in ((-dx, x1 + pad), (dx, self.width + pad - x1),
+                         (-dy, y1 + pad), (dy, self.px.shape[0] + pad - y1)):
+                t = q / p
+                t0 = np.where(p < 0, np.maximum(t0, t), t0)
+                t1 = np.where(p > 0, np.minimum(t1, t), t1)
+                t1 = np.where((p == 0) & (q < 0), -1.0, t1)
+        keep = t0 <= t1
+        x1, y1, dx, dy, t0, t1 = x1[keep], y1[keep], dx[keep], dy[keep], t0[keep], t1[keep]
+        ax, ay = x1 + t0 * dx, y1 + t0 * dy
+        bx, by = x1 + t1 * dx, y1 + t1 * dy
+        n = np.ceil(np.maximum(np.abs(bx - ax), np.abs(by - ay))).astype(np.intp) + 1
+        offsets = self._stamp_offsets("rect", (max(1, round(width)) - 1) / 2)
+        ends = np.cumsum(n)
+        start = 0
+        while start < len(n):
+            base = ends[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(ends, base + EXPORT_SAMPLES, side="right")))
+            count = n[start:stop]
+            idx = np.repeat(np.arange(start, stop), count)
+            step = np.arange(int(count.sum())) - np.repeat(ends[start:stop] - count - base, count)
+            t = step / np.maximum(n[idx] - 1, 1)
+            self._stamp(ax[idx] + t * (bx - ax)[idx], ay[idx] + t * (by - ay)[idx], offsets, color)
+            start = stop
+
+    def shapes(self, shape, centers, r, fill, outline, outline_width):
+        c = np.asarray(centers, dtype=np.float64)
+        xs, ys = c[:, 0], c[:, 1] - self.top
+        if outline:
+            self._stamp(xs, ys, self._stamp_offsets(shape, r), outline)
+            r -= outline_width
+        self._stamp(xs, ys, self._stamp_offsets(shape, r), fill)
+
+    def rect(self, x0, y0, x1, y1, fill, outline):
+        rows = self.px.shape[0]
+        a, b = max(0, y0 - self.top), min(rows, y1 - self.top + 1)
+        if a >= b:
+            return
+        self.px[a:b, x0:x1 + 1] = self._pixel(fill)
+        self.px[a:b, [x0, x1]] = self._pixel(outline)
+        for edge in (y0 - self.top, y1 - self.top):
+            if 0 <= edge < rows:
+                self.px[edge, x0:x1 + 1] = self._pixel(outline)
+
+    def text(self, x, y, text, color, size, anchor):
+        pass
+
+
+def _png_chunk(f, kind, data):
+    f.write(struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data)))
+
+
+def _export_png(model, f, scale, labels, legend):
+    if Image is None and np is None:
+        raise ValueError("PNG export needs Pillow or NumPy")
+    geometry = _export_geometry(model, scale, legend, EXPORT_MAX_PX)
+    width, height = geometry[4], geometry[5]
+    painter = _PilBand(width) if Image is not None else _NumpyBand(width)
+    f.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))  # 8-bit RGB
+    z = zlib.compressobj(6)
+    # Tall bands: a link crossing several bands is drawn once per band
+    band = max(16, EXPORT_BAND_PX // width)
+    for top in range(0, height, band):
+        bottom = min(top + band, height)
+        painter.begin_band(top, bottom - top)
+        _paint(model, painter, geometry, labels, legend, rows=(top, bottom))
+        data = z.compress(painter.rows())
+        if data:
+            _png_chunk(f, b"IDAT", data)
+    _png_chunk(f, b"IDAT", z.flush())
+    _png_chunk(f, b"IEND", b"")
+
+
+def export_drawing(model, path, fmt=None, scale=1.0, labels=True, legend=True):
+    """Render model to an SVG (.svgz: gzipped), PNG or PDF file; the format follows the extension."""
+    fmt = fmt or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ("svg", "png", "pdf"):
+        raise ValueError(f"{path}: unknown drawing format (use .svg, .svgz, .png or .pdf)")
+    tmp = path + ".tmp"
+    with (gzip.open if path.lower().endswith(".svgz") else open)(tmp, "wb") as f:
+        if fmt == "png":
+            _export_png(model, f, scale, labels, legend)
+        else:
+            geometry = _export_geometry(model, scale, legend)
+            painter = _SvgPainter(f) if fmt == "svg" else _PdfPainter(f)
+            painter.begin(geometry[4], geometry[5])
+            _paint(model, painter, geometry, labels, legend)
+            painter.end()
+    os.replace(tmp, path)
@@ -0,0 +1,152 @@
+"""Topology files: the binary snapshot format and the JSON export."""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .model import NODE_KINDS, TopologyModel
+
+
+# ───────────────── Snapshot files (headless) ─────────────────
+#
+# Binary layout (little-endian), every section padded to 8 bytes:
+#   header   SNAPSHOT_HEADER
+#   ids      int64[nodes]     xs  float64[nodes]     ys  float64[nodes]
+#   kinds    int8[nodes]      seqs int64[nodes]
+#   link_ids int64[links]     ends int64[2 * links]  (n1, n2 interleaved)
+#   attrs    UTF-8 JSON {"nodes": {id: {...}}, "links": {id: {...}}} (may be empty)
+
+SNAPSHOT_MAGIC = b"TOPO"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHHQQQQQQ")  # magic, version, flags, nodes, links, attrs bytes,
+                                                # node_seq, next node id, next link id
+
+
+def _write_column(f, col):
+    if sys.byteorder != "little":
+        col = array(col.typecode, col)
+        col.byteswap()
+    col.tofile(f)
+    f.write(b"\0" * (-len(col) * col.itemsize % 8))
+
+
+def _read_column(view, offset, typecode, count):
+    col = array(typecode)
+    end = offset + count * col.itemsize
+    if end > len(view):
+        raise ValueError("truncated topology snapshot")
+    col.frombytes(view[offset:end])
+    if sys.byteorder != "little":
+        col.byteswap()
+    return col, end + (-end % 8)
+
+
+def save_snapshot(model, path):
+    """Write the model as a compact binary snapshot (atomically replaces path)."""
+    link_ids = array("q", model.links)
+    ends = array("q", [n for pair in model.links.values() for n in pair])
+    attrs = b""
+    if model.attrs or model.link_attrs:
+        attrs = json.dumps({"nodes": model.attrs, "links": model.link_attrs},
+                           separators=(",", ":")).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(model.ids), len(link_ids),
+                                     len(attrs), model.node_seq, model._next_node_id, model._next_link_id))
+        for col in (model.ids, model.xs, model.ys, model.kinds, model.seqs, link_ids, ends):
+            _write_column(f, col)
+        f.write(attrs)
+    os.replace(tmp, path)
+
+
+def load_snapshot(path, model=None):
+    """Read a binary snapshot into model (a new one by default) via a read-only memory map."""
+    model = model if model is not None else TopologyModel()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+        if len(view) < SNAPSHOT_HEADER.size:
+            raise ValueError("not a topology snapshot")
+        (magic, version, _flags, n_nodes, n_links, attrs_len,
+         node_seq, next_node, next_link) = SNAPSHOT_HEADER.unpack_from(view, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a topology snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot version {version} is newer than this tool ({SNAPSHOT_VERSION})")
+
+        off = SNAPSHOT_HEADER.size
+        ids, off = _read_column(view, off, "q", n_nodes)
+        xs, off = _read_column(view, off, "d", n_nodes)
+        ys, off = _read_column(view, off, "d", n_nodes)
+        kinds, off = _read_column(view, off, "b", n_nodes)
+        seqs, off = _read_column(view, off, "q", n_nodes)
+        link_ids, off = _read_column(view, off, "q", n_links)
+        ends, off = _read_column(view, off, "q", 2 * n_links)
+        attrs = json.loads(bytes(view[off:off + attrs_len]).decode("utf-8")) if attrs_len else {}
+
+    model.clear()
+    model.ids, model.xs, model.ys, model.kinds, model.seqs = ids, xs, ys, kinds, seqs
+    model.links = dict(zip(link_ids, zip(ends[0::2], ends[1::2])))
+    model.attrs = {int(k): v for k, v in attrs.get("nodes", {}).items()}
+    model.link_attrs = {int(k): v for k, v in attrs.get("links", {}).items()}
+    model.node_seq = node_seq
+    model._next_node_id = next_node
+    model._next_link_id = next_link
+    model.rebuild_indexes()
+    return model
+
+
+def export_json(model, path):
+    """Write a human-readable JSON copy of the model, one element at a time."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"version": %d, "nodes": [' % SNAPSHOT_VERSION)
+        for row, node in enumerate(model.ids):
+            rec = {"id": node, "type": NODE_KINDS[model.kinds[row]], "seq": model.seqs[row],
+                   "x": model.xs[row], "y": model.ys[row]}
+            if node in model.attrs:
+                rec["attrs"] = model.attrs[node]
+            f.write(("\n  " if row == 0 else ",\n  ") + json.dumps(rec))
+        f.write('\n], "links": [')
+        for i, (link, (n1, n2)) in enumerate(model.links.items()):
+            rec = {"id": link, "a": n1, "b": n2}
+            if link in model.link_attrs:
+                rec["attrs"] = model.link_attrs[link]
+            f.write(("\n  " if i == 0 else ",\n  ") + json.dumps(rec))
+        f.write("\n]}\n")
+
+
+def load_json(path, model=None):
+    """Read a file written by export_json."""
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    model = model if model is not None else TopologyModel()
+    model.clear()
+    for rec in doc["nodes"]:
+        row = len(model.ids)
+        model.ids.append(rec["id"])
+        model.xs.append(rec["x"])
+        model.ys.append(rec["y"])
+        model.kinds.append(NODE_KINDS.index(rec["type"]))
+        model.seqs.append(rec.get("seq", row))
+        if rec.get("attrs"):
+            model.attrs[rec["id"]] = rec["attrs"]
+    for rec in doc["links"]:
+        model.links[rec["id"]] = (rec["a"], rec["b"])
+        if rec.get("attrs"):
+            model.link_attrs[rec["id"]] = rec["attrs"]
+    model.node_seq = max(model.seqs, default=-1) + 1
+    model._next_node_id = max(model.ids, default=0) + 1
+    model._next_link_id = max(model.links, default=0) + 1
+    model.rebuild_indexes()
+    return model
+
+
+def load_topology_file(path, model=None):
+    """Open a snapshot or JSON export, whichever path holds."""
+    with open(path, "rb") as f:
+        magic = f.read(len(SNAPSHOT_MAGIC))
+    if magic == SNAPSHOT_MAGIC:
+        return load_snapshot(path, model)
+    return load_json(path, model)
@@ -0,0 +1,147 @@
+"""Standard fabric generators (spine/leaf, fat-tree, full mesh, ring, hub-and-spoke)."""
+
+import itertools
+import math
+
+from .model import NODE_KINDS, NODE_RADIUS
+
+
+# ───────────────── Generators (headless) ─────────────────
+#
+# Standard fabrics written straight into a model: every node in one add_nodes
+# call, every link in one add_links call, nothing per item. Nodes are named
+# (spine1, leaf12, ...), so importing the devices' neighbor dumps later merges
+# into them; fat-tree pods are also sites. A new fabric is placed right of
+# whatever the model already holds.
+
+GEN_SPACING = 3 * NODE_RADIUS     # between neighboring nodes of a tier (world units)
+GEN_TIER_GAP = 12 * NODE_RADIUS   # between tiers
+GEN_MARGIN = 8 * NODE_RADIUS      # between a new fabric and the existing topology
+
+_ROUTER, _SWITCH = NODE_KINDS.index("router"), NODE_KINDS.index("switch")
+
+
+def _row(count, width, y):
+    """count positions spread evenly over [0, width] at height y."""
+    if count == 1:
+        return [width / 2], [y]
+    step = width / (count - 1)
+    return [i * step for i in range(count)], [y] * count
+
+
+def _circle(count, cx=0.0, cy=0.0):
+    """count positions on a circle around (cx, cy), GEN_SPACING apart."""
+    radius = max(count * GEN_SPACING / (2 * math.pi), GEN_SPACING)
+    angles = [2 * math.pi * i / count for i in range(count)]
+    return [cx + radius * math.cos(a) for a in angles], [cy + radius * math.sin(a) for a in angles]
+
+
+def _check_sizes(name, **sizes):
+    for what, size in sizes.items():
+        if size < 1:
+            raise ValueError(f"{name} needs at least one {what.rstrip('s')}")
+
+
+def _named(prefix, count):
+    return [{"name": f"{prefix}{i + 1}"} for i in range(count)]
+
+
+def _generate(model, kinds, xs, ys, attrs, pairs):
+    """Bulk-insert nodes (fabric-local coordinates) and links (index pairs into them)."""
+    box = model.bbox()
+    if box is not None:
+        dx, dy = box[2] + GEN_MARGIN - min(xs), box[1] - min(ys)
+        xs = [x + dx for x in xs]
+        ys = [y + dy for y in ys]
+    nodes = model.add_nodes(kinds, xs, ys, attrs)
+    links = model.add_links([(nodes[a], nodes[b]) for a, b in pairs])
+    return nodes, links
+
+
+def spine_leaf(model, spines, leaves):
+    """Two-tier Clos: every leaf (switch) linked to every spine (router)."""
+    _check_sizes("spine-leaf", spines=spines, leaves=leaves)
+    width = (max(spines, leaves) - 1) * GEN_SPACING
+    sx, sy = _row(spines, width, 0.0)
+    lx, ly = _row(leaves, width, GEN_TIER_GAP)
+    return _generate(model, [_ROUTER] * spines + [_SWITCH] * leaves, sx + lx, sy + ly,
+                     _named("spine", spines) + _named("leaf", leaves),
+                     [(s, spines + leaf) for s in range(spines) for leaf in range(leaves)])
+
+
+def fat_tree(model, k):
+    """k-ary fat-tree: (k/2)^2 core routers over k pods of k/2 aggregation and k/2 edge switches."""
+    if k < 2 or k % 2:
+        raise ValueError("fat-tree needs an even k of at least 2")
+    half = k // 2
+    cores, per_tier = half * half, k * half
+    pod_x = [(pod * (half + 1) + j) * GEN_SPACING for pod in range(k) for j in range(half)]
+    cx, cy = _row(cores, pod_x[-1], 0.0)
+    attrs = _named("core", cores)
+    for tier in ("agg", "edge"):
+        attrs += [{"name": f"{tier}{pod + 1}-{j + 1}", "site": f"pod{pod + 1}"}
+                  for pod in range(k) for j in range(half)]
+    agg, edge = cores, cores + per_tier  # first index of each tier
+    pairs = [(c, agg + pod * half + c // half) for c in range(cores) for pod in range(k)]
+    pairs += [(agg + pod * half + i, edge + pod * half + j)
+              for pod in range(k) for i in range(half) for j in range(half)]
+    return _generate(model, [_ROUTER] * cores + [_SWITCH] * (2 * per_tier),
+                     cx + pod_x + pod_x, cy + [GEN_TIER_GAP] * per_tier + [2 * GEN_TIER_GAP] * per_tier,
+                     attrs, pairs)
+
+
+def full_mesh(model, count, kind="router"):
+    """count nodes on a circle, each linked to every other."""
+    _check_sizes("mesh", nodes=count)
+    xs, ys = _circle(count)
+    return _generate(model, [NODE_KINDS.index(kind)] * count, xs, ys, _named("mesh", count),
+                     itertools.combinations(range(count), 2))
+
+
+def ring(model, count, kind="router"):
+    """count nodes on a circle, each linked to the next."""
+    _check_sizes("ring", nodes=count)
+    xs, ys = _circle(count)
+    return _generate(model, [NODE_KINDS.index(kind)] * count, xs, ys, _named("ring", count),
+                     [(i, (i + 1) % count) for i in range(count)])
+
+
+def hub_and_spoke(model, spokes, hubs=1):
+    """spokes routers on a circle, each linked to every hub router in the middle."""
+    _check_sizes("hub-spoke", spokes=spokes, hubs=hubs)
+    hx, hy = _row(hubs, (hubs - 1) * GEN_SPACING, 0.0)
+    sx, sy = _circle(spokes, hx[-1] / 2)
+    return _generate(model, [_ROUTER] * (hubs + spokes), hx + sx, hy + sy,
+                     _named("hub", hubs) + _named("spoke", spokes),
+                     [(h, hubs + s) for s in range(spokes) for h in range(hubs)])
+
+
+# name -> (generator, sizes it takes; [optional])
+GENERATORS = {
+    "spine-leaf": (spine_leaf, "SPINES,LEAVES"),
+    "fat-tree": (fat_tree, "K"),
+    "mesh": (full_mesh, "NODES"),
+    "ring": (ring, "NODES"),
+    "hub-spoke": (hub_and_spoke, "SPOKES[,HUBS]"),
+}
+
+
+def parse_fabric(spec):
+    """Split a spec such as "spine-leaf:64,2048" into (generator, sizes); ValueError naming the problem."""
+    name, _, sizes = spec.partition(":")
+    if name not in GENERATORS:
+        raise ValueError(f"unknown fabric {name!r} (one of {', '.join(GENERATORS)})")
+    generator, usage = GENERATORS[name]
+    try:
+        sizes = [int(s) for s in sizes.split(",")] if sizes else []
+    except ValueError:
+        raise ValueError(f"fabric sizes must be integers: {name}:{usage}") from None
+    if not usage.split("[")[0].count(",") + 1 <= len(sizes) <= usage.count(",") + 1:
+        raise ValueError(f"usage: {name}:{usage}")
+    return generator, sizes
+
+
+def generate_fabric(model, spec):
+    """Build the fabric a spec such as "spine-leaf:64,2048" names; returns the new (nodes, links)."""
+    generator, sizes = parse_fabric(spec)
+    return generator(model, *sizes)
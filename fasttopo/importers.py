@@ -0,0 +1,613 @@
+"""Streaming import of neighbor dumps, CSV edge lists, GraphML and Graphviz DOT."""
+
+import csv
+import itertools
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+from .model import NODE_KINDS, NODE_RADIUS, TopologyModel
+
+
+# ───────────────── Import (headless, streaming) ─────────────────
+#
+# Parsers turn a file into a stream of records:
+#   ("node", name, kind or None, (x, y) or None, {attr: value})
+#   ("link", name_a, name_b, {attr: value})
+# TopologyImporter matches nodes by name (attrs["name"]), buffers at most one
+# batch of records and hands each batch to the model's bulk add_nodes/add_links,
+# so memory does not grow with the size of the input file.
+
+IMPORT_BATCH = 2048               # records per bulk insert (and per progress report)
+IMPORT_COLUMNS = 64               # nodes without coordinates are placed on a grid this wide
+IMPORT_SPACING = 4 * NODE_RADIUS
+IMPORT_EXTENSIONS = {".csv": "csv", ".tsv": "csv", ".graphml": "graphml", ".xml": "graphml",
+                     ".dot": "dot", ".gv": "dot"}
+
+CSV_SOURCE_COLUMNS = ("source", "src", "from", "node1", "local", "local_device", "device")
+CSV_TARGET_COLUMNS = ("target", "dst", "to", "node2", "remote", "remote_device", "neighbor")
+
+
+class _CountingReader:
+    """Binary file wrapper that counts the bytes consumed, for progress reports."""
+
+    def __init__(self, f, name):
+        self.f = f
+        self.name = name  # device name for neighbor dumps that never show a prompt
+        self.pos = 0
+
+    def read(self, n=-1):
+        data = self.f.read(n)
+        self.pos += len(data)
+        return data
+
+    def lines(self):
+        for raw in self.f:
+            self.pos += len(raw)
+            yield raw.decode("utf-8", "replace")
+
+
+def _kind_from(value):
+    """Best-effort node kind from a type/role/shape string."""
+    v = str(value).lower()
+    if "router" in v or v in ("circle", "ellipse", "oval", "doublecircle"):
+        return "router"
+    if "switch" in v or "bridge" in v or v in ("box", "rect", "rectangle", "square"):
+        return "switch"
+    return None
+
+
+def _pop_kind(attrs):
+    kind = None
+    for key in ("kind", "type", "role", "device_type", "shape"):
+        if key in attrs:
+            kind = kind or _kind_from(attrs.pop(key))
+    return kind
+
+
+def _capability_kind(caps):
+    """CDP/LLDP capability codes or words -> node kind."""
+    codes = set(re.findall(r"[A-Za-z]+", caps))
+    if codes & {"R", "Router"}:
+        return "router"
+    if codes & {"S", "B", "Switch", "Bridge"}:
+        return "switch"
+    return None
+
+
+# ───── CSV edge lists ─────
+
+def parse_csv(reader):
+    """Edge list with a source/target style header, or bare "a,b[,...]" rows.
+
+    Extra columns become link attributes; source_type/target_type set node kinds.
+    """
+    lines = reader.lines()
+    first = next(lines, "").lstrip("\ufeff")
+    delimiter = max(",;\t|", key=first.count)
+    rows = csv.reader(itertools.chain([first], lines), delimiter=delimiter)
+    first_row = next(rows, [])
+    header = [h.strip().lower() for h in first_row]
+    si = next((header.index(c) for c in CSV_SOURCE_COLUMNS if c in header), None)
+    ti = next((header.index(c) for c in CSV_TARGET_COLUMNS if c in header), None)
+    if si is None or ti is None:  # no header: the first row is data
+        si, ti = 0, 1
+        rows = itertools.chain([first_row], rows)
+        header = []
+    kind_cols = [(i, h.startswith("target")) for i, h in enumerate(header)
+                 if h in ("source_type", "source_kind", "target_type", "target_kind")]
+    extra = [(i, h) for i, h in enumerate(header) if i not in (si, ti) and i not in dict(kind_cols)]
+
+    for row in rows:
+        if len(row) <= max(si, ti):
+            continue
+        a, b = row[si].strip(), row[ti].strip()
+        if not a or not b or a.startswith("#"):
+            continue
+        for i, is_target in kind_cols:
+            if i < len(row) and row[i].strip():
+                yield "node", b if is_target else a, _kind_from(row[i]), None, {}
+        yield "link", a, b, {h: row[i].strip() for i, h in extra if i < len(row) and row[i].strip()}
+
+
+# ───── LLDP / CDP neighbor dumps ─────
+
+_PROMPT = re.compile(r"^\s*([\w.\-/:]+)[#>]\s*(?:sh\w*\s+(?:lldp|cdp)\b|$)", re.I)
+_SEPARATOR = re.compile(r"^\s*-{5,}\s*$")
+_DETAIL_FIELDS = (
+    ("device", re.compile(r"^\s*(?:Device ID|System Name)\s*:\s*(\S+)", re.I)),
+    ("local_port", re.compile(r"^\s*(?:Local Intf|Local Port id|Interface)\s*:\s*([^,]+?)\s*(?:,|$)", re.I)),
+    ("remote_port", re.compile(r"(?:^\s*|,\s*)Port ID(?: \(outgoing port\))?\s*:\s*(.+?)\s*$", re.I)),
+    ("platform", re.compile(r"^\s*Platform\s*:\s*([^,]+?)\s*(?:,|$)", re.I)),
+    ("caps", re.compile(r"(?:^\s*(?:System\s+)?|,\s*)Capabilities\s*:\s*(.+?)\s*$", re.I)),
+)
+_TABLE_HEADER = re.compile(r"^\s*Device[ -]ID\s+Local\s+Intr?f", re.I)
+_TABLE_COLUMNS = (("local_port", r"Local\s+Intr?f\w*"), ("hold", r"Hold[\w-]*"), ("caps", r"Capabilit\w*"),
+                  ("platform", r"Platform"), ("remote_port", r"Port\s+ID"))
+
+
+def _table_columns(header):
+    """[(field, start offset), ...] of a neighbor summary table, from its header line."""
+    cols = []
+    for key, pat in _TABLE_COLUMNS:
+        m = re.search(pat, header, re.I)
+        if m:
+            cols.append((key, m.start()))
+    return sorted(cols, key=lambda c: c[1])
+
+
+def parse_neighbors(reader):
+    """`show cdp|lldp neighbors [detail]` output; a file may hold several devices.
+
+    The local device is taken from the CLI prompt ("core1#show lldp neighbors"),
+    or from the file name when there is none.
+    """
+    local = reader.name
+    block = {}     # detail fields of the neighbor being read
+    table = None   # summary table columns while inside a table
+    wrapped = None  # summary rows wrap after long device ids
+
+    def emit(fields):
+        node_attrs = {"platform": fields["platform"]} if "platform" in fields else {}
+        yield "node", local, None, None, {}
+        yield "node", fields["device"], _capability_kind(fields.get("caps", "")), None, node_attrs
+        yield "link", local, fields["device"], {k: fields[k] for k in ("local_port", "remote_port") if k in fields}
+
+    for line in reader.lines():
+        m = _PROMPT.match(line)
+        if m or _SEPARATOR.match(line):
+            if "device" in block:
+                yield from emit(block)
+            block = {}
+            if m:
+                local, table, wrapped = m.group(1), None, None
+            continue
+
+        if _TABLE_HEADER.match(line):
+            table = _table_columns(line)
+            continue
+        if table is not None:
+            if not line.strip():
+                continue
+            if line.lstrip().startswith("Total"):
+                table = None
+                continue
+            if wrapped is None and len(line.split()) == 1 and not line[0].isspace():
+                wrapped = line.strip()
+                continue
+            device = wrapped or line[:table[0][1]].strip()
+            wrapped = None
+            if not device:
+                continue
+            fields = {"device": device.split()[0]}
+            ends = [off for _key, off in table[1:]] + [None]
+            for (key, off), end in zip(table, ends):
+                value = line[off:end].strip()
+                if value:
+                    fields[key] = value
+            yield from emit(fields)
+            continue
+
+        found = [(key, m.group(1).strip()) for key, pat in _DETAIL_FIELDS for m in [pat.search(line)] if m]
+        if any(key in block for key, _value in found):  # a field repeats: the next neighbor began
+            if "device" in block:
+                yield from emit(block)
+            block = {}
+        block.update(found)
+    if "device" in block:
+        yield from emit(block)
+
+
+# ───── GraphML ─────
+
+def parse_graphml(reader):
+    """GraphML via iterparse; yEd geometry, labels and shapes are picked up when present."""
+    keys = {}     # <key id=...> -> attribute name
+    graph = None  # outermost <graph>, emptied after every element so the tree never grows
+    for event, el in ET.iterparse(reader, events=("start", "end")):
+        tag = el.tag.rpartition("}")[2]
+        if event == "start":
+            if tag == "graph" and graph is None:
+                graph = el
+            continue
+        if tag == "key":
+            keys[el.get("id")] = el.get("attr.name") or el.get("id")
+            continue
+        if tag not in ("node", "edge"):
+            continue
+
+        attrs = {}
+        pos = None
+        kind = None
+        for child in el.iter():
+            ctag = child.tag.rpartition("}")[2]
+            if ctag == "data" and child.text and child.text.strip():
+                attrs[keys.get(child.get("key"), child.get("key"))] = child.text.strip()
+            elif ctag == "Geometry":
+                try:
+                    pos = (float(child.get("x", 0)) + float(child.get("width", 0)) / 2,
+                           float(child.get("y", 0)) + float(child.get("height", 0)) / 2)
+                except ValueError:
+                    pass
+            elif ctag == "NodeLabel" and child.text and child.text.strip():
+                attrs["label"] = child.text.strip()
+            elif ctag == "Shape":
+                kind = _kind_from(child.get("type", ""))
+        if tag == "node":
+            if pos is None and "x" in attrs and "y" in attrs:
+                try:
+                    pos = (float(attrs.pop("x")), float(attrs.pop("y")))
+                except ValueError:
+                    pass
+            yield "node", el.get("id"), _pop_kind(attrs) or kind, pos, attrs
+        else:
+            yield "link", el.get("source"), el.get("target"), attrs
+        if graph is not None:
+            graph.clear()
+
+
+# ───── Graphviz DOT ─────
+
+_DOT_TOKEN = re.compile(r"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/|^\#[^\n]*)
+  | (?P<str>"(?:[^"\\]|\\.)*")
+  | (?P<html><(?:[^<>]|<[^<>]*>)*>)
+  | (?P<op>--|->|[{}\[\];,=:])
+  | (?P<id>[^\W\d]\w*|-?(?:\.\d+|\d+(?:\.\d*)?))
+""", re.X | re.S | re.M)
+_DOT_KEYWORDS = ("strict", "graph", "digraph", "subgraph", "node", "edge")
+
+
+def _dot_tokens(lines):
+    """(kind, text) tokens; strings and comments may span lines."""
+    buf = ""
+    for line in lines:
+        buf += line
+        pos = 0
+        while pos < len(buf):
+            m = _DOT_TOKEN.match(buf, pos)
+            if m is None:
+                if buf.startswith(('"', "/*", "<"), pos):
+                    break  # continues on the next line
+                pos += 1   # stray character
+                continue
+            pos = m.end()
+            if m.lastgroup == "str":
+                yield "id", m.group()[1:-1].replace('\\"', '"').replace("\\\n", "")
+            elif m.lastgroup == "html":
+                yield "id", m.group()[1:-1]
+            elif m.lastgroup != "skip":
+                yield m.lastgroup, m.group()
+        buf = buf[pos:]
+
+
+def _dot_pos(value):
+    """Graphviz "x,y[!]" (points, y up) -> world coordinates."""
+    try:
+        x, y = value.rstrip("!").split(",")[:2]
+        return float(x), -float(y)
+    except ValueError:
+        return None
+
+
+def parse_dot(reader):
+    """Graphviz graph/digraph: node and edge statements, attribute lists, subgraphs."""
+    tokens = _dot_tokens(reader.lines())
+    back = []            # pushed-back tokens
+    defaults = [{}]      # `node [...]` attributes per { } scope
+    scopes = [{}]        # names used in each open { } scope (ordered): its node set as an edge operand
+    declared = set()     # names that already got their default kind
+
+    def take():
+        return back.pop() if back else next(tokens, (None, None))
+
+    def attr_lists():
+        attrs = {}
+        while True:
+            kind, tok = take()
+            if tok != "[":
+                back.append((kind, tok))
+                return attrs
+            while True:
+                kind, tok = take()
+                if kind is None or tok == "]":
+                    break
+                if kind == "id":
+                    eq = take()
+                    if eq[1] == "=":
+                        attrs[tok] = take()[1]
+                    else:
+                        back.append(eq)
+
+    def operand(kind, tok):
+        """Node id (ports dropped) or a [subgraph [id]] { a b ... } group -> list of names."""
+        if kind == "id" and tok.lower() == "subgraph":
+            kind, tok = take()
+            if kind == "id":  # its name
+                kind, tok = take()
+        if tok == "{":
+            names = {}
+            depth = 1
+            while True:
+                kind, tok = take()
+                if kind is None:
+                    return list(names)
+                if tok == "{":
+                    depth += 1
+                elif tok == "}":
+                    depth -= 1
+                    if not depth:
+                        return list(names)
+                elif kind == "id" and tok.lower() not in _DOT_KEYWORDS:
+                    eq = take()
+                    if eq[1] == "=":  # an attribute (rank=same), not a node
+                        take()
+                    else:
+                        back.append(eq)
+                        names[tok] = None
+        while True:
+            colon = take()
+            if colon[1] != ":":
+                back.append(colon)
+                return [tok]
+            take()
+
+    def node_record(name, attrs):
+        declared.add(name)
+        attrs = dict(attrs)
+        pos = _dot_pos(attrs.pop("pos")) if "pos" in attrs else None
+        kind = _pop_kind(attrs) or _pop_kind(dict(defaults[-1]))
+        return "node", name, kind, pos, attrs
+
+    def statement(chain):
+        """The rest of a node or edge statement whose first operand is chain[0]."""
+        while True:
+            op = take()
+            if op[1] not in ("--", "->"):
+                back.append(op)
+                break
+            chain.append(operand(*take()))
+        attrs = attr_lists()
+        for names in chain:
+            scopes[-1].update(dict.fromkeys(names))
+        if len(chain) == 1:
+            for name in chain[0]:
+                yield node_record(name, attrs)
+            return
+        for names in chain:
+            for name in names:
+                if name not in declared and defaults[-1]:
+                    yield node_record(name, {})
+        for left, right in zip(chain, chain[1:]):
+            for a in left:
+                for b in right:
+                    yield "link", a, b, dict(attrs)
+
+    while True:
+        kind, tok = take()
+        if kind is None:
+            return
+        if kind == "op":
+            if tok == "{":
+                defaults.append(dict(defaults[-1]))
+                scopes.append({})
+            elif tok == "}" and len(defaults) > 1:
+                defaults.pop()
+                names = list(scopes.pop())
+                scopes[-1].update(dict.fromkeys(names))
+                op = take()
+                back.append(op)
+                if op[1] in ("--", "->"):  # {a b} -- c, subgraph s {a b} -- c: the group is the left operand
+                    yield from statement([names])
+            continue
+        if kind != "id":
+            continue
+        word = tok.lower()
+        if word == "strict":
+            continue
+        if word in ("graph", "digraph", "subgraph"):
+            name = take()  # optional graph id
+            if name[0] != "id":
+                back.append(name)
+            if word == "graph":
+                attr_lists()
+            continue
+        if word in ("node", "edge"):
+            attrs = attr_lists()
+            if word == "node":
+                defaults[-1].update(attrs)
+            continue
+
+        nxt = take()
+        if nxt[1] == "=":  # graph attribute: id = id
+            take()
+            continue
+        back.append(nxt)
+        yield from statement([operand(kind, tok)])
+
+
+IMPORT_PARSERS = {"csv": parse_csv, "neighbors": parse_neighbors, "graphml": parse_graphml, "dot": parse_dot}
+
+
+def sniff_import_format(path):
+    """Import format from the file extension, else from the first bytes."""
+    fmt = IMPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt:
+        return fmt
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text.startswith(b"<"):
+        return "graphml"
+    if re.match(rb"(?:strict\s+)?(?:di)?graph\b", text, re.I):
+        return "dot"
+    if re.search(rb"Device[ -]ID|Local Intf|System Name|show (?:lldp|cdp)", head, re.I):
+        return "neighbors"
+    return "csv"
+
+
+class TopologyImporter:
+    """Streams one file into a model, in batches of IMPORT_BATCH records.
+
+    Nodes are matched by name against the model (attrs["name"]), so importing
+    several dumps of the same network merges them; links go through the model's
+    pair index, so a link reported from both ends is added once. run() is a
+    generator that yields the progress stats after every batch, letting a UI
+    interleave the import with event handling.
+    """
+
+    def __init__(self, model, progress=None, batch=IMPORT_BATCH):
+        self.model = model
+        self.progress = progress  # called with stats() after every batch
+        self.batch = batch
+        self.by_name = {a["name"]: n for n, a in model.attrs.items() if "name" in a}
+        self.nodes_added = 0
+        self.links_added = 0
+        self.duplicates = 0
+        self.records = 0
+        self.last_nodes = ()  # ids added by the latest flush
+        self.refined = {}     # node already in the model -> (kind, x, y, attrs) before the import touched it
+        self.last_links = ()
+        self.bytes_read = 0
+        self.bytes_total = 0
+        self.started = None
+
+        # Pending batch: node rows keyed by name (dicts keep insertion order) and links by name
+        self._names = {}
+        self._kinds = []
+        self._xs = []
+        self._ys = []
+        self._attrs = []
+        self._links = []
+        self._link_attrs = []
+
+        # Coordinate-less nodes go on a grid below whatever is already there
+        box = model.bbox()
+        self._origin = (0.0, 0.0) if box is None else (box[0], box[3] + 2 * IMPORT_SPACING)
+        self._placed = 0
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started if self.started is not None else 0.0
+        rate = elapsed and 1 / elapsed
+        return {"bytes": self.bytes_read, "total_bytes": self.bytes_total,
+                "records": self.records, "nodes": self.nodes_added, "links": self.links_added,
+                "duplicates": self.duplicates, "elapsed": elapsed,
+                "bytes_per_s": self.bytes_read * rate, "records_per_s": self.records * rate}
+
+    def run(self, path, fmt=None):
+        parse = IMPORT_PARSERS[fmt or sniff_import_format(path)]
+        self.bytes_total = os.path.getsize(path)
+        self.started = time.perf_counter()
+        with open(path, "rb") as raw:
+            reader = _CountingReader(raw, os.path.splitext(os.path.basename(path))[0])
+            for rec in parse(reader):
+                self.records += 1
+                if rec[0] == "node":
+                    self._node(*rec[1:])
+                else:
+                    self._link(*rec[1:])
+                if len(self._kinds) + len(self._links) >= self.batch:
+                    self.bytes_read = reader.pos
+                    yield self.flush()
+            self.bytes_read = reader.pos
+        yield self.flush()
+
+    def _node(self, name, kind, pos, attrs):
+        model = self.model
+        node = self.by_name.get(name)
+        if node is not None and node in model.nodes:  # already in the model: refine it
+            row = model.nodes[node]
+            if node not in self.refined:
+                old = model.attrs.get(node)
+                self.refined[node] = (model.kinds[row], model.xs[row], model.ys[row], dict(old) if old else None)
+            if kind:
+                model.kinds[row] = NODE_KINDS.index(kind)
+            if pos:
+                model.move_node(node, pos[0] - model.xs[row], pos[1] - model.ys[row])
+            if attrs:
+                model.set_attrs(node, {**model.attrs[node], **attrs})
+            return
+        i = self._names.get(name)
+        if i is None:
+            self._queue(name, kind, pos, attrs)
+            return
+        if kind:
+            self._kinds[i] = NODE_KINDS.index(kind)
+        if pos:
+            self._xs[i], self._ys[i] = pos
+        self._attrs[i].update(attrs)
+
+    def _queue(self, name, kind=None, pos=None, attrs=None):
+        if pos is None:
+            col, row = divmod(self._placed, IMPORT_COLUMNS)[::-1]
+            pos = (self._origin[0] + col * IMPORT_SPACING, self._origin[1] + row * IMPORT_SPACING)
+            self._placed += 1
+        self._names[name] = len(self._kinds)
+        self._kinds.append(NODE_KINDS.index(kind or "router"))
+        self._xs.append(pos[0])
+        self._ys.append(pos[1])
+        self._attrs.append({"name": name, **(attrs or {})})
+
+    def _link(self, a, b, attrs):
+        if a == b:
+            self.duplicates += 1
+            return
+        for name in (a, b):
+            if name not in self._names and self.by_name.get(name) not in self.model.nodes:
+                self._queue(name)
+        self._links.append((a, b))
+        self._link_attrs.append(attrs)
+
+    def refinements(self):
+        """History commands ("kinds", "place", "attrs") that redo what the import changed on existing nodes."""
+        model = self.model
+        rows, attrs = model.nodes, model.attrs
+        refined = [(n, old) for n, old in self.refined.items() if n in rows]
+        cmds = []
+        changed = [(n, old[0], model.kinds[rows[n]]) for n, old in refined if model.kinds[rows[n]] != old[0]]
+        if changed:
+            ids, kinds0, kinds1 = zip(*changed)
+            cmds.append(("kinds", array("q", ids), array("b", kinds0), array("b", kinds1)))
+        moved = [(n, old) for n, old in refined if (model.xs[rows[n]], model.ys[rows[n]]) != old[1:3]]
+        if moved:
+            ids = array("q", (n for n, _old in moved))
+            cmds.append(("place", ids, array("d", (old[1] for _n, old in moved)),
+                         array("d", (old[2] for _n, old in moved)),
+                         array("d", (model.xs[rows[n]] for n in ids)), array("d", (model.ys[rows[n]] for n in ids))))
+        changed = tuple((n, old[3], dict(attrs[n]) if n in attrs else None)
+                        for n, old in refined if old[3] != attrs.get(n))
+        if changed:
+            cmds.append(("attrs", changed))
+        return cmds
+
+    def flush(self):
+        """Hand the pending batch to the model; returns (and reports) the progress stats."""
+        model = self.model
+        self.last_nodes = self.last_links = ()
+        if self._kinds:
+            new = self.last_nodes = model.add_nodes(self._kinds, self._xs, self._ys, self._attrs)
+            self.by_name.update(zip(self._names, new))
+            self.nodes_added += len(new)
+            self._names = {}
+            self._kinds, self._xs, self._ys, self._attrs = [], [], [], []
+        if self._links:
+            by_name = self.by_name
+            new = self.last_links = model.add_links([(by_name[a], by_name[b]) for a, b in self._links],
+                                                    self._link_attrs)
+            self.links_added += len(new)
+            self.duplicates += len(self._links) - len(new)
+            self._links, self._link_attrs = [], []
+        stats = self.stats()
+        if self.progress is not None:
+            self.progress(stats)
+        return stats
+
+
+def import_topology_file(path, model=None, fmt=None, progress=None):
+    """Import a neighbor dump, CSV edge list, GraphML or DOT file into model (a new one by default)."""
+    model = model if model is not None else TopologyModel()
+    for _stats in TopologyImporter(model, progress).run(path, fmt):
+        pass
+    return model
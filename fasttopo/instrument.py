@@ -0,0 +1,220 @@
+"""Latency profiling and input recording / replay support (headless)."""
+
+import collections
+import json
+import math
+import os
+import time
+
+
+# ───────────────── Instrumentation (headless) ─────────────────
+#
+# Opt-in latency profiling. A Profiler wraps callables with timers that feed a
+# per-name log-bucketed histogram (fixed memory, percentiles to within a few
+# percent) and a bounded trace of the individual calls. dump() writes both as
+# one Chrome trace file (chrome://tracing, Perfetto) whose summary holds the
+# percentiles. Nothing is wrapped while profiling is off, so it costs nothing.
+
+PROFILE_ENV = "TOPO_PROFILE"           # "1" or a trace file path turns profiling on at start
+PROFILE_PATH = "topo-profile.json"
+PROFILE_MAX_EVENTS = 500_000           # calls kept for the trace (the histograms keep everything)
+PROFILE_MIN_S = 1e-6                   # histogram range: 1 µs ...
+PROFILE_BUCKETS_PER_OCTAVE = 16        # ... in steps of 2 ** (1/16), about 4.4%
+PROFILE_BUCKETS = 28 * PROFILE_BUCKETS_PER_OCTAVE  # ... up to about 4.5 minutes
+PROFILE_HUD_MS = 500                   # HUD refresh period
+PROFILE_HUD_ROWS = 10                  # handlers listed, slowest p99 first
+
+# TopologyTool methods timed while profiling: event handlers and render passes
+PROFILED_METHODS = (
+    "on_mouse_down", "on_mouse_drag", "on_mouse_up", "on_mouse_move", "on_mouse_wheel", "on_linux_wheel",
+    "on_pan_down", "on_pan_drag", "on_pan_up", "on_escape_to_neutral", "navigate_neighbor", "delete_selected",
+    "undo", "redo", "_apply_zoom", "get_node_at", "get_edge_at", "update_group_selection",
+    "_render_frame", "_recull", "_flush_drag", "update_edges", "_refresh_sites", "_refresh_analysis",
+    "_import_step", "_poll_layout",
+)
+
+
+class Profiler:
+    """Per-name latency histograms, counters and a Chrome trace of instrumented calls."""
+
+    def __init__(self, max_events=PROFILE_MAX_EVENTS):
+        self.stats = {}   # name -> [calls, total_s, max_s, bucket counts]
+        self.events = collections.deque(maxlen=max_events)    # (name, start_s, duration_s)
+        self.counters = collections.deque(maxlen=max_events)  # (name, time_s, {series: value})
+        self.t0 = time.perf_counter()
+
+    def wrap(self, name, fn):
+        """fn, timed under name on every call."""
+        perf = time.perf_counter
+        record = self.record
+
+        def timed(*args, **kwargs):
+            start = perf()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start, perf() - start)
+        timed.__wrapped__ = fn
+        return timed
+
+    def record(self, name, start, duration):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0, [0] * PROFILE_BUCKETS]
+        stat[0] += 1
+        stat[1] += duration
+        if duration > stat[2]:
+            stat[2] = duration
+        bucket = int(math.log2(duration / PROFILE_MIN_S) * PROFILE_BUCKETS_PER_OCTAVE) if duration > PROFILE_MIN_S else 0
+        stat[3][min(bucket, PROFILE_BUCKETS - 1)] += 1
+        self.events.append((name, start, duration))
+
+    def counter(self, name, **values):
+        self.counters.append((name, time.perf_counter(), values))
+
+    def percentile(self, name, q):
+        """Duration (s) under which a fraction q of name's calls finished (bucket upper bound)."""
+        calls, _total, longest, buckets = self.stats[name]
+        rank = q * calls
+        seen = 0
+        for i, count in enumerate(buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(PROFILE_MIN_S * 2 ** ((i + 1) / PROFILE_BUCKETS_PER_OCTAVE), longest)
+        return longest
+
+    def summary(self):
+        """{name: {calls, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}, slowest p99 first."""
+        out = {}
+        for name, (calls, total, longest, _buckets) in self.stats.items():
+            out[name] = {"calls": calls, "mean_ms": 1000 * total / calls,
+                         **{f"p{round(q * 100)}_ms": 1000 * self.percentile(name, q) for q in (0.5, 0.95, 0.99)},
+                         "max_ms": 1000 * longest}
+        return dict(sorted(out.items(), key=lambda item: item[1]["p99_ms"], reverse=True))
+
+    def dump(self, path):
+        """Write the Chrome trace (calls as complete events, counters as counter events) plus the summary."""
+        pid = os.getpid()
+        t0 = self.t0
+        events = [{"name": name, "ph": "X", "ts": (start - t0) * 1e6, "dur": duration * 1e6, "pid": pid, "tid": 1}
+                  for name, start, duration in self.events]
+        events += [{"name": name, "ph": "C", "ts": (t - t0) * 1e6, "args": values, "pid": pid, "tid": 1}
+                   for name, t, values in self.counters]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary()}, f)
+        os.replace(tmp, path)
+
+
+# ───────────────── Input recording (headless) ─────────────────
+#
+# A recording is JSON lines: a header object, then one [t, target, sequence,
+# x, y, delta] array per input event and a [t] marker per rendered frame, then
+# a trailer object with the final state digest. t is seconds since recording
+# began, target "root" or "canvas", sequence the Tk binding that fired. Drag
+# motion reaches the model at frame time, so replay runs frames exactly where
+# the markers are; the same session then ends in the same state, which makes a
+# recording both a repeatable benchmark and a correctness check.
+
+RECORD_VERSION = 1
+RECORD_PATH = "topo-input.jsonl"
+RECORD_SKIP = ("<F9>", "<F12>")  # tooling keys (recording, profiling): not part of the session
+RECORD_SLOWEST = 10              # slowest events listed in a replay report
+
+
+class RecordedEvent:
+    """What a replayed handler gets in place of the Tk event: the fields handlers read."""
+
+    __slots__ = ("x", "y", "delta")
+
+    def __init__(self, x=0, y=0, delta=0):
+        self.x = x
+        self.y = y
+        self.delta = delta
+
+
+def _event_number(value):
+    return value if isinstance(value, (int, float)) else 0  # Tk reports "??" for fields an event lacks
+
+
+class InputRecorder:
+    """Writes the events reaching the handlers it wraps to a recording file."""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.count = 0
+        self.t0 = time.perf_counter()
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({"version": RECORD_VERSION, **header})
+
+    def _write(self, item):
+        self._file.write(json.dumps(item, separators=(",", ":")) + "\n")
+
+    def _now(self):
+        return round(time.perf_counter() - self.t0, 6)
+
+    def wrap(self, target, sequence, fn):
+        """fn, with every event it receives written down first."""
+        def recorded(event):
+            self._write([self._now(), target, sequence, _event_number(event.x), _event_number(event.y),
+                         _event_number(getattr(event, "delta", 0))])
+            self.count += 1
+            return fn(event)
+        recorded.__wrapped__ = fn
+        return recorded
+
+    def frame(self, fn):
+        """fn (the frame flush), marked in the recording each time it runs."""
+        def marked():
+            self._write([self._now()])
+            return fn()
+        marked.__wrapped__ = fn
+        return marked
+
+    def close(self, trailer):
+        self._write(trailer)
+        self._file.close()
+
+
+def read_recording(path):
+    """(header, [(t, target, sequence, RecordedEvent)], trailer) from a recording file.
+
+    Frame markers come back as (t, None, None, None). A recording cut short by a
+    crash replays up to its last whole line, with an empty trailer.
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    try:
+        header = json.loads(lines[0]) if lines else None
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or "version" not in header:
+        raise ValueError("not an input recording")
+    if header["version"] > RECORD_VERSION:
+        raise ValueError(f"recording version {header['version']} is newer than this tool ({RECORD_VERSION})")
+    events = []
+    trailer = {}
+    for line in lines[1:]:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            break
+        if isinstance(item, dict):
+            trailer = item
+            break
+        if len(item) == 1:
+            events.append((item[0], None, None, None))
+        else:
+            t, target, sequence, x, y, delta = item
+            events.append((t, target, sequence, RecordedEvent(x, y, delta)))
+    return header, events, trailer
+
+
+def latency_summary(durations_ms):
+    """{count, mean, p50, p95, p99, max} of a list of latencies (ms), exact rather than bucketed."""
+    ms = sorted(durations_ms)
+    if not ms:
+        return {"count": 0}
+    return {"count": len(ms), "mean": sum(ms) / len(ms),
+            **{f"p{round(q * 100)}": ms[min(len(ms) - 1, int(q * len(ms)))] for q in (0.5, 0.95, 0.99)},
+            "max": ms[-1]}
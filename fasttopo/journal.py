@@ -0,0 +1,374 @@
+"""Crash-safe autosave: an append-only journal of History steps over a snapshot."""
+
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # Windows: byte-range locks through msvcrt instead
+    fcntl = None
+    import msvcrt
+
+from .model import TopologyModel, apply_command
+from .files import load_snapshot, save_snapshot
+
+
+# ───────────────── Journal (headless, crash-safe autosave) ─────────────────
+#
+# A directory holding one snapshot, autosave-<generation>.topo, and autosave.journal:
+#   header   JOURNAL_HEADER (generation of the snapshot the records apply to; 0: empty model)
+#   records  JOURNAL_RECORD + payload: one History step (command and direction) each
+# The Journal thread appends records and fsyncs them in batches, replaying each one
+# on its own replica of the model. Once the journal outgrows JOURNAL_COMPACT_BYTES
+# the replica becomes the next snapshot and the journal starts over, so recovery
+# is one snapshot load plus a bounded replay. A record torn by a crash fails its
+# CRC and is dropped, along with anything after it.
+#
+# One process at a time owns a directory: it holds an exclusive lock on its
+# autosave.lock for as long as it journals there (see lock_journal). A journal
+# or snapshot that cannot be recovered is renamed to <name>.corrupt-<time>
+# rather than overwritten by the next session (see set_aside_journal).
+
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".fast-topo-drawer")
+JOURNAL_NAME = "autosave.journal"
+JOURNAL_LOCK = "autosave.lock"
+JOURNAL_MAGIC = b"TOPJ"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sHHQ")  # magic, version, flags, snapshot generation
+JOURNAL_RECORD = struct.Struct("<IIB")    # payload bytes, CRC-32 of the payload, forward (1) or undo (0)
+JOURNAL_SYNC_S = 0.25                     # one fsync per this long at most; records arriving meanwhile share it
+JOURNAL_COMPACT_BYTES = 4 * 2 ** 20       # journal size that triggers a new snapshot
+
+_VALUE_LEN = struct.Struct("<I")
+_VALUE_INT = struct.Struct("<q")
+_VALUE_FLOAT = struct.Struct("<d")
+
+
+def _pack_value(out, value):
+    """Append the tagged encoding of one command part to the list out."""
+    if value is None:
+        out.append(b"N")
+    elif isinstance(value, int):
+        out.append(b"i" + _VALUE_INT.pack(value))
+    elif isinstance(value, float):
+        out.append(b"f" + _VALUE_FLOAT.pack(value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(b"s" + _VALUE_LEN.pack(len(data)) + data)
+    elif isinstance(value, bytes):
+        out.append(b"b" + _VALUE_LEN.pack(len(value)) + value)
+    elif isinstance(value, array):
+        if sys.byteorder != "little":
+            value = array(value.typecode, value)
+            value.byteswap()
+        out.append(b"a" + value.typecode.encode("ascii") + _VALUE_LEN.pack(len(value)) + value.tobytes())
+    elif isinstance(value, tuple):
+        out.append(b"t" + _VALUE_LEN.pack(len(value)))
+        for part in value:
+            _pack_value(out, part)
+    elif isinstance(value, dict) and all(type(k) is int for k in value):  # {id: attrs} from take_rows
+        out.append(b"d" + _VALUE_LEN.pack(len(value)))
+        for key, part in value.items():
+            out.append(_VALUE_INT.pack(key))
+            _pack_value(out, part)
+    elif isinstance(value, dict):
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        out.append(b"j" + _VALUE_LEN.pack(len(data)) + data)
+    else:
+        raise TypeError(f"cannot journal {type(value).__name__}")
+
+
+def _unpack_value(buf, off):
+    """Inverse of _pack_value: (value, offset after it)."""
+    tag = buf[off:off + 1]
+    off += 1
+    if tag == b"N":
+        return None, off
+    if tag == b"i":
+        return _VALUE_INT.unpack_from(buf, off)[0], off + 8
+    if tag == b"f":
+        return _VALUE_FLOAT.unpack_from(buf, off)[0], off + 8
+    if tag == b"t":
+        count = _VALUE_LEN.unpack_from(buf, off)[0]
+        off += 4
+        parts = []
+        for _ in range(count):
+            part, off = _unpack_value(buf, off)
+            parts.append(part)
+        return tuple(parts), off
+    if tag == b"d":
+        count = _VALUE_LEN.unpack_from(buf, off)[0]
+        off += 4
+        out = {}
+        for _ in range(count):
+            key = _VALUE_INT.unpack_from(buf, off)[0]
+            out[key], off = _unpack_value(buf, off + 8)
+        return out, off
+    if tag == b"a":
+        col = array(buf[off:off + 1].decode("ascii"))
+        count = _VALUE_LEN.unpack_from(buf, off + 1)[0]
+        off += 5
+        end = off + count * col.itemsize
+        col.frombytes(buf[off:end])
+        if sys.byteorder != "little":
+            col.byteswap()
+        return col, end
+    count = _VALUE_LEN.unpack_from(buf, off)[0]
+    data = buf[off + 4:off + 4 + count]
+    off += 4 + count
+    if tag == b"b":
+        return bytes(data), off
+    if tag == b"s":
+        return data.decode("utf-8"), off
+    if tag == b"j":
+        return json.loads(data), off
+    raise ValueError(f"bad journal value tag {tag!r}")
+
+
+def _encode_record(cmd, forward):
+    if forward and cmd[0] == "clear":
+        cmd = ("clear", None, cmd[2])  # replaying a clear needs none of the rows it wiped
+    out = []
+    _pack_value(out, cmd)
+    payload = b"".join(out)
+    return JOURNAL_RECORD.pack(len(payload), zlib.crc32(payload), forward) + payload
+
+
+def read_journal(data):
+    """Parse journal bytes: (generation, [(cmd, forward), ...]), stopping at a torn record."""
+    if len(data) < JOURNAL_HEADER.size:
+        raise ValueError("not a topology journal")
+    magic, version, _flags, generation = JOURNAL_HEADER.unpack_from(data, 0)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError("not a topology journal")
+    if version > JOURNAL_VERSION:
+        raise ValueError(f"journal version {version} is newer than this tool ({JOURNAL_VERSION})")
+    records = []
+    off = JOURNAL_HEADER.size
+    view = memoryview(data)
+    while off + JOURNAL_RECORD.size <= len(data):
+        length, crc, forward = JOURNAL_RECORD.unpack_from(data, off)
+        start = off + JOURNAL_RECORD.size
+        payload = view[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append((_unpack_value(bytes(payload), 0)[0], bool(forward)))
+        off = start + length
+    return generation, records
+
+
+def _journal_snapshot(directory, generation):
+    return os.path.join(directory, f"autosave-{generation}.topo")
+
+
+def recover_journal(directory, model=None):
+    """Rebuild the autosaved topology in directory (None if nothing was saved there)."""
+    try:
+        with open(os.path.join(directory, JOURNAL_NAME), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    generation, records = read_journal(data)
+    model = model if model is not None else TopologyModel()
+    if generation:
+        load_snapshot(_journal_snapshot(directory, generation), model)
+    else:
+        model.clear()
+    for cmd, forward in records:
+        apply_command(model, cmd, forward)
+    return model
+
+
+def lock_journal(directory):
+    """Lock directory for this process; the open lock file (close it to unlock), or None if another holds it."""
+    os.makedirs(directory, exist_ok=True)
+    f = open(os.path.join(directory, JOURNAL_LOCK), "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def set_aside_journal(directory):
+    """Rename the journal and snapshots in directory to *.corrupt-<time>; returns the new paths."""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    moved = []
+    for name in sorted(os.listdir(directory)):
+        if name == JOURNAL_NAME or (name.startswith("autosave-") and name.endswith(".topo")):
+            path = os.path.join(directory, name)
+            moved.append(f"{path}.corrupt-{stamp}")
+            os.replace(path, moved[-1])
+    return moved
+
+
+def _model_state(model):
+    """Copies of everything a model is rebuilt from; cheap enough to take on the UI thread."""
+    return (tuple(array(col.typecode, col) for col in model._columns()), dict(model.links),
+            {n: dict(a) for n, a in model.attrs.items()}, {ln: dict(a) for ln, a in model.link_attrs.items()},
+            model.node_seq, model._next_node_id, model._next_link_id)
+
+
+def _model_from_state(state):
+    columns, links, attrs, link_attrs, node_seq, next_node, next_link = state
+    model = TopologyModel()
+    model.ids, model.xs, model.ys, model.kinds, model.seqs = columns
+    model.links = links
+    model.attrs = attrs
+    model.link_attrs = link_attrs
+    model.node_seq = node_seq
+    model._next_node_id = next_node
+    model._next_link_id = next_link
+    model.rebuild_indexes()
+    return model
+
+
+class Journal:
+    """Append-only change log of one model, written to directory by a background thread.
+
+    append() only queues the command (History.listener calls it after every
+    step), so the UI never waits on the disk; encoding, writing, fsync and
+    compaction all happen on the journal thread. Failures end journaling and
+    are kept in .error.
+    """
+
+    def __init__(self, directory, sync_s=JOURNAL_SYNC_S, compact_bytes=JOURNAL_COMPACT_BYTES, lock=None):
+        self.directory = directory
+        self.lock = lock      # the lock_journal file, released by close()
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self.sync_s = sync_s
+        self.compact_bytes = compact_bytes
+        self.generation = 0
+        self.replica = None   # the journal thread's copy of the model (what the next snapshot saves)
+        self.error = None
+        self._file = None
+        self._size = 0
+        self._queue = queue.SimpleQueue()  # (cmd, forward) | (state, None) rebase | Event (flush) | None (close)
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+
+    def start(self, model):
+        """Begin journaling model; its current state is saved as the first snapshot."""
+        self.rebase(model)
+        self._thread.start()
+        return self
+
+    def append(self, cmd, forward=True):
+        if self.error is None:
+            self._queue.put((cmd, forward))
+
+    def rebase(self, model):
+        """Model was replaced or edited outside History: snapshot it and start a fresh journal."""
+        if self.error is None:
+            self._queue.put((_model_state(model), None))
+
+    def flush(self, timeout=None):
+        """Wait until everything appended so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) if self._thread.is_alive() else False
+
+    def close(self):
+        self._queue.put(None)
+        if self._thread.is_alive():
+            self._thread.join()
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    def _run(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                with open(self.path, "rb") as f:
+                    self.generation = read_journal(f.read(JOURNAL_HEADER.size))[0]
+            except (OSError, ValueError):
+                self.generation = 0
+            while self._write(self._batch()):
+                pass
+        except Exception as e:  # a worker thread has nobody to raise to: the owner reads .error
+            self.error = e
+        finally:
+            if self._file is not None:
+                self._file.close()
+            while True:  # nobody may be left waiting on a flush
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _batch(self):
+        """Block for the next item, then gather what arrives within sync_s (one fsync for all)."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.sync_s
+        while batch[-1] is not None and not isinstance(batch[-1], threading.Event):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        flushed = []
+        for item in batch:
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                flushed.append(item)
+                continue
+            cmd, forward = item
+            if forward is None:
+                self.replica = _model_from_state(cmd)
+                self._compact()
+                continue
+            apply_command(self.replica, cmd, forward)
+            record = _encode_record(cmd, forward)
+            self._file.write(record)
+            self._size += len(record)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._size > self.compact_bytes:
+            self._compact()
+        for done in flushed:
+            done.set()
+        return batch[-1] is not None
+
+    def _compact(self):
+        """Save the replica as the next snapshot, then switch to an empty journal on top of it."""
+        generation = self.generation + 1
+        snapshot = _journal_snapshot(self.directory, generation)
+        save_snapshot(self.replica, snapshot)
+        with open(snapshot, "rb") as f:
+            os.fsync(f.fileno())
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0, generation))
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+        os.replace(tmp, self.path)  # the switch: until here recovery uses the previous pair
+        self._file = open(self.path, "ab")
+        self._size = JOURNAL_HEADER.size
+        if self.generation:
+            try:
+                os.remove(_journal_snapshot(self.directory, self.generation))
+            except FileNotFoundError:
+                pass
+        self.generation = generation
@@ -0,0 +1,426 @@
+"""Auto-layouts (force-directed, layered, radial) and the worker thread that runs them."""
+
+import math
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized paths fall back to pure Python
+    np = None
+
+from .model import NODE_RADIUS
+
+
+# ───────────────── Layout (headless) ─────────────────
+#
+# Layouts work on a snapshot of the model taken by LayoutJob: node rows, their
+# positions, links as pairs of rows and a pinned flag per row (attrs["pinned"]).
+# Each layout is a generator yielding (xs, ys) as it improves, so a worker
+# thread can hand intermediate positions to the UI. Pinned rows never move.
+
+LAYOUT_EDGE = 5 * NODE_RADIUS      # ideal link length
+LAYOUT_ITERATIONS = 300            # force-directed iterations from a cold start (warm starts run a fifth)
+LAYOUT_GRAVITY = 0.1               # pull toward the centroid; keeps disconnected parts together
+LAYOUT_LAYER_GAP = 8 * NODE_RADIUS
+LAYOUT_NODE_GAP = 4 * NODE_RADIUS
+LAYOUT_RING_GAP = 8 * NODE_RADIUS
+LAYOUT_COMPONENT_GAP = 8 * NODE_RADIUS
+LAYOUT_MAX_DEPTH = 10              # finest Barnes-Hut grid level (4 ** depth cells)
+LAYOUT_POLL_MS = 200               # how often the UI picks up positions from the worker
+
+
+def _bh_interaction_masks(size):
+    """Per offset: which cells of a size x size level may use it (parents adjacent, cells not)."""
+    even = np.arange(size) % 2 == 0
+    out = []
+    for oy in range(-3, 4):
+        for ox in range(-3, 4):
+            if max(abs(ox), abs(oy)) < 2:
+                continue  # neighbors: handled one level finer (or directly at the finest level)
+            # |((i + o) >> 1) - (i >> 1)| <= 1  <=>  o in [-2, 3] for even i, [-3, 2] for odd i
+            mx = np.where(even, -2 <= ox <= 3, -3 <= ox <= 2)
+            my = np.where(even, -2 <= oy <= 3, -3 <= oy <= 2)
+            out.append((ox, oy, my[:, None] & mx[None, :]))
+    return out
+
+
+def _repulsion_np(x, y):
+    """Sum over j of (p_i - p_j) / |p_i - p_j|^2 for every node, in O(N log N).
+
+    Barnes-Hut on a uniform quadtree: on every level a node feels the cells of
+    its interaction list (children of its parent's neighbors that are not its
+    own neighbors) through their mass and center of mass; the field is taken
+    at the center of mass of the node's own cell. Nodes in neighboring cells
+    of the finest level interact directly.
+    """
+    n = len(x)
+    x0, y0 = x.min(), y.min()
+    span = max(x.max() - x0, y.max() - y0) * (1 + 1e-9) + 1e-9
+    depth = int(min(LAYOUT_MAX_DEPTH, max(2, math.ceil(math.log(max(n, 2) / 2, 4)))))
+    size = 1 << depth
+    ix = np.minimum(((x - x0) / span * size).astype(np.intp), size - 1)
+    iy = np.minimum(((y - y0) / span * size).astype(np.intp), size - 1)
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+
+    # Far field, level by level
+    for level in range(2, depth + 1):
+        g = 1 << level
+        shift = depth - level
+        cx, cy = ix >> shift, iy >> shift
+        flat = cy * g + cx
+        mass = np.bincount(flat, minlength=g * g).reshape(g, g).astype(float)
+        occupied = np.maximum(mass, 1.0)
+        comx = np.bincount(flat, weights=x, minlength=g * g).reshape(g, g) / occupied
+        comy = np.bincount(flat, weights=y, minlength=g * g).reshape(g, g) / occupied
+        min_d2 = (span / g) ** 2
+        cfx = np.zeros((g, g))
+        cfy = np.zeros((g, g))
+        for ox, oy, mask in _bh_interaction_masks(g):
+            sy = slice(max(0, -oy), min(g, g - oy))
+            sx = slice(max(0, -ox), min(g, g - ox))
+            ty = slice(max(0, oy), min(g, g + oy))
+            tx = slice(max(0, ox), min(g, g + ox))
+            dx = comx[sy, sx] - comx[ty, tx]
+            dy = comy[sy, sx] - comy[ty, tx]
+            w = mass[ty, tx] * mask[sy, sx] / np.maximum(dx * dx + dy * dy, min_d2)
+            cfx[sy, sx] += w * dx
+            cfy[sy, sx] += w * dy
+        fx += cfx[cy, cx]
+        fy += cfy[cy, cx]
+
+    # Near field: every pair of nodes in the same or adjacent finest cells
+    flat = iy * size + ix
+    order = np.argsort(flat, kind="stable")
+    counts = np.bincount(flat, minlength=size * size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    for oy in (-1, 0, 1):
+        for ox in (-1, 0, 1):
+            tx, ty = ix + ox, iy + oy
+            ok = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+            src = np.flatnonzero(ok)
+            cell = ty[src] * size + tx[src]
+            cnt = counts[cell]
+            if not cnt.any():
+                continue
+            i = np.repeat(src, cnt)
+            first = np.repeat(np.cumsum(cnt) - cnt, cnt)
+            j = order[np.repeat(starts[cell], cnt) + np.arange(len(i)) - first]
+            keep = i != j
+            i, j = i[keep], j[keep]
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            d2 = np.maximum(dx * dx + dy * dy, 1e-6)
+            fx += np.bincount(i, weights=dx / d2, minlength=n)
+            fy += np.bincount(i, weights=dy / d2, minlength=n)
+    return fx, fy
+
+
+def _repulsion_py(xs, ys, cutoff):
+    """Pure-Python fallback: exact repulsion, but only between nodes closer than cutoff."""
+    n = len(xs)
+    cells = {}
+    for i in range(n):
+        cells.setdefault((int(xs[i] // cutoff), int(ys[i] // cutoff)), []).append(i)
+    fx = [0.0] * n
+    fy = [0.0] * n
+    c2 = cutoff * cutoff
+    for (cx, cy), members in cells.items():
+        near = [j for oy in (-1, 0, 1) for ox in (-1, 0, 1) for j in cells.get((cx + ox, cy + oy), ())]
+        for i in members:
+            xi, yi = xs[i], ys[i]
+            ax = ay = 0.0
+            for j in near:
+                dx, dy = xi - xs[j], yi - ys[j]
+                d2 = dx * dx + dy * dy
+                if 0 < d2 < c2:
+                    ax += dx / d2
+                    ay += dy / d2
+                elif d2 == 0 and i != j:
+                    ax += (i - j) * 1e-3  # coincident nodes: nudge apart deterministically
+            fx[i], fy[i] = ax, ay
+    return fx, fy
+
+
+def force_layout(xs, ys, ei, ej, pinned, warm=False, iterations=None):
+    """Fruchterman-Reingold style spring embedder, starting from the given positions.
+
+    Repulsion is Barnes-Hut with NumPy and a distance cutoff without it.
+    A warm start only refines: it runs fewer iterations at a low temperature,
+    so a re-layout after small edits keeps the picture the user knows.
+    """
+    n = len(xs)
+    if n == 0:
+        return
+    k = LAYOUT_EDGE
+    k2 = k * k
+    if iterations is None:
+        iterations = LAYOUT_ITERATIONS // 5 if warm else LAYOUT_ITERATIONS
+    temp = k / 2 if warm else k * max(1.0, math.sqrt(n)) / 4
+    cool = (0.02 * k / temp) ** (1 / max(iterations, 1))
+    free = [not p for p in pinned]
+    if not warm:
+        # Random or grid-imported positions fold the drawing; BFS rings start it untangled
+        for xs, ys in radial_layout(xs, ys, ei, ej, pinned):
+            pass
+
+    if np is not None:
+        x = np.array(xs, dtype=float)
+        y = np.array(ys, dtype=float)
+        a = np.asarray(ei, dtype=np.intp)
+        b = np.asarray(ej, dtype=np.intp)
+        movable = np.array(free, dtype=bool)
+        for _ in range(iterations):
+            fx, fy = _repulsion_np(x, y)
+            fx *= k2
+            fy *= k2
+            dx, dy = x[b] - x[a], y[b] - y[a]
+            pull = np.hypot(dx, dy) / k
+            fx += np.bincount(a, weights=dx * pull, minlength=n) - np.bincount(b, weights=dx * pull, minlength=n)
+            fy += np.bincount(a, weights=dy * pull, minlength=n) - np.bincount(b, weights=dy * pull, minlength=n)
+            fx -= LAYOUT_GRAVITY * (x - x.mean())
+            fy -= LAYOUT_GRAVITY * (y - y.mean())
+            length = np.maximum(np.hypot(fx, fy), 1e-9)
+            step = np.minimum(length, temp) / length * movable
+            x += fx * step
+            y += fy * step
+            temp *= cool
+            yield x.copy(), y.copy()
+        return
+
+    x = list(map(float, xs))
+    y = list(map(float, ys))
+    for _ in range(iterations):
+        fx, fy = _repulsion_py(x, y, 3 * k)
+        for i in range(n):
+            fx[i] *= k2
+            fy[i] *= k2
+        for i, j in zip(ei, ej):
+            dx, dy = x[j] - x[i], y[j] - y[i]
+            pull = math.hypot(dx, dy) / k
+            fx[i] += dx * pull
+            fy[i] += dy * pull
+            fx[j] -= dx * pull
+            fy[j] -= dy * pull
+        mx, my = sum(x) / n, sum(y) / n
+        for i in range(n):
+            if not free[i]:
+                continue
+            gx = fx[i] - LAYOUT_GRAVITY * (x[i] - mx)
+            gy = fy[i] - LAYOUT_GRAVITY * (y[i] - my)
+            length = math.hypot(gx, gy)
+            if length > 0:
+                s = min(length, temp) / length
+                x[i] += gx * s
+                y[i] += gy * s
+        temp *= cool
+        yield list(x), list(y)
+
+
+def _components(n, adj):
+    """Connected components as lists of rows, largest first."""
+    seen = [False] * n
+    out = []
+    for s in range(n):
+        if seen[s]:
+            continue
+        seen[s] = True
+        comp = [s]
+        for u in comp:
+            for v in adj[u]:
+                if not seen[v]:
+                    seen[v] = True
+                    comp.append(v)
+        out.append(comp)
+    out.sort(key=len, reverse=True)
+    return out
+
+
+def _adjacency(n, ei, ej):
+    adj = [[] for _ in range(n)]
+    for i, j in zip(ei, ej):
+        adj[i].append(j)
+        adj[j].append(i)
+    return adj
+
+
+def _bfs_depths(adj, roots):
+    depth = {r: 0 for r in roots}
+    frontier = list(roots)
+    while frontier:
+        nxt = []
+        for u in frontier:
+            for v in adj[u]:
+                if v not in depth:
+                    depth[v] = depth[u] + 1
+                    nxt.append(v)
+        frontier = nxt
+    return depth
+
+
+def layered_layout(xs, ys, ei, ej, pinned):
+    """Spine/leaf style layers: the best-connected nodes on top, then by hop count.
+
+    Within a layer nodes are ordered by the mean position of their neighbors in
+    the layer above, then once more against the layer below (barycenter sweeps).
+    """
+    n = len(xs)
+    adj = _adjacency(n, ei, ej)
+    x = list(map(float, xs))
+    y = list(map(float, ys))
+    left = 0.0
+    for comp in _components(n, adj):
+        top = max(len(adj[u]) for u in comp)
+        depth = _bfs_depths(adj, [u for u in comp if len(adj[u]) == top])
+        layers = [[] for _ in range(max(depth.values()) + 1)]
+        for u in comp:
+            layers[depth[u]].append(u)
+        layers[0].sort(key=lambda u: xs[u])
+        slot = {u: i for i, u in enumerate(layers[0])}
+        for sweep in (range(1, len(layers)), range(len(layers) - 2, -1, -1)):
+            for d in sweep:
+                ref = d - 1 if sweep.step > 0 else d + 1
+
+                def bary(u):
+                    near = [slot[v] for v in adj[u] if depth[v] == ref]
+                    return sum(near) / len(near) if near else slot.get(u, 0)
+                layers[d].sort(key=bary)
+                slot.update((u, i) for i, u in enumerate(layers[d]))
+        width = max(len(layer) for layer in layers) - 1
+        for d, layer in enumerate(layers):
+            pad = (width - (len(layer) - 1)) / 2
+            for i, u in enumerate(layer):
+                if not pinned[u]:
+                    x[u] = left + (pad + i) * LAYOUT_NODE_GAP
+                    y[u] = d * LAYOUT_LAYER_GAP
+        left += width * LAYOUT_NODE_GAP + LAYOUT_COMPONENT_GAP
+    yield x, y
+
+
+def radial_layout(xs, ys, ei, ej, pinned, root=None):
+    """Rings of hop distance around a root (the best-connected node by default).
+
+    Each subtree of the BFS tree gets an angular wedge proportional to its
+    number of leaves, so branches do not interleave.
+    """
+    n = len(xs)
+    adj = _adjacency(n, ei, ej)
+    x = list(map(float, xs))
+    y = list(map(float, ys))
+    left = 0.0
+    for comp in _components(n, adj):
+        r0 = root if root is not None and root in comp else max(comp, key=lambda u: len(adj[u]))
+        parent = {r0: None}
+        order = [r0]
+        for u in order:
+            for v in adj[u]:
+                if v not in parent:
+                    parent[v] = u
+                    order.append(v)
+        children = {u: [] for u in order}
+        for u in order[1:]:
+            children[parent[u]].append(u)
+        leaves = {}
+        for u in reversed(order):
+            leaves[u] = sum(leaves[c] for c in children[u]) or 1
+        depth = {r0: 0}
+        for u in order[1:]:
+            depth[u] = depth[parent[u]] + 1
+        per_ring = {}
+        for u in order:
+            per_ring[depth[u]] = per_ring.get(depth[u], 0) + 1
+        radius = [0.0]
+        for d in range(1, max(per_ring) + 1):
+            radius.append(max(radius[-1] + LAYOUT_RING_GAP, per_ring[d] * LAYOUT_NODE_GAP / (2 * math.pi)))
+        wedge = {r0: (0.0, 2 * math.pi)}
+        for u in order:
+            lo, hi = wedge[u]
+            for c in children[u]:
+                share = (hi - lo) * leaves[c] / leaves[u]
+                wedge[c] = (lo, lo + share)
+                lo += share
+        cx = left + radius[-1]
+        for u in order:
+            if pinned[u]:
+                continue
+            lo, hi = wedge[u]
+            a = (lo + hi) / 2
+            x[u] = cx + radius[depth[u]] * math.cos(a)
+            y[u] = radius[depth[u]] * math.sin(a)
+        left = cx + radius[-1] + LAYOUT_COMPONENT_GAP
+    yield x, y
+
+
+LAYOUTS = {"force": force_layout, "layered": layered_layout, "radial": radial_layout}
+
+
+class LayoutJob:
+    """Runs one layout over a snapshot of the model on a worker thread.
+
+    The snapshot is taken on the calling (UI) thread, so the worker never
+    touches the live model; the UI polls take() for the newest positions and
+    writes them back with TopologyModel.set_positions.
+    """
+
+    def __init__(self, model, algorithm, **options):
+        self.algorithm = algorithm
+        self.options = options
+        self.ids = array("q", model.ids)
+        self.xs = array("d", model.xs)
+        self.ys = array("d", model.ys)
+        rows = model.nodes
+        self.ei = array("q", (rows[a] for a, _b in model.links.values()))
+        self.ej = array("q", (rows[b] for _a, b in model.links.values()))
+        self.pinned = [False] * len(self.ids)
+        for node, attrs in model.attrs.items():
+            if attrs.get("pinned"):
+                self.pinned[rows[node]] = True
+        if "root" in options and options["root"] is not None:
+            options["root"] = rows[options["root"]]
+        self.done = False
+        self.error = None
+        self._latest = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"layout-{algorithm}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for xs, ys in LAYOUTS[self.algorithm](self.xs, self.ys, self.ei, self.ej, self.pinned, **self.options):
+                with self._lock:
+                    self._latest = (xs, ys)
+                if self._stop.is_set():
+                    break
+        except Exception as e:  # a worker thread has nobody to raise to: the UI reads .error
+            self.error = e
+        self.done = True
+
+    def take(self):
+        """Newest positions since the last call, or None."""
+        with self._lock:
+            latest, self._latest = self._latest, None
+        return latest
+
+    def cancel(self):
+        self._stop.set()
+
+    def run(self):
+        """Run synchronously (headless use); returns the final positions."""
+        self._run()
+        if self.error is not None:
+            raise self.error
+        return self.take()
+
+
+def apply_layout(model, algorithm="force", **options):
+    """Lay out model in place on the calling thread."""
+    job = LayoutJob(model, algorithm, **options)
+    final = job.run()
+    if final is not None:
+        model.set_positions(job.ids, *final)
+    return model
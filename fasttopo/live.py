@@ -0,0 +1,189 @@
+"""Live link/node state events read from a file, a UNIX socket or stdin."""
+
+import json
+import os
+import socket
+import sys
+import threading
+
+
+# ───────────────── Live state (headless) ─────────────────
+#
+# State events, one per line, as JSON or as words:
+#   {"link": ["r1", "r2"], "state": "down"}     link r1 r2 down
+#   {"link": ["r1", "r2"], "util": 0.93}        link r1 r2 up 0.93
+#   {"node": "r1", "state": "flapping"}         node r1 flapping
+# Ends are node names (attrs["name"]) or ids; a link is matched by its
+# unordered pair of ends. A LiveFeed reads events from a file (followed like
+# tail -f), a UNIX socket ("unix:PATH") or stdin ("-") on its own thread and
+# keeps only the latest state of each link and node until the UI takes them.
+
+LIVE_STATES = ("up", "down", "flapping")
+LIVE_READ_BYTES = 1 << 16   # read size; all whole lines of a read are merged under one lock
+LIVE_POLL_S = 0.1           # idle wait of a followed file, and the socket read timeout
+LIVE_RETRY_S = 1.0          # wait before reconnecting to a UNIX socket
+
+
+def parse_live_event(line):
+    """("link", (a, b), state, util) or ("node", a, state, util); ValueError if line is no event.
+
+    Ends come back as strings, a link's in sorted order; state or util is
+    None when the event leaves it out.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        event = json.loads(line)
+        state, util = event.get("state"), event.get("util")
+        if "link" in event:
+            kind, ends = "link", event["link"]
+        elif "node" in event:
+            kind, ends = "node", [event["node"]]
+        else:
+            raise ValueError("event names neither a link nor a node")
+    else:
+        words = line.split()
+        kind = words[0] if words else None
+        count = 2 if kind == "link" else 1
+        if kind not in ("link", "node") or not count + 2 <= len(words) <= count + 3:
+            raise ValueError(f"not a state event: {line[:40]!r}")
+        ends = words[1:1 + count]
+        state = words[1 + count]
+        util = words[2 + count] if len(words) > 2 + count else None
+    if kind == "link" and (not isinstance(ends, list) or len(ends) != 2):
+        raise ValueError("a link event needs two ends")
+    if state is not None and state not in LIVE_STATES:
+        raise ValueError(f"unknown state {state!r}")
+    if util is not None:
+        util = float(util)
+    if kind == "node":
+        return kind, str(ends[0]), state, util
+    a, b = str(ends[0]), str(ends[1])
+    return kind, ((a, b) if a <= b else (b, a)), state, util
+
+
+def merge_live(states, key, state, util):
+    """Record an event in states; a field it leaves out (None) keeps its last value."""
+    old = states.get(key)
+    if old is not None:
+        state = old[0] if state is None else state
+        util = old[1] if util is None else util
+    states[key] = (state, util)
+
+
+class LiveFeed:
+    """Link and node state events from a file, UNIX socket or stdin, coalesced on a reader thread.
+
+    The thread parses whole reads and merges them into the pending batch under
+    one lock acquisition; take() hands the batch over. However fast events
+    arrive, the UI then restyles each changed element at most once per poll.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.received = 0   # events merged
+        self.rejected = 0   # lines that were not events
+        self.done = False   # the source ended (or failed: see error)
+        self.error = None
+        self._links = {}    # (a, b) -> (state, util), since the last take()
+        self._nodes = {}    # a -> (state, util)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live", daemon=True)
+
+    def start(self):
+        if self.source.startswith("unix:") and not hasattr(socket, "AF_UNIX"):
+            raise OSError("UNIX sockets are not available on this platform")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()  # noticed at the next read (stdin: once a line arrives; the thread is a daemon)
+
+    def take(self):
+        """({(a, b): (state, util)}, {a: (state, util)}) received since the last call."""
+        with self._lock:
+            links, nodes = self._links, self._nodes
+            self._links, self._nodes = {}, {}
+        return links, nodes
+
+    def feed(self, data):
+        """Merge the events in data (whole lines, str or bytes) into the pending batch."""
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "replace")
+        events = []
+        rejected = 0
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(parse_live_event(line))
+            except (ValueError, TypeError, AttributeError):
+                rejected += 1
+        with self._lock:
+            for kind, key, state, util in events:
+                merge_live(self._links if kind == "link" else self._nodes, key, state, util)
+            self.received += len(events)
+            self.rejected += rejected
+
+    def _run(self):
+        try:
+            if self.source == "-":
+                self._read_stream(sys.stdin.buffer)
+            elif self.source.startswith("unix:"):
+                self._read_socket(self.source[5:])
+            else:
+                self._follow(self.source)
+        except Exception as e:  # a worker thread has nobody to raise to: the UI reads .error
+            self.error = e
+        self.done = True
+
+    def _lines(self, pending, chunk):
+        """Feed the whole lines of pending + chunk; returns the unfinished last line."""
+        data = pending + chunk
+        end = data.rfind(b"\n") + 1
+        if end:
+            self.feed(data[:end])
+        return data[end:]
+
+    def _read_stream(self, stream):
+        pending = b""
+        while not self._stop.is_set():
+            chunk = stream.read1(LIVE_READ_BYTES)
+            if not chunk:
+                break
+            pending = self._lines(pending, chunk)
+        self.feed(pending)
+
+    def _follow(self, path):
+        with open(path, "rb") as f:
+            pending = b""
+            while not self._stop.is_set():
+                chunk = f.read(LIVE_READ_BYTES)
+                if chunk:
+                    pending = self._lines(pending, chunk)
+                    continue
+                if os.stat(path).st_size < f.tell():  # truncated in place (log rotation): start over
+                    f.seek(0)
+                    pending = b""
+                self._stop.wait(LIVE_POLL_S)
+
+    def _read_socket(self, path):
+        while not self._stop.is_set():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(LIVE_POLL_S)
+            try:
+                sock.connect(path)
+            except OSError:
+                sock.close()
+                self._stop.wait(LIVE_RETRY_S)
+                continue
+            with sock:
+                pending = b""
+                while not self._stop.is_set():
+                    try:
+                        chunk = sock.recv(LIVE_READ_BYTES)
+                    except socket.timeout:
+                        continue
+                    if not chunk:
+                        break  # the writer went away: reconnect
+                    pending = self._lines(pending, chunk)
@@ -0,0 +1,1396 @@
+"""Headless topology model: columns, spatial indexes, analytics, sites, labels and undo history."""
+
+import bisect
+import collections
+import hashlib
+import json
+import math
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized paths fall back to pure Python
+    np = None
+
+
+NODE_RADIUS = 18
+NODE_KINDS = ("router", "switch")  # TopologyModel.kinds stores the index into this
+GRID_CELL = 64             # spatial index cell size (world units)
+LINK_GRID_CELL = 128       # link index cell size (world units)
+LINK_GRID_SPAN = 4         # longer segments are bucketed on a coarser level, in at most this many cells per axis
+LINK_GRID_FANOUT = 8       # cell size ratio between successive link index levels
+NP_MIN_BATCH = 16          # below this many elements NumPy overhead outweighs the win
+
+
+# ───────────────── Spatial index (headless) ─────────────────
+
+def _span_minus(r, s):
+    """Yield grid cells of inclusive span r that are not in span s (s may be empty)."""
+    rx0, ry0, rx1, ry1 = r
+    sx0, sy0, sx1, sy1 = s
+    s_empty = sx0 > sx1 or sy0 > sy1
+    for cy in range(ry0, ry1 + 1):
+        if s_empty or cy < sy0 or cy > sy1:
+            for cx in range(rx0, rx1 + 1):
+                yield cx, cy
+        else:
+            for cx in range(rx0, min(rx1, sx0 - 1) + 1):
+                yield cx, cy
+            for cx in range(max(rx0, sx1 + 1), rx1 + 1):
+                yield cx, cy
+
+
+class NodeGrid:
+    """Uniform grid bucketing node ids by world position.
+
+    Works in world coordinates, so pan and zoom never invalidate it; only
+    create, move and delete touch it, at O(1) each.
+    """
+
+    def __init__(self, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = {}   # (cx, cy) -> {node_id, ...}
+        self.where = {}   # node_id -> (cx, cy)
+
+    def cell_of(self, x, y):
+        return int(math.floor(x / self.cell)), int(math.floor(y / self.cell))
+
+    def span(self, x0, y0, x1, y1):
+        """Inclusive range of cells touched by a world rect."""
+        cx0, cy0 = self.cell_of(x0, y0)
+        cx1, cy1 = self.cell_of(x1, y1)
+        return cx0, cy0, cx1, cy1
+
+    def inner_span(self, x0, y0, x1, y1):
+        """Inclusive range of cells lying entirely inside a world rect (may be empty)."""
+        c = self.cell
+        return (int(math.ceil(x0 / c)), int(math.ceil(y0 / c)),
+                int(math.floor(x1 / c)) - 1, int(math.floor(y1 / c)) - 1)
+
+    def insert(self, node, x, y):
+        key = self.cell_of(x, y)
+        self.where[node] = key
+        self.cells.setdefault(key, set()).add(node)
+
+    def remove(self, node):
+        key = self.where.pop(node, None)
+        if key is None:
+            return
+        bucket = self.cells[key]
+        bucket.discard(node)
+        if not bucket:
+            del self.cells[key]
+
+    def move(self, node, x, y):
+        key = self.cell_of(x, y)
+        if self.where.get(node) != key:
+            self.remove(node)
+            self.where[node] = key
+            self.cells.setdefault(key, set()).add(node)
+
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+
+    def query(self, x0, y0, x1, y1):
+        """Candidate nodes in the cells touched by a world rect (not filtered exactly)."""
+        cx0, cy0, cx1, cy1 = self.span(x0, y0, x1, y1)
+        cells = self.cells
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+            # Sparse grid: walking the occupied cells is cheaper than walking the span
+            for (cx, cy), bucket in cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield from bucket
+            return
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def query_changed(self, old, new):
+        """Candidate nodes whose inside/outside status may differ between two world rects.
+
+        Cells fully inside both rects keep their membership and are skipped;
+        only the cells that entered or left the rect, or are cut by either
+        edge, are visited.
+        """
+        a = self.span(*old)
+        b = self.span(*new)
+        ia = self.inner_span(*old)
+        ib = self.inner_span(*new)
+        inner = (max(ia[0], ib[0]), max(ia[1], ib[1]), min(ia[2], ib[2]), min(ia[3], ib[3]))
+        cells = self.cells
+        for key in _span_minus(a, inner):
+            bucket = cells.get(key)
+            if bucket:
+                yield from bucket
+        for key in _span_minus(b, a):
+            bucket = cells.get(key)
+            if bucket:
+                yield from bucket
+
+
+class LinkGrid:
+    """Grid bucketing link ids by every cell their segment passes through.
+
+    A segment crossing more than LINK_GRID_SPAN cells per axis is bucketed on
+    the first coarser level (cells LINK_GRID_FANOUT times larger) where it does
+    not, so one very long link never fills thousands of cells. Links stored
+    above level 0 are kept in ``long``; queries over them are coarse.
+
+    Links whose endpoints moved are only marked dirty; they are re-bucketed
+    lazily by the next query, so dragging costs nothing here.
+    """
+
+    def __init__(self, cell=LINK_GRID_CELL):
+        self.cell = cell
+        self.cells = {}     # (level, cx, cy) -> {link_id, ...}
+        self.where = {}     # link_id -> [(level, cx, cy), ...]
+        self.long = set()   # link ids bucketed above level 0
+        self.levels = {}    # level -> number of links bucketed there
+        self.dirty = set()  # link ids whose bucketing is stale
+
+    def _segment_cells(self, x1, y1, x2, y2):
+        """Cells crossed by a segment (grid traversal, Amanatides & Woo) on its level."""
+        level, c = 0, self.cell
+        while max(abs(math.floor(x2 / c) - math.floor(x1 / c)),
+                  abs(math.floor(y2 / c) - math.floor(y1 / c))) > LINK_GRID_SPAN:
+            level += 1
+            c *= LINK_GRID_FANOUT
+        cx, cy = int(math.floor(x1 / c)), int(math.floor(y1 / c))
+        ex, ey = int(math.floor(x2 / c)), int(math.floor(y2 / c))
+        out = [(level, cx, cy)]
+        dx, dy = x2 - x1, y2 - y1
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        t_max_x = ((cx + (step_x > 0)) * c - x1) / dx if dx else math.inf
+        t_max_y = ((cy + (step_y > 0)) * c - y1) / dy if dy else math.inf
+        t_dx = c / abs(dx) if dx else math.inf
+        t_dy = c / abs(dy) if dy else math.inf
+        rem_x, rem_y = abs(ex - cx), abs(ey - cy)
+        while rem_x or rem_y:
+            if rem_x and (not rem_y or t_max_x < t_max_y):
+                cx += step_x
+                t_max_x += t_dx
+                rem_x -= 1
+            else:
+                cy += step_y
+                t_max_y += t_dy
+                rem_y -= 1
+            out.append((level, cx, cy))
+        return out
+
+    def insert(self, link, x1, y1, x2, y2):
+        keys = self._segment_cells(x1, y1, x2, y2)
+        self.where[link] = keys
+        for key in keys:
+            self.cells.setdefault(key, set()).add(link)
+        level = keys[0][0]
+        self.levels[level] = self.levels.get(level, 0) + 1
+        if level:
+            self.long.add(link)
+
+    def remove(self, link):
+        self.dirty.discard(link)
+        self.remove_cells(link)
+
+    def remove_cells(self, link):
+        keys = self.where.pop(link, None)
+        if not keys:
+            return
+        for key in keys:
+            bucket = self.cells[key]
+            bucket.discard(link)
+            if not bucket:
+                del self.cells[key]
+        self.levels[keys[0][0]] -= 1
+        self.long.discard(link)
+
+    def mark_dirty(self, links):
+        self.dirty.update(links)
+
+    def clear(self):
+        self.cells.clear()
+        self.where.clear()
+        self.long.clear()
+        self.levels.clear()
+        self.dirty.clear()
+
+    def query(self, x0, y0, x1, y1):
+        """Candidate links crossing the cells touched by a world rect (not filtered exactly)."""
+        cells = self.cells
+        out = set()
+        for level, count in self.levels.items():
+            if not count:
+                continue
+            c = self.cell * LINK_GRID_FANOUT ** level
+            cx0, cy0 = int(math.floor(x0 / c)), int(math.floor(y0 / c))
+            cx1, cy1 = int(math.floor(x1 / c)), int(math.floor(y1 / c))
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(cells):
+                for (lv, cx, cy), bucket in cells.items():
+                    if lv == level and cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                        out.update(bucket)
+                continue
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    bucket = cells.get((level, cx, cy))
+                    if bucket:
+                        out.update(bucket)
+        return out
+
+
+def segment_hits_rect(x1, y1, x2, y2, x0, y0, rx1, ry1):
+    """Whether a segment touches an axis-aligned rect (Liang-Barsky clipping)."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = x2 - x1, y2 - y1
+    for p, q in ((-dx, x1 - x0), (dx, rx1 - x1), (-dy, y1 - y0), (dy, ry1 - y1)):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            t0 = max(t0, q / p)
+        else:
+            t1 = min(t1, q / p)
+        if t0 > t1:
+            return False
+    return True
+
+
+def _dist_point_to_segment(px, py, x1, y1, x2, y2):
+    vx, vy = x2 - x1, y2 - y1
+    wx, wy = px - x1, py - y1
+
+    c1 = vx * wx + vy * wy
+    if c1 <= 0:
+        return ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
+
+    c2 = vx * vx + vy * vy
+    if c2 <= c1:
+        return ((px - x2) ** 2 + (py - y2) ** 2) ** 0.5
+
+    b = c1 / c2
+    bx, by = x1 + b * vx, y1 + b * vy
+    return ((px - bx) ** 2 + (py - by) ** 2) ** 0.5
+
+
+def _dist_point_to_segments(px, py, segs):
+    """Distances from (px, py) to each (x1, y1, x2, y2) in segs, vectorized when NumPy is available."""
+    if np is None or len(segs) < NP_MIN_BATCH:
+        return [_dist_point_to_segment(px, py, *seg) for seg in segs]
+    a = np.asarray(segs, dtype=float)
+    x1, y1, x2, y2 = a[:, 0], a[:, 1], a[:, 2], a[:, 3]
+    vx, vy = x2 - x1, y2 - y1
+    c2 = vx * vx + vy * vy
+    t = ((px - x1) * vx + (py - y1) * vy) / np.where(c2 == 0, 1.0, c2)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (x1 + t * vx), py - (y1 + t * vy))
+
+
+# ───────────────── Analytics (headless) ─────────────────
+
+ANALYTICS_HOTSPOTS = 20       # at most this many degree hot spots are reported
+ANALYTICS_HOTSPOT_SIGMA = 2.0  # hot spot: degree this many standard deviations above the mean
+
+
+class Components:
+    """Connected components of a model, kept by union-find.
+
+    Every added link is one union, O(α(n)); nodes that were never linked are
+    implicit singletons, so adding nodes costs nothing. Union-find cannot
+    split a set, so removals only mark it stale and the next query rebuilds
+    it from the links in O(V + E).
+    """
+
+    def __init__(self):
+        self.parent = {}   # node_id -> parent node_id; absent: the node is its own root
+        self.size = {}     # root -> node count, for roots of linked sets only
+        self.merges = 0    # successful unions: components = nodes - merges
+        self.stale = False
+        self.version = 0   # bumped on every change, so views can tell when to query again
+
+    def clear(self):
+        self.parent.clear()
+        self.size.clear()
+        self.merges = 0
+        self.stale = False
+        self.version += 1
+
+    def invalidate(self):
+        self.stale = True
+        self.version += 1
+
+    def find(self, node):
+        parent = self.parent
+        while True:
+            up = parent.get(node, node)
+            if up == node:
+                return node
+            top = parent.get(up, up)
+            parent[node] = top  # path halving
+            node = top
+
+    def union(self, a, b):
+        self.version += 1
+        if not self.stale:
+            self._union(a, b)
+
+    def _union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        size = self.size
+        sa, sb = size.get(ra, 1), size.pop(rb, 1)
+        if sa < sb:
+            ra, rb = rb, ra
+            size.pop(rb, None)
+        self.parent[rb] = ra
+        size[ra] = sa + sb
+        self.merges += 1
+
+    def refresh(self, model):
+        if self.stale:
+            self.parent, self.size, self.merges = {}, {}, 0
+            self.stale = False
+            union = self._union
+            for a, b in model.links.values():
+                union(a, b)
+
+    def count(self, model):
+        self.refresh(model)
+        return len(model.nodes) - self.merges
+
+    def connected(self, model, a, b):
+        self.refresh(model)
+        return self.find(a) == self.find(b)
+
+    def groups(self, model):
+        """Every component as a list of node ids, largest first."""
+        self.refresh(model)
+        find = self.find
+        groups = {}
+        for n in model.nodes:
+            groups.setdefault(find(n), []).append(n)
+        return sorted(groups.values(), key=len, reverse=True)
+
+
+def shortest_path(model, a, b):
+    """Fewest-hop path from a to b as (nodes, links), or None when they are not connected."""
+    if a not in model.nodes or b not in model.nodes or not model.components.connected(model, a, b):
+        return None
+    links, incident = model.links, model.incident
+    via = {a: None}  # node -> link it was reached by
+    frontier = [a]
+    while b not in via:
+        nxt = []
+        for node in frontier:
+            for ln in incident[node]:
+                n1, n2 = links[ln]
+                other = n2 if n1 == node else n1
+                if other not in via:
+                    via[other] = ln
+                    nxt.append(other)
+        frontier = nxt
+    nodes, path = [b], []
+    while nodes[-1] != a:
+        ln = via[nodes[-1]]
+        path.append(ln)
+        nodes.append(model.other_end(ln, nodes[-1]))
+    nodes.reverse()
+    path.reverse()
+    return nodes, path
+
+
+def critical_elements(model):
+    """Single points of failure: (articulation nodes, bridge links), as sets.
+
+    Tarjan's low-link DFS, run with an explicit stack so deep graphs (long
+    chains, rings) never hit the recursion limit. O(V + E).
+    """
+    links, incident = model.links, model.incident
+    disc, low = {}, {}
+    points, bridges = set(), set()
+    for root in model.nodes:
+        if root in disc:
+            continue
+        disc[root] = low[root] = len(disc)
+        stack = [(root, None, iter(incident[root]))]
+        children = 0
+        while stack:
+            node, parent_link, it = stack[-1]
+            for ln in it:
+                if ln == parent_link:
+                    continue
+                n1, n2 = links[ln]
+                other = n2 if n1 == node else n1
+                if other in disc:
+                    if disc[other] < low[node]:
+                        low[node] = disc[other]
+                else:
+                    disc[other] = low[other] = len(disc)
+                    stack.append((other, ln, iter(incident[other])))
+                    break
+            else:
+                stack.pop()
+                if not stack:
+                    break
+                up = stack[-1][0]
+                if low[node] < low[up]:
+                    low[up] = low[node]
+                if low[node] > disc[up]:
+                    bridges.add(parent_link)
+                if len(stack) == 1:
+                    children += 1
+                elif low[node] >= disc[up]:
+                    points.add(up)
+        if children > 1:
+            points.add(root)
+    return points, bridges
+
+
+def degree_hotspots(model, count=ANALYTICS_HOTSPOTS, sigma=ANALYTICS_HOTSPOT_SIGMA):
+    """Nodes whose degree stands out (sigma standard deviations above the mean): [(node, degree)], busiest first."""
+    total = len(model.nodes)
+    if total < 2:
+        return []
+    degrees = [(n, len(links)) for n, links in model.incident.items()]
+    mean = 2 * len(model.links) / total
+    spread = math.sqrt(sum((d - mean) ** 2 for _, d in degrees) / total)
+    threshold = mean + sigma * spread
+    hot = [(n, d) for n, d in degrees if d > threshold]
+    hot.sort(key=lambda nd: nd[1], reverse=True)
+    return hot[:count]
+
+
+# ───────────────── Sites (headless) ─────────────────
+
+def _agg_key(a, b):
+    """Unordered pair of aggregate link ends (site names and node ids) -> hashable key; sites first."""
+    if type(a) is type(b):
+        return (a, b) if a <= b else (b, a)
+    return (a, b) if isinstance(a, str) else (b, a)
+
+
+class Sites:
+    """Named node groups (sites, pods) and the aggregate links of the collapsed ones.
+
+    A node's site is its "site" attribute, so saving, undo and the journal
+    carry membership like any other attribute; this is the index over it.
+    Site names are kept as str whatever the attribute holds ("site": 7 in a
+    JSON file is site "7"): ends of aggregate links tell sites (str) from
+    node ids (int) by type.
+    A collapsed site stands for all of its members: every link leaving it
+    counts towards one aggregate link per neighboring end (another collapsed
+    site, or a node). Each added or removed link updates the counts in O(1);
+    collapse and expand cost O(links of the site's members).
+    """
+
+    def __init__(self):
+        self.members = {}      # site -> {node_id, ...}
+        self.of = {}           # node_id -> site
+        self.collapsed = set()
+        self.hidden = set()    # members of collapsed sites
+        self.agg = {}          # _agg_key(end, end) -> link count; end: collapsed site or node id
+        self.agg_of = {}       # collapsed site -> {agg key, ...}
+        self.dirty = set()     # agg keys whose count changed since the view last looked
+        self.centers = {}      # collapsed site -> (x, y) centroid of its members, cached
+
+    def clear(self):
+        self.dirty.update(self.agg)
+        for index in (self.members, self.of, self.collapsed, self.hidden, self.agg, self.agg_of, self.centers):
+            index.clear()
+
+    def end(self, node):
+        site = self.of.get(node)
+        return site if site in self.collapsed else node
+
+    def _count(self, n1, n2, delta):
+        a, b = self.end(n1), self.end(n2)
+        if a == b or (type(a) is int and type(b) is int):
+            return
+        key = _agg_key(a, b)
+        count = self.agg.get(key, 0) + delta
+        if count:
+            self.agg[key] = count
+            for end in key:
+                if type(end) is str:
+                    self.agg_of.setdefault(end, set()).add(key)
+        else:
+            del self.agg[key]
+            for end in key:
+                if type(end) is str:
+                    self.agg_of[end].discard(key)
+        self.dirty.add(key)
+
+    def link_added(self, n1, n2):
+        if self.collapsed:
+            self._count(n1, n2, 1)
+
+    def link_removed(self, n1, n2):
+        if self.collapsed:
+            self._count(n1, n2, -1)
+
+    def _recount(self, model, nodes, change):
+        """Apply change() (which moves nodes between ends), keeping the counts of their links right."""
+        links = model.incident_links(nodes) if self.collapsed else ()
+        ends = [model.links[ln] for ln in links]
+        for n1, n2 in ends:
+            self._count(n1, n2, -1)
+        change()
+        for n1, n2 in ends:
+            self._count(n1, n2, 1)
+
+    def assign(self, model, node, site):
+        """Move node to site (None: no site)."""
+        if site is not None:
+            site = str(site)
+        old = self.of.get(node)
+        if old == site:
+            return
+
+        def change():
+            if old is not None:
+                self._leave(node, old)
+            if site is not None:
+                self.of[node] = site
+                self.members.setdefault(site, set()).add(node)
+                if site in self.collapsed:
+                    self.hidden.add(node)
+                self.centers.pop(site, None)
+
+        if old in self.collapsed or site in self.collapsed:
+            self._recount(model, [node], change)
+        else:
+            change()
+
+    def _leave(self, node, site):
+        del self.of[node]
+        members = self.members[site]
+        members.discard(node)
+        self.hidden.discard(node)
+        self.centers.pop(site, None)
+        if not members:
+            del self.members[site]
+            self.collapsed.discard(site)
+            self.agg_of.pop(site, None)
+
+    def node_removed(self, node):
+        """node and its links are gone (link_removed already saw each link)."""
+        site = self.of.get(node)
+        if site is not None:
+            self._leave(node, site)
+
+    def collapse(self, model, site):
+        if site in self.members and site not in self.collapsed:
+            members = self.members[site]
+
+            def change():
+                self.collapsed.add(site)
+                self.hidden.update(members)
+            if self.collapsed:
+                self._recount(model, members, change)
+            else:  # nothing is counted while no site is collapsed
+                change()
+                for ln in model.incident_links(members):
+                    self._count(*model.links[ln], 1)
+
+    def expand(self, model, site):
+        if site in self.collapsed:
+            members = self.members[site]
+
+            def change():
+                self.collapsed.discard(site)
+                self.hidden.difference_update(members)
+                self.centers.pop(site, None)
+            self._recount(model, members, change)
+
+    def center(self, model, site):
+        center = self.centers.get(site)
+        if center is None:
+            xs, ys = model.positions(self.members[site])
+            center = self.centers[site] = (sum(xs) / len(xs), sum(ys) / len(ys))
+        return center
+
+    def moved(self):
+        """Node positions changed: collapsed site centers must be recomputed."""
+        if self.centers:
+            self.centers.clear()
+
+    def rebuild(self, model):
+        """Derive the index from the nodes' "site" attributes after a bulk load."""
+        collapsed = set(self.collapsed)
+        self.clear()
+        for node, attrs in model.attrs.items():
+            site = attrs.get("site")
+            if site is not None and node in model.nodes:
+                site = str(site)
+                self.of[node] = site
+                self.members.setdefault(site, set()).add(node)
+        for site in collapsed & self.members.keys():
+            self.collapse(model, site)
+
+
+# ───────────────── Labels (headless) ─────────────────
+#
+# A node's label is its "label" attribute, else its "name". Labels indexes
+# them, case-insensitively, for search: a sorted list of (label, node) for
+# prefix lookups by bisection, and a trigram -> nodes index for substrings of
+# three characters or more, so a lookup costs about the size of its answer.
+# The model keeps it current as nodes are added, renamed and removed; bulk adds
+# only append, and the sorted list is merged or rebuilt at the next search.
+# Renamed and removed entries are skipped until enough of them pile up. The
+# trigram index is built by the first substring search.
+
+LABEL_SEARCH_LIMIT = 50   # matches returned by one search
+LABEL_INSORT_MAX = 256    # more labels added since the last search than this: re-sort instead of inserting
+
+
+def _label_of(attrs):
+    label = attrs and (attrs.get("label") or attrs.get("name"))
+    return str(label) if label else None
+
+
+def node_label(model, node):
+    return _label_of(model.attrs.get(node))
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class Labels:
+    """Search index of node labels (see search)."""
+
+    def __init__(self):
+        self.of = {}        # node_id -> lowercased label, labeled nodes only
+        self.order = []     # (lowercased label, node_id), sorted; may hold stale entries (see of)
+        self.added = []     # entries not merged into order yet
+        self.stale = 0      # entries in order that no longer match of
+        self.grams = None   # trigram -> {node_id}; None until the first substring search
+
+    def clear(self):
+        self.of.clear()
+        self.order = []
+        self.added = []
+        self.stale = 0
+        self.grams = None
+
+    def update(self, node, attrs):
+        """The node now has these attributes (None: it is gone)."""
+        label = _label_of(attrs)
+        label = label.lower() if label else None
+        old = self.of.get(node)
+        if old == label:
+            return
+        if old is not None:
+            del self.of[node]
+            self.stale += 1
+            if self.grams is not None:
+                for gram in _trigrams(old):
+                    nodes = self.grams[gram]
+                    nodes.discard(node)
+                    if not nodes:
+                        del self.grams[gram]
+        if label is not None:
+            self.of[node] = label
+            self.added.append((label, node))
+            if self.grams is not None:
+                for gram in _trigrams(label):
+                    self.grams.setdefault(gram, set()).add(node)
+
+    def rebuild(self, model):
+        self.clear()
+        self.of = {n: label.lower() for n, a in model.attrs.items() for label in (_label_of(a),) if label}
+        self.added = [(label, n) for n, label in self.of.items()]
+
+    def _settle(self):
+        if len(self.added) > LABEL_INSORT_MAX or self.stale > len(self.order) // 2:
+            self.order = sorted((label, n) for n, label in self.of.items())
+            self.stale = 0
+        else:
+            for entry in self.added:
+                bisect.insort(self.order, entry)
+        self.added = []
+
+    def _grams(self):
+        if self.grams is None:
+            self.grams = grams = {}
+            for node, label in self.of.items():
+                for gram in _trigrams(label):
+                    grams.setdefault(gram, set()).add(node)
+        return self.grams
+
+    def search(self, query, limit=LABEL_SEARCH_LIMIT):
+        """Nodes whose label starts with query, by label, then nodes whose label contains it; at most limit."""
+        q = query.strip().lower()
+        if not q:
+            return []
+        if self.added or self.stale:
+            self._settle()
+        of, order = self.of, self.order
+        out = []
+        seen = set()  # renamed away and back: the node can be in order twice
+        i = bisect.bisect_left(order, (q,))
+        while i < len(order) and len(out) < limit:
+            label, node = order[i]
+            if not label.startswith(q):
+                break
+            if of.get(node) == label and node not in seen:
+                out.append(node)
+                seen.add(node)
+            i += 1
+        if len(q) < 3 or len(out) >= limit:
+            return out
+        grams = self._grams()
+        more = []
+        for node in min((grams.get(gram, ()) for gram in _trigrams(q)), key=len):  # rarest trigram
+            label = of[node]
+            if q in label and not label.startswith(q):
+                more.append(node)
+                if len(out) + len(more) >= limit:
+                    break
+        more.sort(key=of.get)
+        return out + more
+
+
+# ───────────────── Model (headless) ─────────────────
+
+NODE_ROW = struct.Struct("<qbddq")  # node id, kind index, x, y, seq
+LINK_ROW = struct.Struct("<qqq")    # link id, n1, n2
+
+def _pair_key(a, b):
+    """Unordered node pair -> hashable key (links are undirected)."""
+    return (a, b) if a <= b else (b, a)
+
+
+def packed_ids(packed):
+    """([node ids], [link ids]) of the rows take_rows packed."""
+    node_bytes, _node_attrs, link_bytes, _link_attrs = packed
+    return [row[0] for row in NODE_ROW.iter_unpack(node_bytes)], [row[0] for row in LINK_ROW.iter_unpack(link_bytes)]
+
+
+class TopologyModel:
+    """Headless topology graph: nodes, links and their world-coordinate positions.
+
+    Node and link ids are plain ints owned by the model. Nothing here touches Tk,
+    so topologies can be built, edited and benchmarked without a display;
+    TopologyTool only renders what is stored here.
+
+    Nodes are rows of parallel, contiguous columns (``xs``, ``ys``, ``kinds``,
+    ``seqs``) addressed through ``nodes`` (node_id -> dense row). Deleting swaps
+    the last row into the hole, so rows stay dense and group operations can run
+    as one vectorized pass when NumPy is available.
+    """
+
+    def __init__(self):
+        self.nodes = {}         # node_id -> dense row index
+        self.ids = array("q")   # row -> node_id
+        self.xs = array("d")    # row -> world x
+        self.ys = array("d")    # row -> world y
+        self.kinds = array("b")  # row -> index into NODE_KINDS
+        self.seqs = array("q")  # row -> creation sequence number
+        self.attrs = {}         # node_id -> {name: value}; only nodes that carry extra attributes
+        self.links = {}      # link_id -> (n1, n2)
+        self.link_attrs = {}  # link_id -> {name: value}; only links that carry extra attributes
+        self.incident = {}   # node_id -> {link_id, ...}
+        self._pairs = {}     # (min(n1, n2), max(n1, n2)) -> link_id
+        self.grid = NodeGrid()
+        self.link_grid = LinkGrid()
+        self.components = Components()
+        self.sites = Sites()
+        self.labels = Labels()
+        self.node_seq = 0
+        self._next_node_id = 1
+        self._next_link_id = 1
+
+    def _columns(self):
+        return self.ids, self.xs, self.ys, self.kinds, self.seqs
+
+    def add_node(self, kind, x, y, **attrs):
+        node = self._next_node_id
+        self._next_node_id += 1
+        self.nodes[node] = len(self.ids)
+        self.ids.append(node)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.kinds.append(NODE_KINDS.index(kind))
+        self.seqs.append(self.node_seq)
+        if attrs:
+            self.attrs[node] = attrs
+        self.incident[node] = set()
+        self.grid.insert(node, x, y)
+        self.node_seq += 1
+        if attrs:
+            self.labels.update(node, attrs)
+        if "site" in attrs:
+            self.sites.assign(self, node, attrs["site"])
+        return node
+
+    def remove_node(self, node):
+        """Remove a node and every link touching it. Returns the removed link ids."""
+        if node not in self.nodes:
+            return []
+        removed = list(self.incident[node])
+        for ln in removed:
+            self.remove_link(ln)
+        self._drop_row(node)
+        del self.incident[node]
+        self.attrs.pop(node, None)
+        self.grid.remove(node)
+        self.components.invalidate()
+        self.sites.node_removed(node)
+        self.labels.update(node, None)
+        return removed
+
+    def _drop_row(self, node):
+        row = self.nodes.pop(node)
+        last = len(self.ids) - 1
+        if row != last:
+            for col in self._columns():
+                col[row] = col[last]
+            self.nodes[self.ids[row]] = row
+        for col in self._columns():
+            col.pop()
+
+    def remove_nodes(self, nodes):
+        """Bulk remove; O(sum of degrees). Returns all removed link ids."""
+        removed = []
+        for n in nodes:
+            removed.extend(self.remove_node(n))
+        return removed
+
+    def add_link(self, n1, n2, **attrs):
+        """Link two nodes; a self-loop is rejected (None) and a linked pair returns its existing link."""
+        if n1 == n2:
+            return None
+        key = _pair_key(n1, n2)
+        link = self._pairs.get(key)
+        if link is not None:
+            return link
+        link = self._next_link_id
+        self._next_link_id += 1
+        self.links[link] = (n1, n2)
+        if attrs:
+            self.link_attrs[link] = attrs
+        self._pairs[key] = link
+        self.incident[n1].add(link)
+        self.incident[n2].add(link)
+        self.link_grid.dirty.add(link)
+        self.components.union(n1, n2)
+        self.sites.link_added(n1, n2)
+        return link
+
+    def add_nodes(self, kinds, xs, ys, attrs=None):
+        """Bulk add_node. kinds are NODE_KINDS indexes; attrs is an optional parallel list of dicts."""
+        count = len(kinds)
+        new = range(self._next_node_id, self._next_node_id + count)
+        self._next_node_id += count
+        self.nodes.update(zip(new, range(len(self.ids), len(self.ids) + count)))
+        self.ids.extend(new)
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.kinds.extend(kinds)
+        self.seqs.extend(range(self.node_seq, self.node_seq + count))
+        self.node_seq += count
+        insert = self.grid.insert
+        for n, x, y in zip(new, xs, ys):
+            self.incident[n] = set()
+            insert(n, x, y)
+        if attrs:
+            self.attrs.update((n, a) for n, a in zip(new, attrs) if a)
+            for n, a in zip(new, attrs):
+                if a:
+                    self.labels.update(n, a)
+                    if "site" in a:
+                        self.sites.assign(self, n, a["site"])
+        return new
+
+    def add_links(self, pairs, attrs=None):
+        """Bulk add_link. Self-loops and already linked pairs are skipped; returns the new link ids."""
+        links, pairs_index, incident = self.links, self._pairs, self.incident
+        union = self.components.union
+        link_added = self.sites.link_added
+        new = []
+        for i, (n1, n2) in enumerate(pairs):
+            key = _pair_key(n1, n2)
+            if n1 == n2 or key in pairs_index:
+                continue
+            link = self._next_link_id
+            self._next_link_id += 1
+            links[link] = (n1, n2)
+            pairs_index[key] = link
+            incident[n1].add(link)
+            incident[n2].add(link)
+            union(n1, n2)
+            link_added(n1, n2)
+            if attrs and attrs[i]:
+                self.link_attrs[link] = attrs[i]
+            new.append(link)
+        self.link_grid.dirty.update(new)
+        return new
+
+    def remove_link(self, link):
+        ends = self.links.pop(link, None)
+        if ends is None:
+            return None
+        n1, n2 = ends
+        self.link_attrs.pop(link, None)
+        self._pairs.pop(_pair_key(n1, n2), None)
+        self.incident[n1].discard(link)
+        self.incident[n2].discard(link)
+        self.link_grid.remove(link)
+        self.components.invalidate()
+        self.sites.link_removed(n1, n2)
+        return ends
+
+    def set_attrs(self, node, attrs):
+        """Replace a node's extra attributes (None or {} drops them)."""
+        if attrs:
+            self.attrs[node] = dict(attrs)
+        else:
+            self.attrs.pop(node, None)
+        self.sites.assign(self, node, attrs.get("site") if attrs else None)
+        self.labels.update(node, attrs)
+
+    def set_kinds(self, nodes, kinds):
+        """Set node kinds (indexes into NODE_KINDS, parallel to nodes); ids no longer in the model are skipped."""
+        rows = self.nodes
+        for n, kind in zip(nodes, kinds):
+            row = rows.get(n)
+            if row is not None:
+                self.kinds[row] = kind
+
+    def kind(self, node):
+        return NODE_KINDS[self.kinds[self.nodes[node]]]
+
+    def seq(self, node):
+        return self.seqs[self.nodes[node]]
+
+    def move_node(self, node, dx, dy):
+        row = self.nodes[node]
+        self.xs[row] += dx
+        self.ys[row] += dy
+        self.grid.move(node, self.xs[row], self.ys[row])
+        self.link_grid.mark_dirty(self.incident[node])
+        self.sites.moved()
+
+    def translate(self, nodes, dx, dy, links=None):
+        """Move a group of nodes by the same world delta in one pass.
+
+        links, if given, must be the links incident to nodes (callers that
+        translate the same group repeatedly, like a drag, compute it once).
+        """
+        nodes = list(nodes)
+        if np is None or len(nodes) < NP_MIN_BATCH:
+            for n in nodes:
+                row = self.nodes[n]
+                self.xs[row] += dx
+                self.ys[row] += dy
+                self.grid.move(n, self.xs[row], self.ys[row])
+        else:
+            idx = np.fromiter((self.nodes[n] for n in nodes), dtype=np.intp, count=len(nodes))
+            xs = np.frombuffer(self.xs, dtype=np.float64)
+            ys = np.frombuffer(self.ys, dtype=np.float64)
+            c = self.grid.cell
+            old_cx, old_cy = np.floor(xs[idx] / c), np.floor(ys[idx] / c)
+            xs[idx] += dx
+            ys[idx] += dy
+            # Only nodes that crossed a cell border touch the grid
+            crossed = (np.floor(xs[idx] / c) != old_cx) | (np.floor(ys[idx] / c) != old_cy)
+            for k in np.flatnonzero(crossed).tolist():
+                row = idx[k]
+                self.grid.move(nodes[k], xs[row], ys[row])
+            del xs, ys  # release the buffer views so the columns can grow again
+        self.link_grid.mark_dirty(self.incident_links(nodes) if links is None else links)
+        self.sites.moved()
+
+    def set_positions(self, nodes, xs, ys):
+        """Move nodes to absolute positions (parallel sequences); ids no longer in the model are skipped."""
+        rows = self.nodes
+        if np is None or len(nodes) < NP_MIN_BATCH:
+            moved = []
+            for n, x, y in zip(nodes, xs, ys):
+                row = rows.get(n)
+                if row is None:
+                    continue
+                self.xs[row] = x
+                self.ys[row] = y
+                self.grid.move(n, x, y)
+                moved.append(n)
+        else:
+            idx = np.fromiter((rows.get(n, -1) for n in nodes), dtype=np.intp, count=len(nodes))
+            keep = np.flatnonzero(idx >= 0)
+            idx = idx[keep]
+            nx = np.asarray(xs, dtype=np.float64)[keep]
+            ny = np.asarray(ys, dtype=np.float64)[keep]
+            col_x = np.frombuffer(self.xs, dtype=np.float64)
+            col_y = np.frombuffer(self.ys, dtype=np.float64)
+            c = self.grid.cell
+            crossed = (np.floor(col_x[idx] / c) != np.floor(nx / c)) | (np.floor(col_y[idx] / c) != np.floor(ny / c))
+            col_x[idx] = nx
+            col_y[idx] = ny
+            ids = self.ids
+            for k in np.flatnonzero(crossed).tolist():
+                row = int(idx[k])
+                self.grid.move(ids[row], col_x[row], col_y[row])
+            moved = [ids[row] for row in idx.tolist()]
+            del col_x, col_y  # release the buffer views so the columns can grow again
+        self.link_grid.mark_dirty(self.incident_links(moved))
+        self.sites.moved()
+
+    def incident_links(self, nodes):
+        """Union of the links touching any of the given nodes."""
+        out = set()
+        for n in nodes:
+            out.update(self.incident.get(n, ()))
+        return out
+
+    def position(self, node):
+        row = self.nodes[node]
+        return self.xs[row], self.ys[row]
+
+    def positions(self, nodes):
+        """World (xs, ys) lists for a sequence of nodes, gathered in one pass."""
+        if np is None or len(nodes) < NP_MIN_BATCH:
+            rows = [self.nodes[n] for n in nodes]
+            return [self.xs[r] for r in rows], [self.ys[r] for r in rows]
+        idx = np.fromiter((self.nodes[n] for n in nodes), dtype=np.intp, count=len(nodes))
+        return (np.frombuffer(self.xs, dtype=np.float64)[idx].tolist(),
+                np.frombuffer(self.ys, dtype=np.float64)[idx].tolist())
+
+    def bbox(self, nodes=None):
+        """World (x0, y0, x1, y1) around the given nodes (all when None); None if empty."""
+        if nodes is None:
+            if not self.ids:
+                return None
+            if np is not None:
+                xs = np.frombuffer(self.xs, dtype=np.float64)
+                ys = np.frombuffer(self.ys, dtype=np.float64)
+                return float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())
+            return min(self.xs), min(self.ys), max(self.xs), max(self.ys)
+        nodes = list(nodes)
+        if not nodes:
+            return None
+        xs, ys = self.positions(nodes)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def link_exists(self, a, b):
+        return _pair_key(a, b) in self._pairs
+
+    def link_between(self, a, b):
+        return self._pairs.get(_pair_key(a, b))
+
+    def other_end(self, link, node):
+        n1, n2 = self.links[link]
+        return n2 if n1 == node else n1
+
+    def neighbors(self, node):
+        return [self.other_end(ln, node) for ln in self.incident.get(node, ())]
+
+    def adjacency(self):
+        return {n: self.neighbors(n) for n in self.nodes}
+
+    def clear(self):
+        self.nodes.clear()
+        for col in self._columns():
+            del col[:]
+        self.attrs.clear()
+        self.links.clear()
+        self.link_attrs.clear()
+        self.incident.clear()
+        self._pairs.clear()
+        self.grid.clear()
+        self.link_grid.clear()
+        self.components.clear()
+        self.sites.clear()
+        self.labels.clear()
+        self.node_seq = 0
+
+    def rebuild_indexes(self):
+        """Derive every index from the columns and ``links`` after a bulk load."""
+        self.nodes = dict(zip(self.ids, range(len(self.ids))))
+        self.incident = {n: set() for n in self.ids}
+        self._pairs = {}
+        self.grid.clear()
+        self.link_grid.clear()
+        insert = self.grid.insert
+        for n, x, y in zip(self.ids, self.xs, self.ys):
+            insert(n, x, y)
+        incident = self.incident
+        pairs = self._pairs
+        for link, (n1, n2) in self.links.items():
+            incident[n1].add(link)
+            incident[n2].add(link)
+            pairs[_pair_key(n1, n2)] = link
+        self.link_grid.dirty.update(self.links)
+        self.components.invalidate()
+        self.sites.rebuild(self)
+        self.labels.rebuild(self)
+
+    # ───── Rows (compact copies of nodes and links, for undo) ─────
+
+    def take_rows(self, nodes=(), links=()):
+        """Pack nodes and links into bytes: everything needed to put them back with the same ids."""
+        pack_node = NODE_ROW.pack
+        rows = self.nodes
+        node_bytes = b"".join(pack_node(n, self.kinds[r], self.xs[r], self.ys[r], self.seqs[r])
+                              for n in nodes for r in (rows[n],))
+        link_bytes = b"".join(LINK_ROW.pack(ln, *self.links[ln]) for ln in links)
+        node_attrs = {n: dict(self.attrs[n]) for n in nodes if n in self.attrs} or None
+        link_attrs = {ln: dict(self.link_attrs[ln]) for ln in links if ln in self.link_attrs} or None
+        return node_bytes, node_attrs, link_bytes, link_attrs
+
+    def restore_rows(self, packed):
+        """Inverse of removing what take_rows packed."""
+        node_bytes, node_attrs, link_bytes, link_attrs = packed
+        next_node, next_link, node_seq = self._next_node_id, self._next_link_id, self.node_seq
+        for node, kind, x, y, seq in NODE_ROW.iter_unpack(node_bytes):
+            next_node = max(next_node, node + 1)
+            node_seq = max(node_seq, seq + 1)
+            self.nodes[node] = len(self.ids)
+            self.ids.append(node)
+            self.xs.append(x)
+            self.ys.append(y)
+            self.kinds.append(kind)
+            self.seqs.append(seq)
+            self.incident[node] = set()
+            self.grid.insert(node, x, y)
+        if node_attrs:
+            self.attrs.update((n, dict(a)) for n, a in node_attrs.items())
+            for n, a in node_attrs.items():
+                self.labels.update(n, a)
+                if "site" in a:
+                    self.sites.assign(self, n, a["site"])
+        for link, n1, n2 in LINK_ROW.iter_unpack(link_bytes):
+            next_link = max(next_link, link + 1)
+            self.links[link] = (n1, n2)
+            self._pairs[_pair_key(n1, n2)] = link
+            self.incident[n1].add(link)
+            self.incident[n2].add(link)
+            self.link_grid.dirty.add(link)
+            self.components.union(n1, n2)
+            self.sites.link_added(n1, n2)
+        if link_attrs:
+            self.link_attrs.update((ln, dict(a)) for ln, a in link_attrs.items())
+        # Replayed on a fresh model (journal recovery), the counters must move past the restored ids
+        self._next_node_id, self._next_link_id, self.node_seq = next_node, next_link, node_seq
+
+    def drop_rows(self, packed):
+        """Remove the nodes and links take_rows packed."""
+        nodes, links = packed_ids(packed)
+        for link in links:
+            self.remove_link(link)
+        self.remove_nodes(nodes)
+
+    # ───── Spatial queries (world coordinates) ─────
+
+    def in_rect(self, node, x0, y0, x1, y1):
+        row = self.nodes[node]
+        return x0 <= self.xs[row] <= x1 and y0 <= self.ys[row] <= y1
+
+    def filter_in_rect(self, nodes, x0, y0, x1, y1):
+        """Subset of nodes whose position lies in the world rect (vectorized for big batches)."""
+        nodes = list(nodes)
+        if np is None or len(nodes) < NP_MIN_BATCH:
+            return {n for n in nodes if self.in_rect(n, x0, y0, x1, y1)}
+        idx = np.fromiter((self.nodes[n] for n in nodes), dtype=np.intp, count=len(nodes))
+        xs = np.frombuffer(self.xs, dtype=np.float64)[idx]
+        ys = np.frombuffer(self.ys, dtype=np.float64)[idx]
+        mask = (xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1)
+        return {nodes[k] for k in np.flatnonzero(mask).tolist()}
+
+    def nodes_in_rect(self, x0, y0, x1, y1):
+        return self.filter_in_rect(self.grid.query(x0, y0, x1, y1), x0, y0, x1, y1)
+
+    def node_at(self, x, y, radius, skip=()):
+        """Node whose shape (circle for routers, square for switches) contains (x, y); nearest wins."""
+        best = None
+        best_d = None
+        router = NODE_KINDS.index("router")
+        for n in self.grid.query(x - radius, y - radius, x + radius, y + radius):
+            if n in skip:
+                continue
+            row = self.nodes[n]
+            dx, dy = abs(x - self.xs[row]), abs(y - self.ys[row])
+            if self.kinds[row] == router:
+                d = math.hypot(dx, dy)
+            else:
+                d = max(dx, dy)
+            if d <= radius and (best_d is None or d < best_d):
+                best, best_d = n, d
+        return best
+
+    def segment(self, link):
+        n1, n2 = self.links[link]
+        r1, r2 = self.nodes[n1], self.nodes[n2]
+        return self.xs[r1], self.ys[r1], self.xs[r2], self.ys[r2]
+
+    def _refresh_link_grid(self):
+        grid = self.link_grid
+        if grid.dirty:
+            for link in grid.dirty:
+                grid.remove_cells(link)
+                grid.insert(link, *self.segment(link))
+            grid.dirty.clear()
+        return grid
+
+    def links_in_rect(self, x0, y0, x1, y1):
+        """Links crossing the cells touched by a world rect (a slight superset)."""
+        grid = self._refresh_link_grid()
+        out = grid.query(x0, y0, x1, y1)
+        # Coarse-level cells are huge: keep only the long links that really cross the rect
+        for ln in out & grid.long:
+            if not segment_hits_rect(*self.segment(ln), x0, y0, x1, y1):
+                out.discard(ln)
+        return out
+
+    def link_at(self, x, y, tol, skip=()):
+        """Nearest link within tol of (x, y), ignoring links that touch nodes in skip.
+
+        Cost depends on local density, not total link count.
+        """
+        grid = self._refresh_link_grid()
+        candidates = list(grid.query(x - tol, y - tol, x + tol, y + tol))
+        if skip:
+            links = self.links
+            candidates = [ln for ln in candidates if links[ln][0] not in skip and links[ln][1] not in skip]
+        if not candidates:
+            return None
+        dists = _dist_point_to_segments(x, y, [self.segment(ln) for ln in candidates])
+        if isinstance(dists, list):
+            best = min(range(len(candidates)), key=dists.__getitem__)
+        else:
+            best = int(np.argmin(dists))
+        return candidates[best] if dists[best] <= tol else None
+
+
+# ───────────────── History (headless) ─────────────────
+#
+# Every edit is recorded as a small reversible command (a tuple):
+#   ("add", rows)                      nodes/links created (rows from take_rows)
+#   ("remove", rows)                   nodes/links deleted; only the removed rows are kept
+#   ("clear", rows, node_seq)          the whole topology wiped
+#   ("move", ids, dx, dy)              a group translated by one world delta (a whole drag)
+#   ("place", ids, xs0, ys0, xs1, ys1)  absolute positions before/after (auto-layout)
+#   ("attrs", ((node, old, new), ...))  attribute dicts replaced (None: no attributes)
+#   ("kinds", ids, kinds0, kinds1)     node kinds before/after (indexes into NODE_KINDS)
+#   ("steps", (cmd, ...))              several commands as one step (an import that refines nodes)
+# Applying or reverting one costs O(elements it touches), never a full snapshot.
+
+HISTORY_BUDGET = 8 * 2 ** 20  # bytes of undo/redo data kept before the oldest commands are evicted
+
+
+def apply_command(model, cmd, forward=True):
+    """Replay cmd on model (forward) or revert it."""
+    op = cmd[0]
+    if op == "add":
+        (model.restore_rows if forward else model.drop_rows)(cmd[1])
+    elif op == "remove":
+        (model.drop_rows if forward else model.restore_rows)(cmd[1])
+    elif op == "clear":
+        if forward:
+            model.clear()
+        else:
+            model.restore_rows(cmd[1])
+            model.node_seq = cmd[2]
+    elif op == "move":
+        _op, ids, dx, dy = cmd
+        sign = 1 if forward else -1
+        model.translate([n for n in ids if n in model.nodes], sign * dx, sign * dy)
+    elif op == "place":
+        _op, ids, xs0, ys0, xs1, ys1 = cmd
+        model.set_positions(ids, *((xs1, ys1) if forward else (xs0, ys0)))
+    elif op == "attrs":
+        for node, old, new in cmd[1]:
+            value = new if forward else old
+            model.set_attrs(node, value)
+    elif op == "kinds":
+        _op, ids, kinds0, kinds1 = cmd
+        model.set_kinds(ids, kinds1 if forward else kinds0)
+    elif op == "steps":
+        for step in (cmd[1] if forward else reversed(cmd[1])):
+            apply_command(model, step, forward)
+    else:
+        raise ValueError(f"unknown command {op!r}")
+
+
+def _command_size(cmd):
+    """Approximate bytes held by a command."""
+    size = 64
+    for part in cmd[1:]:
+        if isinstance(part, (bytes, array)):
+            size += len(part) * getattr(part, "itemsize", 1)
+        elif isinstance(part, tuple):
+            size += _command_size(("",) + part)
+        elif isinstance(part, dict):
+            size += 96 * len(part)
+    return size
+
+
+class History:
+    """Undo and redo stacks of commands, kept under a byte budget.
+
+    When the budget is exceeded the oldest commands are evicted (the latest one
+    always stays, however large), so a long session never holds more than a
+    few megabytes no matter how big the topology is.
+    """
+
+    def __init__(self, budget=HISTORY_BUDGET):
+        self.budget = budget
+        self.done = collections.deque()  # (cmd, size), oldest first
+        self.undone = []                 # (cmd, size), next redo last
+        self.size = 0
+        self.listener = None             # listener(cmd, forward) after every step (e.g. Journal.append)
+
+    def record(self, cmd):
+        """Remember a command that was just applied to the model."""
+        for _cmd, size in self.undone:
+            self.size -= size
+        self.undone.clear()
+        size = _command_size(cmd)
+        self.done.append((cmd, size))
+        self.size += size
+        while self.size > self.budget and len(self.done) > 1:
+            self.size -= self.done.popleft()[1]
+        if self.listener is not None:
+            self.listener(cmd, True)
+
+    def undo(self, model):
+        if not self.done:
+            return None
+        entry = self.done.pop()
+        apply_command(model, entry[0], forward=False)
+        self.undone.append(entry)
+        if self.listener is not None:
+            self.listener(entry[0], False)
+        return entry[0]
+
+    def redo(self, model):
+        if not self.undone:
+            return None
+        entry = self.undone.pop()
+        apply_command(model, entry[0], forward=True)
+        self.done.append(entry)
+        if self.listener is not None:
+            self.listener(entry[0], True)
+        return entry[0]
+
+    def clear(self):
+        self.done.clear()
+        self.undone.clear()
+        self.size = 0
+
+
+def model_digest(model):
+    """SHA-256 (hex) of a model's nodes, positions, links and attributes, whatever its row order."""
+    digest = hashlib.sha256()
+    row = struct.Struct("<qbddq")
+    for node in sorted(model.nodes):
+        i = model.nodes[node]
+        digest.update(row.pack(node, model.kinds[i], model.xs[i], model.ys[i], model.seqs[i]))
+    for link in sorted(model.links):
+        digest.update(struct.pack("<qqq", link, *model.links[link]))
+    digest.update(json.dumps([sorted(model.attrs.items()), sorted(model.link_attrs.items())],
+                             sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,101 @@
+"""Style rules: attribute-matched colors and widths, applied through canvas tags."""
+
+import re
+
+
+# ───────────────── Styles (headless) ─────────────────
+#
+# A style rule colors the nodes or links whose attributes match it, and can
+# set the width of links:
+#   node site=B: color=#80cbc4
+#   link speed=100G: color=#ff5252 width=4
+# Node and link items carry one canvas tag per styled attribute they have
+# (STYLE_ATTRS, and "kind" for nodes), so a rule is a tag expression such as
+# "link&&speed=100G" and applying or changing it is one itemconfigure call
+# however many items match. Where rules overlap, the later one wins.
+
+STYLE_ATTRS = ("role", "site", "vendor", "speed")
+STYLE_COLOR = re.compile(r"#(?:[0-9a-fA-F]{3}){1,4}|[A-Za-z][A-Za-z0-9 ]*")  # Tk color names and #rgb forms
+_STYLE_UNSAFE = re.compile(r"[^\w.:/+-]")
+
+
+def style_tag(name, value):
+    """Canvas tag of one attribute value (characters that mean something in tag expressions become _)."""
+    return f"{name}={_STYLE_UNSAFE.sub('_', str(value))}"
+
+
+def style_tags(target, attrs, kind=None):
+    """Tags of a node (kind given) or link item with these attributes: target first, then one per styled value."""
+    tags = [target]
+    if kind is not None:
+        tags.append(style_tag("kind", kind))
+    if attrs:
+        tags += [style_tag(name, attrs[name]) for name in STYLE_ATTRS if name in attrs]
+    return tags
+
+
+class StyleRule:
+    """Color (and for links width) of the nodes or links whose attributes all match."""
+
+    def __init__(self, target, match, color=None, width=None):
+        if target not in ("node", "link"):
+            raise ValueError(f"a style applies to node or link, not {target!r}")
+        names = STYLE_ATTRS + (("kind",) if target == "node" else ())
+        if not match:
+            raise ValueError("a style rule needs an attribute to match")
+        for name in match:
+            if name not in names:
+                raise ValueError(f"{name!r} is not a styled attribute ({', '.join(names)})")
+        if color is None and width is None:
+            raise ValueError("a style rule needs a color or a width")
+        if color is not None and not STYLE_COLOR.fullmatch(color):
+            raise ValueError(f"bad color {color!r}")
+        if width is not None and (target != "link" or not width > 0):
+            raise ValueError("only links have a width, and it must be positive")
+        self.target = target
+        self.match = dict(match)
+        self.color = color
+        self.width = width
+        self.tags = frozenset(style_tag(name, value) for name, value in self.match.items())
+        self.expr = "&&".join([target, *sorted(self.tags)])  # the items it styles, as a Tk tag expression
+
+    def matches(self, tags):
+        """Whether an item with these tags (a set, see style_tags) is styled by this rule."""
+        return self.tags <= tags
+
+    def options(self):
+        """The itemconfigure options it sets."""
+        options = {} if self.color is None else {"fill": self.color}
+        if self.width is not None:
+            options["width"] = self.width
+        return options
+
+    def __str__(self):
+        style = ([f"color={self.color}"] if self.color is not None else []) + \
+                ([f"width={self.width:g}"] if self.width is not None else [])
+        return " ".join([self.target, *(f"{name}={value}" for name, value in self.match.items())]) + \
+            ": " + " ".join(style)
+
+
+def _assignments(words):
+    out = {}
+    for word in words:
+        name, sep, value = word.partition("=")
+        if not sep or not name or not value:
+            raise ValueError(f"expected name=value, not {word!r}")
+        out[name] = value
+    return out
+
+
+def parse_style(spec):
+    """StyleRule from its text form, "node|link name=value ...: color=C width=W"."""
+    head, sep, tail = spec.rpartition(":")
+    words = head.split()
+    if not sep or not words:
+        raise ValueError('expected "node|link name=value ...: color=... width=..."')
+    style = _assignments(tail.split())
+    unknown = style.keys() - {"color", "width"}
+    if unknown:
+        raise ValueError(f"unknown style {', '.join(sorted(unknown))} (color, width)")
+    width = style.get("width")
+    return StyleRule(words[0], _assignments(words[1:]), style.get("color"), None if width is None else float(width))
@@ -0,0 +1,15 @@
+"""Colors and widths shared by the canvas and exported drawings."""
+
+NODE_COLORS = {"router": "#4fc3f7", "switch": "#81c784"}
+
+CANVAS_BG = "#0f1115"
+LEGEND_BG = "#1a1d23"
+LEGEND_OUTLINE = "#444"
+
+EDGE_COLOR = "#cccccc"
+EDGE_WIDTH = 2
+
+PIN_COLOR = "#ff8a65"      # outline of pinned nodes (auto-layout leaves them in place)
+PIN_WIDTH = 2
+
+LABEL_COLOR = "#b0bec5"        # node labels (name or label attribute), under the node
@@ -0,0 +1,118 @@
+import random
+
+from fasttopo.model import NODE_KINDS, TopologyModel, critical_elements, degree_hotspots, shortest_path
+
+
+def _bfs_groups(nodes, pairs):
+    adj = {n: set() for n in nodes}
+    for a, b in pairs:
+        adj[a].add(b)
+        adj[b].add(a)
+    seen, groups = set(), []
+    for start in nodes:
+        if start in seen:
+            continue
+        group, frontier = {start}, [start]
+        while frontier:
+            frontier = [m for n in frontier for m in adj[n] if m not in group and not group.add(m)]
+        seen |= group
+        groups.append(group)
+    return groups
+
+
+def _brute_critical(model):
+    """Articulation nodes and bridges: removing one leaves more components."""
+    nodes, links = set(model.nodes), dict(model.links)
+    base = len(_bfs_groups(nodes, links.values()))
+    points = {n for n in nodes if len(_bfs_groups(nodes - {n}, [p for p in links.values() if n not in p])) > base}
+    bridges = {ln for ln in links
+               if len(_bfs_groups(nodes, [p for other, p in links.items() if other != ln])) > base}
+    return points, bridges
+
+
+def _hops(model, a, b):
+    seen, frontier, hops = {a}, [a], 0
+    while frontier and b not in seen:
+        frontier = [m for n in frontier for ln in model.incident[n] for m in model.links[ln]
+                    if m not in seen and not seen.add(m)]
+        hops += 1
+    return hops if b in seen else None
+
+
+def _graph(pairs):
+    model = TopologyModel()
+    names = sorted({n for pair in pairs for n in pair})
+    ids = dict(zip(names, model.add_nodes([0] * len(names), [0.0] * len(names), [0.0] * len(names))))
+    links = {frozenset(pair): model.add_link(ids[pair[0]], ids[pair[1]]) for pair in pairs}
+    return model, ids, links
+
+
+def test_critical_elements_by_hand():
+    # Two triangles joined by the bridge c-d, plus a tail d-e-f
+    model, ids, links = _graph(["ab", "bc", "ca", "cd", "de", "ef", "fd", "fg"])
+    points, bridges = critical_elements(model)
+    assert points == {ids["c"], ids["d"], ids["f"]}
+    assert bridges == {links[frozenset("cd")], links[frozenset("fg")]}
+
+
+def test_critical_elements_chain_ring_star():
+    model, ids, links = _graph(["ab", "bc", "cd"])
+    assert critical_elements(model) == ({ids["b"], ids["c"]}, set(links.values()))
+    model, ids, links = _graph(["ab", "bc", "cd", "da"])
+    assert critical_elements(model) == (set(), set())
+    model, ids, links = _graph(["ha", "hb", "hc"])
+    assert critical_elements(model) == ({ids["h"]}, set(links.values()))
+
+
+def test_critical_elements_deep_chain():
+    model = TopologyModel()
+    nodes = model.add_nodes([0] * 5000, [0.0] * 5000, [0.0] * 5000)
+    model.add_links(list(zip(nodes, nodes[1:])))
+    points, bridges = critical_elements(model)
+    assert points == set(nodes[1:-1]) and len(bridges) == len(nodes) - 1
+
+
+def test_shortest_path_by_hand():
+    model, ids, links = _graph(["ab", "bc", "cd", "ae", "ed", "xy"])
+    nodes, path = shortest_path(model, ids["a"], ids["d"])
+    assert nodes == [ids["a"], ids["e"], ids["d"]]
+    assert path == [links[frozenset("ae")], links[frozenset("ed")]]
+    assert shortest_path(model, ids["a"], ids["x"]) is None
+    assert shortest_path(model, ids["a"], ids["a"]) == ([ids["a"]], [])
+
+
+def test_degree_hotspots():
+    model, ids, _links = _graph([("h", str(i)) for i in range(30)] + [("0", "1")])
+    assert degree_hotspots(model) == [(ids["h"], 30)]
+
+
+def test_against_brute_force_under_random_edits():
+    rng = random.Random(16)
+    model = TopologyModel()
+    for step in range(400):
+        nodes = list(model.nodes)
+        roll = rng.random()
+        if roll < 0.2 or len(nodes) < 2:
+            model.add_node(rng.choice(NODE_KINDS), 0.0, 0.0)
+        elif roll < 0.65:
+            a, b = rng.sample(nodes, 2)
+            model.add_link(a, b)
+        elif roll < 0.9 and model.links:
+            model.remove_link(rng.choice(list(model.links)))
+        else:
+            model.remove_node(rng.choice(nodes))
+        if step % 10:
+            continue
+        expected = sorted(map(sorted, _bfs_groups(list(model.nodes), model.links.values())))
+        assert sorted(map(sorted, model.components.groups(model))) == expected
+        assert model.components.count(model) == len(expected)
+        assert critical_elements(model) == _brute_critical(model)
+        if len(model.nodes) >= 2:
+            a, b = rng.sample(list(model.nodes), 2)
+            found = shortest_path(model, a, b)
+            hops = _hops(model, a, b)
+            assert (found is None) == (hops is None)
+            if found is not None:
+                nodes, path = found
+                assert len(path) == hops and nodes[0] == a and nodes[-1] == b
+                assert all(set(model.links[ln]) == {x, y} for ln, x, y in zip(path, nodes, nodes[1:]))
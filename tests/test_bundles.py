@@ -0,0 +1,122 @@
+import random
+import time
+
+import pytest
+
+from fasttopo.model import TopologyModel
+from fasttopo.bundles import EdgeBundler, EdgeBundles
+
+
+def _model(seed=1, count=400):
+    rng = random.Random(seed)
+    model = TopologyModel()
+    nodes = model.add_nodes([0] * count, [rng.uniform(0.0, 4000.0) for _ in range(count)],
+                            [rng.uniform(0.0, 4000.0) for _ in range(count)])
+    model.add_links([(rng.choice(nodes), rng.choice(nodes)) for _ in range(count * 2)])
+    return model, list(nodes), rng
+
+
+def _snapshot(model):
+    return list(model.ids), list(model.xs), list(model.ys), dict(model.links)
+
+
+def _shape(shape, value):
+    """Comparable form of a reported shape: fans as sorted spokes (member order is a set's)."""
+    coords, count = value
+    if shape[0] == "fan":
+        spokes = sorted(tuple(round(c, 6) for c in coords[i + 2:i + 4]) for i in range(0, len(coords), 4))
+        return tuple(round(c, 6) for c in coords[:2]), spokes, count
+    return [round(c, 6) for c in coords], count
+
+
+def _apply(drawn, changes):
+    for shape, value in changes.items():
+        if value is None:
+            del drawn[shape]
+        else:
+            drawn[shape] = value
+
+
+def _from_scratch(model, like):
+    fresh = EdgeBundles()
+    fresh.cell, fresh.span = like.cell, like.span
+    return {shape: _shape(shape, value) for shape, value in fresh.update(*_snapshot(model)).items()}
+
+
+def test_incremental_updates_match_a_fresh_routing():
+    model, nodes, rng = _model()
+    bundles = EdgeBundles()
+    drawn = {}
+    _apply(drawn, bundles.update(*_snapshot(model)))
+    for step in range(30):
+        edit = step % 3
+        if edit == 0:
+            model.translate(rng.sample(nodes, 10), rng.uniform(-300.0, 300.0), rng.uniform(-300.0, 300.0))
+        elif edit == 1:
+            for link in rng.sample(sorted(model.links), 15):
+                model.remove_link(link)
+        else:
+            alive = sorted(model.nodes)
+            model.add_links([(rng.choice(alive), rng.choice(alive)) for _ in range(15)])
+            gone = rng.choice(alive)
+            model.remove_node(gone)
+            nodes.remove(gone)
+        _apply(drawn, bundles.update(*_snapshot(model)))
+        assert {shape: _shape(shape, value) for shape, value in drawn.items()} == _from_scratch(model, bundles)
+
+
+def test_moving_one_node_reports_only_its_shapes():
+    model, nodes, _rng = _model(2)
+    bundles = EdgeBundles()
+    everything = bundles.update(*_snapshot(model))
+    node = next(n for n in nodes if model.incident[n])
+    left = bundles.cluster[node]
+    model.move_node(node, 200.0, 0.0)
+    changed = bundles.update(*_snapshot(model))
+    # The clusters it left and joined, and those of its neighbors; trunks reach out from them
+    clusters = {left, bundles.cluster[node]}
+    clusters.update(bundles.cluster[model.other_end(ln, node)] for ln in model.incident[node])
+    assert changed and len(changed) < len(everything) / 4
+    assert all(any(cluster in clusters for cluster in shape[1:]) for shape in changed)
+    assert bundles.update(*_snapshot(model)) == {}
+
+
+def test_hidden_nodes_leave_their_links_out():
+    model, nodes, _rng = _model(3, count=100)
+    hidden = frozenset(nodes[:50])
+    bundles = EdgeBundles()
+    bundles.update(*_snapshot(model), hidden=hidden)
+    assert bundles.links.keys() == {ln for ln, (a, b) in model.links.items() if a not in hidden and b not in hidden}
+    assert not hidden & bundles.cluster.keys()
+
+
+def test_rescaled_topology_is_clustered_again():
+    model, nodes, _rng = _model(4, count=100)
+    bundles = EdgeBundles()
+    first = bundles.update(*_snapshot(model))
+    cell = bundles.cell
+    model.set_positions(nodes, [x * 10 for x in model.positions(nodes)[0]], model.positions(nodes)[1])
+    changed = bundles.update(*_snapshot(model))
+    assert bundles.cell == pytest.approx(cell * 10, rel=0.05)
+    # Every shape drawn before is reported, gone or redrawn
+    assert first.keys() <= changed.keys()
+
+
+def test_bundler_routes_the_newest_snapshot_on_a_thread():
+    model, nodes, _rng = _model(5)
+    bundler = EdgeBundler().start()
+    try:
+        for _ in range(5):
+            model.translate(nodes[:20], 50.0, 0.0)
+            bundler.update(model)
+        deadline = time.monotonic() + 30
+        while bundler.busy() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not bundler.busy() and bundler.error is None
+        drawn = {}
+        _apply(drawn, bundler.take())
+        assert {shape: _shape(shape, value) for shape, value in drawn.items()} == \
+            _from_scratch(model, bundler.bundles)
+        assert bundler.take() == {}
+    finally:
+        bundler.stop()
@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+
+from fasttopo.model import NODE_KINDS, TopologyModel
+from fasttopo.files import export_json, save_snapshot
+from fasttopo.diff import DIFF_MOVE_EPS, diff_is_empty, diff_summary, diff_topologies, _diff_names
+from fasttopo.journal import _model_from_state, _model_state
+
+TOPO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "topo.py")
+
+
+def _model():
+    model = TopologyModel()
+    nodes = model.add_nodes([0, 1, 1, 0, 0], [0.0, 50.0, 100.0, 150.0, 200.0], [0.0] * 5,
+                            [{"name": "r1"}, {"name": "s1"}, {"name": "s2"}, None, {"name": "r9"}])
+    model.add_links([(nodes[0], nodes[1]), (nodes[1], nodes[2]), (nodes[2], nodes[3]), (nodes[3], nodes[4])])
+    return model, nodes
+
+
+def _copy(model):
+    return _model_from_state(_model_state(model))
+
+
+def _ids(records):
+    return sorted(rec["id"] for rec in records)
+
+
+def test_identical():
+    model, _nodes = _model()
+    diff = diff_topologies(_copy(model), model)
+    assert diff_is_empty(diff)
+    assert diff["old"] == diff["new"] == {"nodes": 5, "links": 4}
+    json.dumps(diff)
+
+
+def test_node_and_link_changes():
+    old, nodes = _model()
+    new = _copy(old)
+    r1, s1, s2, plain, r9 = nodes
+    new.move_node(s1, 30.0, 0.0)
+    new.move_node(s2, DIFF_MOVE_EPS / 2, 0.0)  # below the threshold
+    new.set_attrs(s2, {"name": "s2", "role": "leaf"})
+    rows = new.take_rows([r9], new.incident_links([r9]))
+    new.drop_rows(rows)
+    added = new.add_node("switch", 10.0, 10.0, name="s3")
+    link_added = new.add_link(added, r1)
+    link_s1_s2 = next(ln for ln, ends in new.links.items() if set(ends) == {s1, s2})
+    new.link_attrs[link_s1_s2] = {"speed": "400G"}
+    link_r1_s1 = next(ln for ln, ends in new.links.items() if set(ends) == {r1, s1})
+    new.remove_link(link_r1_s1)
+    new.add_link(s1, r1)  # same pair, new id: not a change
+
+    diff = diff_topologies(old, new)
+    nodes_, links = diff["nodes"], diff["links"]
+    assert [(rec["id"], rec["key"], rec["type"]) for rec in nodes_["added"]] == [(added, "s3", "switch")]
+    assert [(rec["id"], rec["key"]) for rec in nodes_["removed"]] == [(r9, "r9")]
+    assert [(rec["id"], rec["from"], rec["to"]) for rec in nodes_["moved"]] == [(s1, [50.0, 0.0], [80.0, 0.0])]
+    assert [(rec["id"], rec["new"]["attrs"]) for rec in nodes_["changed"]] == [(s2, {"name": "s2", "role": "leaf"})]
+    assert [(rec["id"], rec["ends"]) for rec in links["added"]] == [(link_added, ["s3", "r1"])]
+    assert [sorted(map(str, rec["ends"])) for rec in links["removed"]] == [[str(plain), "r9"]]
+    assert [(rec["id"], rec["new"]) for rec in links["changed"]] == [(link_s1_s2, {"speed": "400G"})]
+    assert diff_summary(diff) == "nodes +1 -1, 1 moved, 1 changed; links +1 -1, 1 changed"
+
+    back = diff_topologies(new, old)
+    assert _ids(back["nodes"]["removed"]) == [added] and _ids(back["nodes"]["added"]) == [r9]
+    assert len(back["links"]["added"]) == len(back["links"]["removed"]) == len(back["links"]["changed"]) == 1
+
+
+def test_kind_change():
+    old, nodes = _model()
+    new = _copy(old)
+    new.set_kinds([nodes[0]], [NODE_KINDS.index("switch")])
+    changed = diff_topologies(old, new)["nodes"]["changed"]
+    assert [(rec["old"]["type"], rec["new"]["type"]) for rec in changed] == [("router", "switch")]
+
+
+def test_names_match_across_ids():
+    old = TopologyModel()
+    a, b = old.add_node("router", 0, 0, name="r1"), old.add_node("switch", 5, 5, name="s1")
+    old.add_link(a, b)
+    new = TopologyModel()
+    new.add_node("router", 0, 0)  # takes id 1, which was r1's
+    s1, r1 = new.add_node("switch", 5, 5, name="s1"), new.add_node("router", 0, 0, name="r1")
+    new.add_link(s1, r1)
+    diff = diff_topologies(old, new)
+    assert [rec["key"] for rec in diff["nodes"]["added"]] == [1]
+    assert not diff["nodes"]["removed"] and not diff["nodes"]["moved"]
+    assert not any(diff["links"].values())
+
+
+def test_duplicate_names_fall_back_to_ids():
+    old = TopologyModel()
+    a, b = old.add_node("router", 0, 0, name="dup"), old.add_node("router", 9, 9, name="dup")
+    assert _diff_names(old) == {}
+    new = _copy(old)
+    new.move_node(b, 10.0, 0.0)
+    diff = diff_topologies(old, new)
+    assert [(rec["key"], rec["id"]) for rec in diff["nodes"]["moved"]] == [(b, b)]
+    assert not diff["nodes"]["added"] and not diff["nodes"]["removed"]
+
+
+def _cli(*args):
+    return subprocess.run([sys.executable, TOPO, *args], capture_output=True, text=True, timeout=120)
+
+
+def test_cli_exit_status(tmp_path):
+    model, _nodes = _model()
+    before, after = str(tmp_path / "before.topo"), str(tmp_path / "after.json")
+    save_snapshot(model, before)
+    model.add_node("switch", 1, 1, name="s3")
+    export_json(model, after)
+
+    same = _cli(before, "--diff", before)
+    assert same.returncode == 0, same.stderr
+    assert diff_is_empty(json.loads(same.stdout))
+
+    changed = _cli(after, "--diff", before)
+    assert changed.returncode == 1, changed.stderr
+    assert [rec["key"] for rec in json.loads(changed.stdout)["nodes"]["added"]] == ["s3"]
+    assert changed.stderr.strip() == "nodes +1 -0, 0 moved, 0 changed; links +0 -0, 0 changed"
+
+    missing = _cli(before, "--diff", str(tmp_path / "missing.topo"))
+    assert missing.returncode == 2
@@ -0,0 +1,153 @@
+import gzip
+import os
+import re
+import struct
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+
+import pytest
+
+from fasttopo import export
+from fasttopo.theme import LABEL_COLOR, NODE_COLORS
+from fasttopo.model import NODE_KINDS, TopologyModel
+from fasttopo.generators import generate_fabric
+from fasttopo.export import export_drawing
+
+TOPO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "topo.py")
+
+
+def _fabric():
+    model = TopologyModel()
+    generate_fabric(model, "spine-leaf:4,16")
+    return model
+
+
+def _png_chunks(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    while pos < len(data):
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + size]
+        assert struct.unpack(">I", data[pos + 8 + size:pos + 12 + size])[0] == zlib.crc32(kind + body)
+        yield kind, body
+        pos += 12 + size
+
+
+def _png_pixels(data):
+    """(width, height, rows of RGB bytes) of an 8-bit RGB PNG written without row filters."""
+    chunks = list(_png_chunks(data))
+    assert chunks[0][0] == b"IHDR" and chunks[-1] == (b"IEND", b"")
+    width, height, depth, color = struct.unpack(">IIBB", chunks[0][1][:10])
+    assert (depth, color) == (8, 2)
+    raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    stride = 1 + 3 * width
+    assert len(raw) == height * stride
+    rows = [raw[i * stride:(i + 1) * stride] for i in range(height)]
+    assert all(row[0] == 0 for row in rows)
+    return width, height, [row[1:] for row in rows]
+
+
+def test_svg_labels_use_label_color(tmp_path):
+    model = TopologyModel()
+    a = model.add_node("router", 0, 0, name="core-1")
+    model.add_link(a, model.add_node("switch", 80, 0, name="leaf-1"))
+    path = tmp_path / "t.svg"
+    export_drawing(model, str(path), legend=False)
+    labels = re.findall(r'<text [^>]*fill="([^"]+)"[^>]*>(core-1|leaf-1)</text>', path.read_text())
+    assert sorted(labels) == [(LABEL_COLOR, "core-1"), (LABEL_COLOR, "leaf-1")]
+
+
+def test_svg_is_valid_and_complete(tmp_path):
+    model = _fabric()
+    for name in ("t.svg", "t.svgz"):
+        path = tmp_path / name
+        export_drawing(model, str(path))
+        data = path.read_bytes()
+        root = ET.fromstring(gzip.decompress(data) if name.endswith("z") else data)
+        ns = "{http://www.w3.org/2000/svg}"
+        assert root.tag == ns + "svg"
+        geometry = export._export_geometry(model, 1.0, True)
+        assert (int(root.get("width")), int(root.get("height"))) == geometry[4:6]
+        # Legend shapes aside, one shape per node and one path segment per link
+        shapes = root.findall(f".//{ns}circle") + root.findall(f"./{ns}g/{ns}rect")
+        assert len(shapes) == len(model.nodes) + 2
+        segments = sum(p.get("d").count("M") for p in root.findall(f"{ns}path"))
+        assert segments == len(model.links) + 1
+
+
+def test_pdf_is_valid(tmp_path):
+    path = tmp_path / "t.pdf"
+    export_drawing(_fabric(), str(path))
+    data = path.read_bytes()
+    assert data.startswith(b"%PDF-") and data.rstrip().endswith(b"%%EOF")
+    xref = int(re.search(rb"startxref\s+(\d+)", data).group(1))
+    assert data[xref:xref + 4] == b"xref"
+    offsets = re.findall(rb"(\d{10}) 00000 n ", data[xref:])
+    assert offsets
+    for number, offset in enumerate(offsets, 1):
+        assert data[int(offset):].startswith(b"%d 0 obj" % number)
+
+
+@pytest.fixture(params=["pillow", "numpy"])
+def rasterizer(request, monkeypatch):
+    if request.param == "pillow":
+        if export.Image is None:
+            pytest.skip("Pillow is not installed")
+    elif export.np is None:
+        pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(export, "Image", None)
+    return request.param
+
+
+def test_png_is_valid_and_draws_nodes(tmp_path, rasterizer, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BAND_PX", 50000)  # several bands even for a small drawing
+    model = _fabric()
+    path = tmp_path / "t.png"
+    export_drawing(model, str(path), labels=False)
+    width, height, rows = _png_pixels(path.read_bytes())
+    x0, y0, scale, top, gw, gh = export._export_geometry(model, 1.0, True, export.EXPORT_MAX_PX)
+    assert (width, height) == (gw, gh)
+    for row in range(len(model.ids)):
+        x = round((model.xs[row] - x0) * scale)
+        y = round(top + (model.ys[row] - y0) * scale)
+        assert rows[y][3 * x:3 * x + 3].hex() == NODE_COLORS[NODE_KINDS[model.kinds[row]]].lstrip("#")
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export_drawing(_fabric(), str(tmp_path / "t.bmp"))
+    assert not list(tmp_path.iterdir())
+
+
+def _cli(*args):
+    return subprocess.run([sys.executable, TOPO, *args], capture_output=True, text=True, timeout=120)
+
+
+def test_cli_export(tmp_path):
+    path = tmp_path / "fabric.svg"
+    done = _cli("--generate", "ring:5", "--export", str(path))
+    assert done.returncode == 0, done.stderr
+    model = TopologyModel()
+    generate_fabric(model, "ring:5")
+    export_drawing(model, str(tmp_path / "direct.svg"))
+    assert path.read_bytes() == (tmp_path / "direct.svg").read_bytes()
+
+
+@pytest.mark.parametrize("args", [
+    ["{tmp}/missing.topo"],
+    ["--import", "{tmp}/missing.csv"],
+    ["--import", "{tmp}/bad.graphml"],
+    ["--generate", "ring:5", "--export", "{tmp}/no/such/dir/t.svg"],
+    ["--generate", "ring:5", "--export", "{tmp}/t.bmp"],
+])
+def test_cli_export_errors_are_reported(tmp_path, args):
+    (tmp_path / "bad.graphml").write_text("<graphml><graph>")
+    args = [arg.format(tmp=tmp_path) for arg in args]
+    if "--export" not in args:
+        args += ["--export", str(tmp_path / "t.svg")]
+    done = _cli(*args)
+    assert done.returncode == 2
+    assert "Traceback" not in done.stderr and "error:" in done.stderr
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from fasttopo.model import NODE_KINDS, TopologyModel, model_digest
+from fasttopo.files import SNAPSHOT_HEADER, export_json, load_topology_file, save_snapshot
+
+
+def _model(seed=1, count=300):
+    rng = random.Random(seed)
+    model = TopologyModel()
+    nodes = model.add_nodes([rng.randrange(len(NODE_KINDS)) for _ in range(count)],
+                            [rng.uniform(-1e4, 1e4) for _ in range(count)],
+                            [rng.uniform(-1e4, 1e4) for _ in range(count)],
+                            [{"name": f"n{i}", "site": f"s{i % 7}"} if i % 2 else None for i in range(count)])
+    model.add_links([(rng.choice(nodes), rng.choice(nodes)) for _ in range(count * 2)],
+                    [{"speed": "10G"} if i % 5 == 0 else None for i in range(count * 2)])
+    # Holes in the id ranges and rows out of id order
+    model.remove_nodes(rng.sample(list(nodes), 30))
+    for link in rng.sample(sorted(model.links), 20):
+        model.remove_link(link)
+    return model
+
+
+@pytest.mark.parametrize("save", [save_snapshot, export_json], ids=["snapshot", "json"])
+def test_save_load_round_trip(tmp_path, save):
+    model = _model()
+    path = str(tmp_path / "t.topo")
+    save(model, path)
+    loaded = load_topology_file(path)
+    assert model_digest(loaded) == model_digest(model)
+    # Indexes are rebuilt, and new ids continue past the loaded ones
+    assert loaded.nodes_in_rect(-1e5, -1e5, 1e5, 1e5) == set(model.nodes)
+    assert loaded.sites.members.keys() == model.sites.members.keys()
+    assert sorted(map(sorted, loaded.components.groups(loaded))) == sorted(map(sorted, model.components.groups(model)))
+    node = loaded.add_node("router", 0.0, 0.0)
+    assert node not in model.nodes and node > max(model.nodes)
+
+
+def test_snapshot_round_trip_of_empty_model(tmp_path):
+    path = str(tmp_path / "empty.topo")
+    save_snapshot(TopologyModel(), path)
+    assert model_digest(load_topology_file(path)) == model_digest(TopologyModel())
+
+
+def test_load_into_existing_model_replaces_it(tmp_path):
+    path = str(tmp_path / "t.topo")
+    save_snapshot(_model(2), path)
+    target = _model(3)
+    assert load_topology_file(path, target) is target
+    assert model_digest(target) == model_digest(_model(2))
+
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "t.topo"
+    save_snapshot(_model(), str(path))
+    data = path.read_bytes()
+    for size in (SNAPSHOT_HEADER.size - 1, SNAPSHOT_HEADER.size + 100, len(data) // 2):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            load_topology_file(str(path))
@@ -0,0 +1,71 @@
+import pytest
+
+from fasttopo.model import NODE_KINDS, TopologyModel
+from fasttopo.generators import GEN_MARGIN, generate_fabric, parse_fabric
+
+
+def _degrees(model, nodes):
+    return sorted(len(model.incident[n]) for n in nodes)
+
+
+@pytest.mark.parametrize("spec, nodes, links", [
+    ("spine-leaf:4,8", 12, 32),
+    ("spine-leaf:1,1", 2, 1),
+    ("fat-tree:4", 20, 32),
+    ("fat-tree:8", 80, 256),
+    ("mesh:6", 6, 15),
+    ("ring:7", 7, 7),
+    ("hub-spoke:10", 11, 10),
+    ("hub-spoke:10,2", 12, 20),
+])
+def test_generator_counts(spec, nodes, links):
+    model = TopologyModel()
+    new_nodes, new_links = generate_fabric(model, spec)
+    assert (len(new_nodes), len(new_links)) == (nodes, links)
+    assert (len(model.nodes), len(model.links)) == (nodes, links)
+    # Every node named once, and every node placed apart from the others
+    names = [model.attrs[n]["name"] for n in new_nodes]
+    assert len(set(names)) == len(names)
+    assert len({model.position(n) for n in new_nodes}) == nodes
+
+
+def test_fat_tree_structure():
+    model = TopologyModel()
+    nodes, _links = generate_fabric(model, "fat-tree:4")
+    kinds = [NODE_KINDS[model.kinds[model.nodes[n]]] for n in nodes]
+    assert kinds.count("router") == 4 and kinds.count("switch") == 16
+    # k ports everywhere but on edge switches, whose hosts are not drawn
+    assert _degrees(model, nodes[:4]) == [4] * 4
+    assert _degrees(model, nodes[4:12]) == [4] * 8
+    assert _degrees(model, nodes[12:]) == [2] * 8
+    assert sorted(model.sites.members) == ["pod1", "pod2", "pod3", "pod4"]
+    assert len(model.components.groups(model)) == 1
+
+
+def test_spine_leaf_links_every_leaf_to_every_spine():
+    model = TopologyModel()
+    nodes, _links = generate_fabric(model, "spine-leaf:3,5")
+    spines, leaves = nodes[:3], nodes[3:]
+    assert all(model.link_exists(s, leaf) for s in spines for leaf in leaves)
+    assert not any(model.link_exists(a, b) for a in leaves for b in leaves if a != b)
+
+
+def test_new_fabric_is_placed_right_of_the_existing_one():
+    model = TopologyModel()
+    first, _ = generate_fabric(model, "ring:8")
+    right = model.bbox(first)[2]
+    second, _ = generate_fabric(model, "mesh:5")
+    assert model.bbox(second)[0] == pytest.approx(right + GEN_MARGIN)
+    assert not model.incident_links(first) & model.incident_links(second)
+
+
+@pytest.mark.parametrize("spec", ["star:4", "fat-tree:3", "fat-tree:0", "spine-leaf:0,2", "spine-leaf:4",
+                                  "spine-leaf:4,x", "hub-spoke:1,2,3", "ring:0"])
+def test_bad_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        generate_fabric(TopologyModel(), spec)
+
+
+def test_parse_fabric():
+    generator, sizes = parse_fabric("hub-spoke:12")
+    assert generator.__name__ == "hub_and_spoke" and sizes == [12]
@@ -0,0 +1,125 @@
+from array import array
+
+import pytest
+
+from fasttopo.model import History, TopologyModel, model_digest
+
+
+def _model():
+    model = TopologyModel()
+    nodes = model.add_nodes([0, 1, 0, 1, 0], [0.0, 40.0, 80.0, 120.0, 160.0], [0.0, 30.0, 0.0, 30.0, 0.0],
+                            [{"name": "r1"}, {"name": "s1", "site": "A"}, None, {"name": "s2", "site": "A"}, None])
+    model.add_links([(nodes[0], nodes[1]), (nodes[1], nodes[2]), (nodes[2], nodes[3]), (nodes[3], nodes[4])],
+                    [{"speed": "100G"}, None, None, None])
+    return model, nodes
+
+
+def _add(model, nodes):
+    new = model.add_nodes([1, 0], [200.0, 240.0], [0.0, 0.0], [{"name": "n1"}, None])
+    links = model.add_links([(new[0], new[1]), (new[0], nodes[0])])
+    return ("add", model.take_rows(new, links))
+
+
+def _remove(model, nodes):
+    rows = model.take_rows([nodes[1]], model.incident_links([nodes[1]]))
+    model.drop_rows(rows)
+    return ("remove", rows)
+
+
+def _clear(model, nodes):
+    cmd = ("clear", model.take_rows(list(model.ids), list(model.links)), model.node_seq)
+    model.clear()
+    return cmd
+
+
+def _move(model, nodes):
+    model.translate(nodes[:3], 25.0, -10.0)
+    return ("move", array("q", nodes[:3]), 25.0, -10.0)
+
+
+def _place(model, nodes):
+    ids = array("q", nodes[1:4])
+    xs0, ys0 = (array("d", col) for col in model.positions(ids))
+    xs1, ys1 = array("d", [1.0, 2.0, 3.0]), array("d", [-1.0, -2.0, -3.0])
+    model.set_positions(ids, xs1, ys1)
+    return ("place", ids, xs0, ys0, xs1, ys1)
+
+
+def _attrs(model, nodes):
+    changes = []
+    for node, new in ((nodes[0], {"name": "r1", "role": "core"}), (nodes[1], None), (nodes[2], {"site": "B"})):
+        old = model.attrs.get(node)
+        model.set_attrs(node, new)
+        changes.append((node, dict(old) if old else None, new))
+    return ("attrs", tuple(changes))
+
+
+def _kinds(model, nodes):
+    ids = array("q", nodes[:2])
+    kinds0 = array("b", (model.kinds[model.nodes[n]] for n in ids))
+    kinds1 = array("b", (1 - k for k in kinds0))
+    model.set_kinds(ids, kinds1)
+    return ("kinds", ids, kinds0, kinds1)
+
+
+def _steps(model, nodes):
+    return ("steps", (_add(model, nodes), _move(model, nodes), _attrs(model, nodes)))
+
+
+@pytest.mark.parametrize("edit", [_add, _remove, _clear, _move, _place, _attrs, _kinds, _steps])
+def test_undo_redo_round_trip(edit):
+    model, nodes = _model()
+    history = History()
+    before = model_digest(model)
+    history.record(edit(model, nodes))
+    after = model_digest(model)
+    assert after != before
+    for _ in range(2):
+        assert history.undo(model) is not None
+        assert model_digest(model) == before
+        assert history.redo(model) is not None
+        assert model_digest(model) == after
+    assert history.redo(model) is None
+
+
+def test_undo_keeps_indexes_current():
+    model, nodes = _model()
+    history = History()
+    history.record(_remove(model, nodes))
+    history.undo(model)
+    assert model.nodes_in_rect(30.0, 20.0, 50.0, 40.0) == {nodes[1]}
+    assert model.sites.members["A"] == {nodes[1], nodes[3]}
+    assert sorted(model.components.groups(model)[0]) == sorted(nodes)
+
+
+def test_record_drops_redo():
+    model, nodes = _model()
+    history = History()
+    history.record(_move(model, nodes))
+    history.undo(model)
+    history.record(_place(model, nodes))
+    assert history.redo(model) is None and len(history.done) == 1
+
+
+def test_budget_evicts_oldest():
+    model, nodes = _model()
+    history = History(budget=1000)
+    cmds = []
+    for i in range(20):
+        model.translate(nodes[:1], 1.0, 0.0)
+        cmds.append(("move", array("q", nodes[:1]), 1.0, 0.0))
+        history.record(cmds[-1])
+    assert history.size <= history.budget
+    assert 1 < len(history.done) < len(cmds)
+    assert [cmd for cmd, _size in history.done] == cmds[-len(history.done):]
+    assert history.size == sum(size for _cmd, size in history.done)
+
+
+def test_budget_keeps_latest_command():
+    model, nodes = _model()
+    history = History(budget=10)
+    history.record(_move(model, nodes))
+    history.record(_clear(model, nodes))
+    assert [cmd[0] for cmd, _size in history.done] == ["clear"]
+    history.undo(model)
+    assert len(model.nodes) == len(nodes)
@@ -0,0 +1,87 @@
+from fasttopo.model import History, TopologyModel, model_digest
+from fasttopo.journal import Journal, recover_journal
+from fasttopo.importers import TopologyImporter, import_topology_file
+
+
+def _names(model):
+    return {node: attrs["name"] for node, attrs in model.attrs.items()}
+
+
+def _link_names(model):
+    names = _names(model)
+    return {frozenset((names[a], names[b])) for a, b in model.links.values()}
+
+
+def _import(tmp_path, name, text, model=None):
+    path = tmp_path / name
+    path.write_text(text)
+    return import_topology_file(str(path), model)
+
+
+def test_dot_group_operands(tmp_path):
+    model = _import(tmp_path, "g.dot", "graph G { a -- b; {c d} -- e; subgraph s {f g} -- h; x -- {y z} }")
+    pairs = {frozenset(p) for p in ("ab", "ce", "de", "fh", "gh", "xy", "xz")}
+    assert _link_names(model) == pairs
+
+
+def test_dot_group_operand_skips_attributes(tmp_path):
+    model = _import(tmp_path, "g.dot", "digraph { {rank=same; p q} -> r; subgraph t { s [shape=box] } -> r }")
+    assert _link_names(model) == {frozenset("pr"), frozenset("qr"), frozenset("sr")}
+
+
+GRAPHML_REFINE = """<?xml version="1.0"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <key id="x" for="node" attr.name="x"/><key id="y" for="node" attr.name="y"/>
+  <key id="t" for="node" attr.name="type"/><key id="r" for="node" attr.name="role"/>
+  <graph edgedefault="undirected">
+    <node id="a"><data key="x">900</data><data key="y">900</data><data key="t">switch</data>
+      <data key="r">core</data></node>
+    <node id="c"/>
+    <edge source="a" target="c"/>
+  </graph>
+</graphml>
+"""
+
+
+def _import_step(model, history, path):
+    """Import path into model as the UI does: one History step, including refined nodes."""
+    importer = TopologyImporter(model)
+    nodes, links = [], []
+    for _stats in importer.run(str(path)):
+        nodes += importer.last_nodes
+        links += importer.last_links
+    cmd = ("add", model.take_rows(nodes, links))
+    refined = importer.refinements()
+    history.record(("steps", (cmd, *refined)) if refined else cmd)
+    return refined
+
+
+def test_import_refinement_is_undone_and_journaled(tmp_path):
+    model = TopologyModel()
+    history = History()
+    journal = Journal(str(tmp_path / "autosave")).start(model)
+    history.listener = journal.append
+    csv_path = tmp_path / "edges.csv"
+    csv_path.write_text("source,target\na,b\n")
+    _import_step(model, history, csv_path)
+    before = model_digest(model)
+    graphml_path = tmp_path / "refine.graphml"
+    graphml_path.write_text(GRAPHML_REFINE)
+    refined = _import_step(model, history, graphml_path)
+    assert {cmd[0] for cmd in refined} == {"kinds", "place", "attrs"}
+
+    a = next(n for n, attrs in model.attrs.items() if attrs["name"] == "a")
+    assert model.position(a) == (900.0, 900.0) and model.kind(a) == "switch"
+    after = model_digest(model)
+    assert journal.flush(5)
+    assert model_digest(recover_journal(journal.directory)) == after
+
+    history.undo(model)
+    assert model_digest(model) == before
+    assert model.position(a) != (900.0, 900.0) and model.kind(a) == "router"
+    assert "role" not in model.attrs[a]
+    history.redo(model)
+    assert model_digest(model) == after
+    assert journal.flush(5)
+    journal.close()
+    assert model_digest(recover_journal(journal.directory)) == after
@@ -0,0 +1,158 @@
+import json
+import math
+import random
+
+import pytest
+
+from fasttopo.model import TopologyModel, model_digest
+from fasttopo.instrument import (
+    PROFILE_BUCKETS_PER_OCTAVE, RECORD_VERSION, InputRecorder, Profiler, RecordedEvent, latency_summary,
+    read_recording,
+)
+
+BUCKET_ERROR = 2 ** (1 / PROFILE_BUCKETS_PER_OCTAVE)  # relative width of a histogram bucket
+
+
+def _exact(durations, q):
+    ordered = sorted(durations)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def test_percentiles_are_within_a_bucket():
+    rng = random.Random(1)
+    durations = [rng.lognormvariate(-7.0, 1.5) for _ in range(5000)]  # ~1 ms, long tail
+    profiler = Profiler()
+    for d in durations:
+        profiler.record("handler", 0.0, d)
+    for q in (0.5, 0.95, 0.99):
+        exact = _exact(durations, q)
+        # Bucket upper bounds: never below the true value, at most one bucket above
+        assert exact <= profiler.percentile("handler", q) <= exact * BUCKET_ERROR
+    assert profiler.percentile("handler", 1.0) == max(durations)
+
+
+def test_percentiles_of_constant_and_tiny_durations():
+    profiler = Profiler()
+    for _ in range(100):
+        profiler.record("fast", 0.0, 1e-9)
+        profiler.record("flat", 0.0, 0.004)
+    assert profiler.percentile("fast", 0.5) == 1e-9
+    # Capped by the longest call, so one repeated duration comes back exactly
+    assert profiler.percentile("flat", 0.5) == profiler.percentile("flat", 0.99) == 0.004
+
+
+def test_summary_lists_slowest_first():
+    profiler = Profiler()
+    for i in range(100):
+        profiler.record("drag", 0.0, 0.001)
+        profiler.record("zoom", 0.0, 0.020 if i == 99 else 0.002)
+    summary = profiler.summary()
+    assert list(summary) == ["zoom", "drag"]
+    assert summary["zoom"]["calls"] == 100
+    assert summary["zoom"]["max_ms"] == pytest.approx(20.0)
+    assert summary["drag"]["p50_ms"] <= summary["drag"]["p99_ms"] <= summary["drag"]["max_ms"]
+
+
+def test_wrap_times_calls_and_passes_results_and_errors():
+    profiler = Profiler()
+    double = profiler.wrap("double", lambda x: 2 * x)
+    assert double(21) == 42 and double.__wrapped__(1) == 2
+
+    def fail():
+        raise KeyError("x")
+    failing = profiler.wrap("fail", fail)
+    with pytest.raises(KeyError):
+        failing()
+    assert profiler.stats["double"][0] == 1 and profiler.stats["fail"][0] == 1
+
+
+def test_dump_writes_a_chrome_trace(tmp_path):
+    profiler = Profiler(max_events=3)
+    for i in range(5):
+        profiler.record("render", profiler.t0 + i, 0.001)
+    profiler.counter("items", nodes=10, links=20)
+    path = tmp_path / "trace.json"
+    profiler.dump(str(path))
+    doc = json.loads(path.read_text())
+    calls = [e for e in doc["traceEvents"] if e["ph"] == "X"]
+    counters = [e for e in doc["traceEvents"] if e["ph"] == "C"]
+    # The trace keeps the newest calls only; the histograms keep them all
+    assert [e["ts"] for e in calls] == [2e6, 3e6, 4e6]
+    assert counters[0]["args"] == {"nodes": 10, "links": 20}
+    assert doc["summary"]["render"]["calls"] == 5
+
+
+def _record(path):
+    recorder = InputRecorder(str(path), {"width": 1200, "height": 800})
+    seen = []
+    press = recorder.wrap("canvas", "<ButtonPress-1>", lambda e: seen.append((e.x, e.y)))
+    wheel = recorder.wrap("canvas", "<MouseWheel>", lambda e: seen.append(e.delta))
+    key = recorder.wrap("root", "<Delete>", lambda e: seen.append("del"))
+    frame = recorder.frame(lambda: seen.append("frame"))
+    press(RecordedEvent(10, 20))
+    frame()
+    wheel(RecordedEvent(5, 6, 120))
+    key(RecordedEvent("??", "??"))  # Tk reports "??" for fields a key event lacks
+    frame()
+    recorder.close({"digest": "abc", "events": recorder.count})
+    return seen
+
+
+def test_recording_round_trip(tmp_path):
+    path = tmp_path / "session.jsonl"
+    assert _record(path) == [(10, 20), "frame", 120, "del", "frame"]
+    header, events, trailer = read_recording(str(path))
+    assert header == {"version": RECORD_VERSION, "width": 1200, "height": 800}
+    assert trailer == {"digest": "abc", "events": 3}
+    assert [(target, sequence) for _t, target, sequence, _e in events] == [
+        ("canvas", "<ButtonPress-1>"), (None, None), ("canvas", "<MouseWheel>"), ("root", "<Delete>"), (None, None)]
+    assert [(e.x, e.y, e.delta) for *_rest, e in events if e is not None] == [(10, 20, 0), (5, 6, 120), (0, 0, 0)]
+    times = [t for t, *_rest in events]
+    assert times == sorted(times)
+
+
+def test_recording_cut_short_replays_whole_lines(tmp_path):
+    path = tmp_path / "session.jsonl"
+    _record(path)
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:4]) + lines[4][:7])
+    header, events, trailer = read_recording(str(path))
+    assert len(events) == 3 and trailer == {}
+
+
+@pytest.mark.parametrize("text", ["", "not json\n", "[1, 2]\n", '{"width": 1}\n',
+                                  '{"version": %d}\n' % (RECORD_VERSION + 1)])
+def test_bad_recordings_are_rejected(tmp_path, text):
+    path = tmp_path / "bad.jsonl"
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        read_recording(str(path))
+
+
+def test_latency_summary():
+    summary = latency_summary([float(ms) for ms in range(100, 0, -1)])
+    assert summary == {"count": 100, "mean": 50.5, "p50": 51.0, "p95": 96.0, "p99": 100.0, "max": 100.0}
+    assert latency_summary([]) == {"count": 0}
+
+
+def test_model_digest_ignores_row_order_only():
+    model = TopologyModel()
+    nodes = model.add_nodes([0, 1, 0, 1], [0.0, 10.0, 20.0, 30.0], [5.0, 5.0, 5.0, 5.0],
+                            [{"name": "a"}, None, {"name": "c"}, None])
+    model.add_links([(nodes[0], nodes[1]), (nodes[2], nodes[3])], [{"speed": "1G"}, None])
+    digest = model_digest(model)
+    assert model_digest(model) == digest
+    # Removing and restoring a node changes its row, not the topology
+    rows = model.take_rows([nodes[0]], model.incident_links([nodes[0]]))
+    model.drop_rows(rows)
+    model.restore_rows(rows)
+    assert model.nodes[nodes[0]] != 0
+    assert model_digest(model) == digest
+    # Anything else changes it: a position, a kind, an attribute, a link
+    for edit in (lambda: model.translate([nodes[1]], 1e-9, 0.0),
+                 lambda: model.set_kinds([nodes[2]], [1]),
+                 lambda: model.set_attrs(nodes[3], {"name": "d"}),
+                 lambda: model.add_link(nodes[1], nodes[2])):
+        edit()
+        assert model_digest(model) != digest
+        digest = model_digest(model)
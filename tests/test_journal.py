@@ -0,0 +1,208 @@
+from array import array
+import os
+
+import pytest
+
+from fasttopo.model import History, TopologyModel, model_digest
+from fasttopo.journal import (
+    JOURNAL_HEADER, JOURNAL_NAME, JOURNAL_RECORD, Journal, lock_journal, read_journal, recover_journal,
+    set_aside_journal, _journal_snapshot,
+)
+from fasttopo.importers import TopologyImporter
+from fasttopo.generators import generate_fabric
+
+
+def _journal(tmp_path, model, **kw):
+    journal = Journal(str(tmp_path / "autosave"), sync_s=0, **kw).start(model)
+    history = History()
+    history.listener = journal.append
+    return journal, history
+
+
+def _edits(model, history):
+    """A few edits of every kind, each recorded; yields after each one."""
+    nodes = model.add_nodes([0, 1, 0, 1], [0.0, 50.0, 100.0, 150.0], [0.0, 0.0, 50.0, 50.0],
+                            [{"name": "r1"}, {"name": "s1"}, None, {"name": "r2", "site": "A"}])
+    links = model.add_links([(nodes[0], nodes[1]), (nodes[1], nodes[2]), (nodes[2], nodes[3])])
+    history.record(("add", model.take_rows(nodes, links)))
+    yield
+    model.translate(nodes[:2], 10.0, -5.0)
+    history.record(("move", array("q", nodes[:2]), 10.0, -5.0))
+    yield
+    old = dict(model.attrs[nodes[0]])
+    model.set_attrs(nodes[0], {**old, "role": "core"})
+    history.record(("attrs", ((nodes[0], old, dict(model.attrs[nodes[0]])),)))
+    yield
+    rows = model.take_rows([nodes[2]], model.incident_links([nodes[2]]))
+    model.drop_rows(rows)
+    history.record(("remove", rows))
+    yield
+    history.undo(model)
+    yield
+    history.redo(model)
+    yield
+
+
+def _record_ends(data):
+    """Byte offset where each complete record of a journal ends."""
+    ends = []
+    off = JOURNAL_HEADER.size
+    while off + JOURNAL_RECORD.size <= len(data):
+        length = JOURNAL_RECORD.unpack_from(data, off)[0]
+        off += JOURNAL_RECORD.size + length
+        if off <= len(data):
+            ends.append(off)
+    return ends
+
+
+def test_recover_matches_live_model(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    for _ in _edits(model, history):
+        pass
+    journal.close()
+    assert journal.error is None
+    assert model_digest(recover_journal(journal.directory)) == model_digest(model)
+
+
+def test_torn_journal_recovers_a_prefix(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    digests = [model_digest(model)]
+    for _ in _edits(model, history):
+        digests.append(model_digest(model))
+    journal.close()
+    with open(journal.path, "rb") as f:
+        data = f.read()
+    ends = _record_ends(data)
+    assert len(ends) == len(digests) - 1
+
+    torn = str(tmp_path / "torn")
+    os.makedirs(torn)
+    snapshot = _journal_snapshot(journal.directory, journal.generation)
+    with open(snapshot, "rb") as f:
+        with open(_journal_snapshot(torn, journal.generation), "wb") as out:
+            out.write(f.read())
+    for cut in range(JOURNAL_HEADER.size, len(data) + 1):
+        with open(os.path.join(torn, JOURNAL_NAME), "wb") as f:
+            f.write(data[:cut])
+        complete = sum(1 for end in ends if end <= cut)
+        assert model_digest(recover_journal(torn)) == digests[complete], cut
+
+
+def test_corrupt_record_drops_it_and_the_rest(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    digests = [model_digest(model)]
+    for _ in _edits(model, history):
+        digests.append(model_digest(model))
+    journal.close()
+    with open(journal.path, "rb") as f:
+        data = bytearray(f.read())
+    ends = _record_ends(bytes(data))
+    data[ends[1] + JOURNAL_RECORD.size] ^= 0xFF  # first payload byte of the third record
+    with open(journal.path, "wb") as f:
+        f.write(data)
+    generation, records = read_journal(bytes(data))
+    assert generation == journal.generation and len(records) == 2
+    assert model_digest(recover_journal(journal.directory)) == digests[2]
+
+
+def test_compaction_switches_generation(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model, compact_bytes=256)
+    for _ in _edits(model, history):
+        assert journal.flush(5)
+    journal.close()
+    assert journal.error is None and journal.generation > 1
+    files = sorted(os.listdir(journal.directory))
+    assert files == sorted([JOURNAL_NAME, os.path.basename(_journal_snapshot(".", journal.generation))])
+    with open(journal.path, "rb") as f:
+        assert read_journal(f.read())[0] == journal.generation
+    assert model_digest(recover_journal(journal.directory)) == model_digest(model)
+
+
+def test_rebase_takes_edits_made_outside_history(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    for _ in _edits(model, history):
+        pass
+    assert journal.flush(5)
+    generation = journal.generation
+    generate_fabric(model, "ring:12")  # not recorded
+    journal.rebase(model)
+    model.translate(list(model.nodes)[:3], 1.0, 2.0)
+    history.record(("move", array("q", list(model.nodes)[:3]), 1.0, 2.0))
+    journal.close()
+    assert journal.generation == generation + 1
+    assert model_digest(recover_journal(journal.directory)) == model_digest(model)
+
+
+def test_import_then_refinement(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    first = tmp_path / "first.csv"
+    first.write_text("source,target\na,b\nb,c\n")
+    second = tmp_path / "second.dot"
+    second.write_text('graph { a [pos="900,-900", shape=box, role=core]; c -- d }')
+    for path in (first, second):
+        importer = TopologyImporter(model)
+        nodes, links = [], []
+        for _stats in importer.run(str(path)):
+            nodes += importer.last_nodes
+            links += importer.last_links
+        cmd = ("add", model.take_rows(nodes, links))
+        refined = importer.refinements()
+        history.record(("steps", (cmd, *refined)) if refined else cmd)
+    a = next(n for n, attrs in model.attrs.items() if attrs["name"] == "a")
+    assert model.position(a) == (900.0, 900.0) and model.kind(a) == "switch"
+    journal.close()
+    assert model_digest(recover_journal(journal.directory)) == model_digest(model)
+
+
+def test_one_process_at_a_time_owns_a_directory(tmp_path):
+    directory = str(tmp_path / "autosave")
+    lock = lock_journal(directory)
+    assert lock is not None
+    assert lock_journal(directory) is None  # a second window: no recovery, no journal
+    model = TopologyModel()
+    journal = Journal(directory, sync_s=0, lock=lock).start(model)
+    generate_fabric(model, "ring:4")
+    journal.rebase(model)
+    assert lock_journal(directory) is None
+    journal.close()
+    assert journal.lock is None
+    again = lock_journal(directory)
+    assert again is not None
+    again.close()
+    assert model_digest(recover_journal(directory)) == model_digest(model)
+
+
+def test_unreadable_session_is_set_aside(tmp_path):
+    model = TopologyModel()
+    journal, history = _journal(tmp_path, model)
+    for _ in _edits(model, history):
+        pass
+    journal.close()
+    snapshot = _journal_snapshot(journal.directory, journal.generation)
+    with open(snapshot, "r+b") as f:
+        f.write(b"garbage!")
+    with open(journal.path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        recover_journal(journal.directory)
+
+    moved = set_aside_journal(journal.directory)
+    assert sorted(os.path.basename(path).split(".corrupt-")[0] for path in moved) == \
+        sorted([JOURNAL_NAME, os.path.basename(snapshot)])
+    assert recover_journal(journal.directory) is None
+    # The next session journals from scratch and leaves the set-aside files as they were
+    fresh = TopologyModel()
+    generate_fabric(fresh, "mesh:4")
+    Journal(journal.directory, sync_s=0).start(fresh).close()
+    assert model_digest(recover_journal(journal.directory)) == model_digest(fresh)
+    kept = next(path for path in moved if path.startswith(journal.path))
+    with open(kept, "rb") as f:
+        assert f.read() == data
+    with open(next(path for path in moved if path.startswith(snapshot)), "rb") as f:
+        assert f.read(8) == b"garbage!"
@@ -0,0 +1,83 @@
+import math
+import random
+import time
+
+import pytest
+
+from fasttopo import layout
+from fasttopo.model import TopologyModel
+from fasttopo.generators import generate_fabric
+from fasttopo.layout import LAYOUTS, LayoutJob, apply_layout
+
+
+def _fabric(spec="spine-leaf:4,12", pin=6, seed=1):
+    model = TopologyModel()
+    nodes, _links = generate_fabric(model, spec)
+    rng = random.Random(seed)
+    # Scramble, then pin a few nodes where the user "dropped" them
+    model.set_positions(nodes, [rng.uniform(-500.0, 500.0) for _ in nodes], [rng.uniform(-500.0, 500.0) for _ in nodes])
+    pinned = rng.sample(list(nodes), pin)
+    for node in pinned:
+        model.set_attrs(node, {"pinned": True})
+    return model, list(nodes), pinned
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if layout.np is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(layout, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("algorithm", sorted(LAYOUTS))
+def test_pinned_nodes_keep_their_position(algorithm, backend):
+    model, nodes, pinned = _fabric()
+    before = {node: model.position(node) for node in pinned}
+    apply_layout(model, algorithm)
+    assert {node: model.position(node) for node in pinned} == before
+    moved = [node for node in nodes if node not in before]
+    assert all(math.isfinite(c) for node in moved for c in model.position(node))
+
+
+@pytest.mark.parametrize("algorithm", sorted(LAYOUTS))
+def test_layout_spreads_nodes_apart(algorithm, backend):
+    model, nodes, _pinned = _fabric(pin=0)
+    apply_layout(model, algorithm)
+    positions = [model.position(node) for node in nodes]
+    closest = min(math.dist(p, q) for i, p in enumerate(positions) for q in positions[i + 1:])
+    assert closest > layout.NODE_RADIUS
+
+
+def test_layered_puts_spines_on_one_layer():
+    model, nodes, _pinned = _fabric(pin=0)
+    apply_layout(model, "layered")
+    spines, leaves = nodes[:4], nodes[4:]
+    assert len({model.position(node)[1] for node in spines}) == 1
+    assert len({model.position(node)[1] for node in leaves}) == 1
+
+
+def test_warm_start_keeps_the_picture():
+    model, nodes, _pinned = _fabric(pin=0)
+    apply_layout(model, "force")
+    settled = [model.position(node) for node in nodes]
+    apply_layout(model, "force", warm=True)
+    drift = max(math.dist(p, model.position(node)) for p, node in zip(settled, nodes))
+    assert drift < 2 * layout.LAYOUT_EDGE
+
+
+def test_job_streams_positions_from_a_thread():
+    model, nodes, _pinned = _fabric("fat-tree:4")
+    job = LayoutJob(model, "force").start()
+    frames = 0
+    deadline = time.monotonic() + 30
+    while not job.done and time.monotonic() < deadline:
+        frames += job.take() is not None
+        time.sleep(0.001)
+    assert job.done and job.error is None
+    latest = job.take()
+    assert frames or latest is not None
+    # The worker never touched the live model
+    assert model.position(nodes[0]) == (job.xs[0], job.ys[0])
@@ -0,0 +1,91 @@
+import socket
+import time
+
+import pytest
+
+from fasttopo.live import LiveFeed, merge_live, parse_live_event
+
+
+@pytest.mark.parametrize("line, event", [
+    ('{"link": ["r2", "r1"], "state": "down"}', ("link", ("r1", "r2"), "down", None)),
+    ('{"link": ["r1", "r2"], "util": 0.93}', ("link", ("r1", "r2"), None, 0.93)),
+    ('{"node": 7, "state": "flapping"}', ("node", "7", "flapping", None)),
+    ("link r2 r1 down", ("link", ("r1", "r2"), "down", None)),
+    ("  link r1 r2 up 0.5 ", ("link", ("r1", "r2"), "up", 0.5)),
+    ("node r1 flapping", ("node", "r1", "flapping", None)),
+])
+def test_parse_live_event(line, event):
+    assert parse_live_event(line) == event
+
+
+@pytest.mark.parametrize("line", [
+    "", "hello", "link r1 down", "link r1 r2", "node r1 sideways", "link r1 r2 up fast", "node r1 up 0.5 9",
+    '{"state": "down"}', '{"link": ["r1"], "state": "down"}', '{"node": "r1", "state": "gone"}', "{broken",
+])
+def test_parse_live_event_rejects(line):
+    with pytest.raises(ValueError):
+        parse_live_event(line)
+
+
+def test_merge_keeps_fields_an_event_leaves_out():
+    states = {}
+    merge_live(states, "r1", "up", 0.2)
+    merge_live(states, "r1", None, 0.9)
+    assert states["r1"] == ("up", 0.9)
+    merge_live(states, "r1", "down", None)
+    assert states["r1"] == ("down", 0.9)
+
+
+def test_feed_coalesces_to_the_latest_state():
+    feed = LiveFeed("-")
+    lines = [f"link r1 r2 up {i / 1000}" for i in range(1000)] + ["node r3 down", "garbage", "", "link r2 r1 down"]
+    feed.feed("\n".join(lines).encode())
+    links, nodes = feed.take()
+    assert links == {("r1", "r2"): ("down", 0.999)}
+    assert nodes == {"r3": ("down", None)}
+    assert (feed.received, feed.rejected) == (1002, 1)
+    assert feed.take() == ({}, {})
+
+
+def _wait(feed, count, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while feed.received < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_follows_a_growing_file(tmp_path):
+    path = tmp_path / "live.log"
+    path.write_text("link a b up 0.1\nlink a b up 0.2\n")
+    feed = LiveFeed(str(path)).start()
+    try:
+        _wait(feed, 2)
+        with open(path, "a") as f:
+            f.write("link a b do")  # half a line is held back until it ends
+            f.flush()
+            time.sleep(0.3)
+            assert feed.received == 2
+            f.write("wn\nnode a flapping\n")
+        _wait(feed, 4)
+        assert feed.take() == ({("a", "b"): ("down", 0.2)}, {"a": ("flapping", None)})
+    finally:
+        feed.stop()
+    assert feed.error is None
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="UNIX sockets only")
+def test_reads_a_unix_socket(tmp_path):
+    path = str(tmp_path / "live.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    feed = LiveFeed("unix:" + path).start()
+    try:
+        server.settimeout(10)
+        conn, _ = server.accept()
+        with conn:
+            conn.sendall(b"link x y down\nnode x up\n")
+            _wait(feed, 2)
+        assert feed.take() == ({("x", "y"): ("down", None)}, {"x": ("up", None)})
+    finally:
+        feed.stop()
+        server.close()
@@ -0,0 +1,117 @@
+import random
+
+from fasttopo.model import NODE_KINDS, TopologyModel, model_digest
+
+
+def _random_model(seed, count=200, degree=3):
+    rng = random.Random(seed)
+    model = TopologyModel()
+    nodes = model.add_nodes([rng.randrange(len(NODE_KINDS)) for _ in range(count)],
+                            [rng.uniform(0.0, 2000.0) for _ in range(count)],
+                            [rng.uniform(0.0, 2000.0) for _ in range(count)],
+                            [{"name": f"n{i}"} if i % 3 else None for i in range(count)])
+    model.add_links([(rng.choice(nodes), rng.choice(nodes)) for _ in range(count * degree // 2)])
+    return model, list(nodes), rng
+
+
+def _check_consistent(model):
+    """Columns dense, and every index agrees with the nodes and links."""
+    assert len(model.ids) == len(model.xs) == len(model.ys) == len(model.kinds) == len(model.seqs)
+    assert sorted(model.nodes.values()) == list(range(len(model.ids)))
+    assert all(model.ids[row] == node for node, row in model.nodes.items())
+    assert set(model.incident) == set(model.nodes)
+    pairs = {}
+    for link, (a, b) in model.links.items():
+        assert a != b and a in model.nodes and b in model.nodes
+        assert link in model.incident[a] and link in model.incident[b]
+        pairs[(min(a, b), max(a, b))] = link
+    assert model._pairs == pairs
+    assert sum(len(links) for links in model.incident.values()) == 2 * len(model.links)
+    assert model.nodes_in_rect(-1e9, -1e9, 1e9, 1e9) == set(model.nodes)
+
+
+def test_add_node_and_link():
+    model = TopologyModel()
+    r = model.add_node("router", 10.0, 20.0, name="r1")
+    s = model.add_node("switch", 50.0, 20.0)
+    link = model.add_link(r, s, speed="10G")
+    assert model.position(r) == (10.0, 20.0)
+    assert NODE_KINDS[model.kinds[model.nodes[s]]] == "switch"
+    assert model.attrs == {r: {"name": "r1"}}
+    assert model.links[link] == (r, s) and model.link_attrs[link] == {"speed": "10G"}
+    assert model.neighbors(r) == [s]
+    _check_consistent(model)
+
+
+def test_remove_then_restore_round_trip():
+    model, nodes, rng = _random_model(1)
+    before = model_digest(model)
+    gone = rng.sample(nodes, 40)
+    rows = model.take_rows(gone, model.incident_links(gone))
+    model.drop_rows(rows)
+    assert not set(gone) & set(model.nodes)
+    _check_consistent(model)
+    model.restore_rows(rows)
+    assert model_digest(model) == before
+    _check_consistent(model)
+
+
+def test_add_then_remove_round_trip():
+    model, nodes, rng = _random_model(2)
+    before = model_digest(model)
+    new = model.add_nodes([0] * 30, [rng.uniform(0.0, 2000.0) for _ in range(30)],
+                          [rng.uniform(0.0, 2000.0) for _ in range(30)])
+    links = model.add_links([(n, rng.choice(nodes)) for n in new])
+    _check_consistent(model)
+    model.drop_rows(model.take_rows(new, links))
+    assert model_digest(model) == before
+    _check_consistent(model)
+
+
+def test_interleaved_removals_keep_rows_dense():
+    model, nodes, rng = _random_model(3)
+    alive = set(nodes)
+    for _ in range(150):
+        if rng.random() < 0.6 and alive:
+            node = rng.choice(sorted(alive))
+            removed = model.remove_node(node)
+            alive.discard(node)
+            assert not set(removed) & set(model.links)
+        else:
+            alive.add(model.add_node("switch", rng.uniform(0.0, 2000.0), rng.uniform(0.0, 2000.0)))
+    assert set(model.nodes) == alive
+    _check_consistent(model)
+
+
+def test_add_link_rejects_self_loop_and_duplicate_pair():
+    model = TopologyModel()
+    a = model.add_node("router", 0.0, 0.0)
+    b = model.add_node("router", 40.0, 0.0)
+    link = model.add_link(a, b)
+    assert model.add_link(a, a) is None
+    assert model.add_link(b, a, speed="1G") == link
+    assert model.add_link(a, b) == link
+    assert list(model.links) == [link] and link not in model.link_attrs
+    model.remove_link(link)
+    assert not model.link_exists(a, b)
+    again = model.add_link(b, a)
+    assert again != link and model.link_between(a, b) == again
+    _check_consistent(model)
+
+
+def test_link_lookups_after_removals():
+    model, nodes, rng = _random_model(4, degree=6)
+    for link in rng.sample(sorted(model.links), 100):
+        model.remove_link(link)
+    model.remove_nodes(rng.sample(nodes, 50))
+    pairs = {frozenset(ends): link for link, ends in model.links.items()}
+    alive = sorted(model.nodes)
+    for a in alive[:60]:
+        for b in alive:
+            link = pairs.get(frozenset((a, b)))
+            assert model.link_exists(a, b) == (link is not None)
+            assert model.link_between(a, b) == link
+    group = rng.sample(alive, 20)
+    assert model.incident_links(group) == {ln for ln, (a, b) in model.links.items() if a in group or b in group}
+    assert model.incident_links([-1]) == set()
+    _check_consistent(model)
@@ -0,0 +1,36 @@
+import json
+
+from fasttopo.files import load_json
+
+
+def _json_model(tmp_path, site):
+    path = tmp_path / "t.json"
+    path.write_text(json.dumps({
+        "nodes": [{"id": 1, "type": "router", "x": 0, "y": 0, "attrs": {"site": site}},
+                  {"id": 2, "type": "router", "x": 10, "y": 0, "attrs": {"site": site}},
+                  {"id": 3, "type": "switch", "x": 50, "y": 0},
+                  {"id": 7, "type": "switch", "x": 90, "y": 0}],
+        "links": [{"id": 1, "a": 1, "b": 2}, {"id": 2, "a": 2, "b": 3}, {"id": 3, "a": 1, "b": 7},
+                  {"id": 4, "a": 3, "b": 7}],
+    }))
+    return load_json(str(path))
+
+
+def test_numeric_site_names_are_strings(tmp_path):
+    model = _json_model(tmp_path, 7)  # same value as node 7's id
+    sites = model.sites
+    assert sites.members == {"7": {1, 2}}
+    sites.collapse(model, "7")
+    assert sites.hidden == {1, 2}
+    assert sites.agg == {("7", 3): 1, ("7", 7): 1}
+
+
+def test_numeric_site_assigned_after_collapse(tmp_path):
+    model = _json_model(tmp_path, "7")
+    sites = model.sites
+    sites.collapse(model, "7")
+    model.set_attrs(3, {"site": 7})
+    assert sites.of[3] == "7" and 3 in sites.hidden
+    assert sites.agg == {("7", 7): 2}
+    model.set_attrs(3, None)
+    assert sites.agg == {("7", 3): 1, ("7", 7): 1}
@@ -0,0 +1,158 @@
+import math
+import random
+
+from fasttopo.model import NODE_KINDS, NODE_RADIUS, TopologyModel, _dist_point_to_segment, _dist_point_to_segments
+
+
+def _scatter(seed, count=500, size=3000.0):
+    rng = random.Random(seed)
+    model = TopologyModel()
+    nodes = model.add_nodes([rng.randrange(len(NODE_KINDS)) for _ in range(count)],
+                            [rng.uniform(-size, size) for _ in range(count)],
+                            [rng.uniform(-size, size) for _ in range(count)])
+    return model, list(nodes), rng
+
+
+def _rect(rng, size=3000.0):
+    x0, x1 = sorted(rng.uniform(-size, size) for _ in range(2))
+    y0, y1 = sorted(rng.uniform(-size, size) for _ in range(2))
+    return x0, y0, x1, y1
+
+
+def _brute_in_rect(model, x0, y0, x1, y1):
+    return {n for n in model.nodes if x0 <= model.position(n)[0] <= x1 and y0 <= model.position(n)[1] <= y1}
+
+
+def test_nodes_in_rect_matches_brute_force():
+    model, nodes, rng = _scatter(1)
+    for _ in range(50):
+        rect = _rect(rng)
+        assert model.nodes_in_rect(*rect) == _brute_in_rect(model, *rect)
+
+
+def test_grid_follows_moves_and_removals():
+    model, nodes, rng = _scatter(2)
+    model.translate(nodes[:100], 250.0, -130.0)
+    for node in nodes[100:150]:
+        model.move_node(node, rng.uniform(-500.0, 500.0), rng.uniform(-500.0, 500.0))
+    model.set_positions(nodes[150:200], [0.0] * 50, [float(i) for i in range(50)])
+    model.remove_nodes(nodes[200:260])
+    for _ in range(50):
+        rect = _rect(rng, 3600.0)
+        assert model.nodes_in_rect(*rect) == _brute_in_rect(model, *rect)
+
+
+def test_query_changed_tracks_a_dragged_box():
+    """Updating only the candidates of query_changed keeps a box selection exact."""
+    model, nodes, rng = _scatter(3)
+    x0, y0 = -1000.0, -800.0
+    old = (x0, y0, x0, y0)
+    selected = model.nodes_in_rect(*old)
+    for step in range(1, 80):
+        # The free corner wanders, so the box grows, shrinks and flips around its anchor
+        x1 = x0 + 2500.0 * math.sin(step * 0.21)
+        y1 = y0 + 2000.0 * math.cos(step * 0.13)
+        new = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        for node in model.grid.query_changed(old, new):
+            if model.in_rect(node, *new):
+                selected.add(node)
+            else:
+                selected.discard(node)
+        assert selected == _brute_in_rect(model, *new)
+        old = new
+
+
+def test_node_at_picks_the_nearest_shape():
+    model = TopologyModel()
+    router = model.add_node("router", 0.0, 0.0)
+    switch = model.add_node("switch", 100.0, 0.0)
+    assert model.node_at(3.0, 4.0, NODE_RADIUS) == router
+    # Corners count for switches (squares), not for routers (circles)
+    assert model.node_at(100.0 + NODE_RADIUS - 1, NODE_RADIUS - 1, NODE_RADIUS) == switch
+    assert model.node_at(NODE_RADIUS - 1, NODE_RADIUS - 1, NODE_RADIUS) is None
+    assert model.node_at(0.0, 0.0, NODE_RADIUS, skip={router}) is None
+    assert model.node_at(50.0, 0.0, NODE_RADIUS) is None
+
+
+def _linked(seed, count=300, links=900):
+    model, nodes, rng = _scatter(seed, count)
+    # Mostly short links, plus some spanning the whole scatter (coarse index levels)
+    pairs = []
+    for _ in range(links):
+        a = rng.choice(nodes)
+        if rng.random() < 0.9:
+            ax, ay = model.position(a)
+            b = min(rng.sample(nodes, 20), key=lambda n: math.dist(model.position(n), (ax, ay)))
+        else:
+            b = rng.choice(nodes)
+        pairs.append((a, b))
+    model.add_links(pairs)
+    return model, nodes, rng
+
+
+def _brute_link_at(model, x, y, tol, skip=()):
+    best, best_d = None, None
+    for link, (a, b) in model.links.items():
+        if a in skip or b in skip:
+            continue
+        d = _dist_point_to_segment(x, y, *model.segment(link))
+        if d <= tol and (best_d is None or d < best_d):
+            best, best_d = link, d
+    return best
+
+
+def _pick(model, x, y, link):
+    """Distance to a picked link: links sharing the nearest end tie, so picks are compared by distance."""
+    return None if link is None else _dist_point_to_segment(x, y, *model.segment(link))
+
+
+def test_link_at_matches_brute_force():
+    model, nodes, rng = _linked(4)
+    hits = 0
+    for _ in range(400):
+        link = rng.choice(sorted(model.links))
+        x1, y1, x2, y2 = model.segment(link)
+        t = rng.random()
+        # Points on or near a link, so most probes do hit something
+        x = x1 + t * (x2 - x1) + rng.uniform(-12.0, 12.0)
+        y = y1 + t * (y2 - y1) + rng.uniform(-12.0, 12.0)
+        expected = _brute_link_at(model, x, y, 10.0)
+        assert _pick(model, x, y, model.link_at(x, y, 10.0)) == _pick(model, x, y, expected)
+        hits += expected is not None
+        skip = set(model.links[link])
+        assert (_pick(model, x, y, model.link_at(x, y, 10.0, skip=skip))
+                == _pick(model, x, y, _brute_link_at(model, x, y, 10.0, skip)))
+    assert hits > 200
+
+
+def test_link_index_follows_moves_and_removals():
+    model, nodes, rng = _linked(5)
+    model.translate(nodes[:50], 400.0, 400.0)
+    model.remove_nodes(nodes[50:80])
+    for link in rng.sample(sorted(model.links), 100):
+        model.remove_link(link)
+    for _ in range(200):
+        x, y = rng.uniform(-3000.0, 3000.0), rng.uniform(-3000.0, 3000.0)
+        assert _pick(model, x, y, model.link_at(x, y, 40.0)) == _pick(model, x, y, _brute_link_at(model, x, y, 40.0))
+
+
+def test_links_in_rect_covers_every_crossing_link():
+    model, nodes, rng = _linked(6)
+    for _ in range(30):
+        x0, y0, x1, y1 = _rect(rng)
+        found = model.links_in_rect(x0, y0, x1, y1)
+        for link in model.links:
+            sx0, sy0, sx1, sy1 = model.segment(link)
+            # Sampled points of the segment that fall inside the rect must be found
+            inside = any(x0 <= sx0 + t * (sx1 - sx0) <= x1 and y0 <= sy0 + t * (sy1 - sy0) <= y1
+                         for t in (i / 64 for i in range(65)))
+            assert not inside or link in found
+
+
+def test_batched_distances_match_scalar():
+    rng = random.Random(7)
+    segs = [tuple(rng.uniform(-100.0, 100.0) for _ in range(4)) for _ in range(200)]
+    segs.append((5.0, 5.0, 5.0, 5.0))  # degenerate: a point
+    dists = _dist_point_to_segments(3.0, -7.0, segs)
+    for d, seg in zip(dists, segs):
+        assert math.isclose(float(d), _dist_point_to_segment(3.0, -7.0, *seg), abs_tol=1e-9)
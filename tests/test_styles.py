@@ -0,0 +1,54 @@
+import pytest
+
+from fasttopo.styles import StyleRule, parse_style, style_tag, style_tags
+
+
+def test_parse_style():
+    rule = parse_style("link speed=100G: color=#ff5252 width=4")
+    assert (rule.target, rule.match, rule.color, rule.width) == ("link", {"speed": "100G"}, "#ff5252", 4.0)
+    assert rule.options() == {"fill": "#ff5252", "width": 4.0}
+    assert rule.expr == "link&&speed=100G"
+    rule = parse_style("node site=B kind=router: color=DarkGreen")
+    assert rule.color == "DarkGreen" and rule.width is None
+    assert rule.expr == "node&&kind=router&&site=B"
+
+
+@pytest.mark.parametrize("spec", [
+    "node site=B: color=#80cbc4",
+    "link speed=100G vendor=acme: color=red width=2.5",
+    "link role=uplink: width=3",
+])
+def test_text_form_round_trips(spec):
+    assert str(parse_style(spec)) == spec
+    assert parse_style(str(parse_style(spec))).expr == parse_style(spec).expr
+
+
+@pytest.mark.parametrize("spec", [
+    "node site=B", "site=B: color=red", "edge site=B: color=red", "node: color=red", "node site: color=red",
+    "node colour=B: color=red", "link kind=router: color=red", "node site=B:", "node site=B: size=3",
+    "node site=B: color=#12", "node site=B: width=2", "link speed=1G: width=0", "link speed=1G: width=wide",
+])
+def test_bad_rules_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_style(spec)
+
+
+def test_rules_match_items_by_tags():
+    core = set(style_tags("node", {"site": "B", "role": "core", "name": "r1"}, kind="router"))
+    edge = set(style_tags("node", {"site": "A", "role": "edge"}, kind="switch"))
+    fast = set(style_tags("link", {"speed": "100G"}))
+    assert parse_style("node site=B: color=red").matches(core)
+    assert not parse_style("node site=B: color=red").matches(edge)
+    assert parse_style("node kind=switch role=edge: color=red").matches(edge)
+    assert not parse_style("node kind=switch role=core: color=red").matches(core)
+    assert parse_style("link speed=100G: width=4").matches(fast)
+    assert not parse_style("link speed=10G: width=4").matches(fast)
+    # name is not a styled attribute, so it gets no tag
+    assert not any(tag.startswith("name=") for tag in core)
+
+
+def test_tags_are_safe_in_tag_expressions():
+    tag = style_tag("site", "dc 1&&(x)|y!")
+    assert tag == "site=dc_1___x__y_"
+    rule = StyleRule("node", {"site": "dc 1&&(x)|y!"}, color="red")
+    assert rule.matches(set(style_tags("node", {"site": "dc 1&&(x)|y!"}, kind="router")))
@@ -0,0 +1,61 @@
+import random
+import types
+
+import pytest
+
+pytest.importorskip("tkinter")
+import topo  # the view transform lives in the UI; no display is needed
+
+
+def _view(level=-10, wx=0.0, wy=0.0):
+    """Just the view state of a TopologyTool, enough to run its zoom and projection methods."""
+    view = types.SimpleNamespace(zoom_level=level, zoom=topo.ZOOM_STEP ** level, view_wx=wx, view_wy=wy,
+                                 zoom_views={}, last_cursor=(0, 0), reproject_dirty=False)
+    view._mark_view_dirty = lambda: None
+    view._ensure_preview = lambda x, y: None
+    view._scroll = lambda: topo.TopologyTool._scroll(view)
+    return view
+
+
+def _state(view):
+    return view.zoom_level, view.zoom, view.view_wx, view.view_wy
+
+
+def _zoom(view, direction, x, y, steps):
+    for _ in range(steps):
+        topo.TopologyTool._apply_zoom(view, direction, x, y)
+
+
+def test_zoom_round_trip_restores_the_exact_view():
+    rng = random.Random(1)
+    points = [(rng.uniform(-5000.0, 5000.0), rng.uniform(-5000.0, 5000.0)) for _ in range(200)]
+    for _ in range(200):
+        view = _view(wx=rng.uniform(-5000.0, 5000.0), wy=rng.uniform(-5000.0, 5000.0))
+        before = _state(view)
+        screen = [topo.TopologyTool.world_to_screen(view, x, y) for x, y in points]
+        px, py = rng.uniform(0.0, 1200.0), rng.uniform(0.0, 800.0)
+        _zoom(view, 1, px, py, 20)
+        assert view.zoom_level == before[0] + 20
+        _zoom(view, -1, px, py, 20)
+        assert _state(view) == before
+        assert [topo.TopologyTool.world_to_screen(view, x, y) for x, y in points] == screen
+
+
+def test_zoom_keeps_the_point_under_the_cursor():
+    view = _view(level=0, wx=100.0, wy=-50.0)
+    wx, wy = topo.TopologyTool.screen_to_world(view, 300, 200)
+    _zoom(view, 1, 300, 200, 5)
+    x, y = topo.TopologyTool.world_to_screen(view, wx, wy)
+    assert abs(x - 300) <= 1 and abs(y - 200) <= 1
+
+
+def test_zoom_clamps_and_starts_over_after_a_pan():
+    view = _view(level=topo.ZOOM_MAX_LEVEL - 1)
+    _zoom(view, 1, 10, 10, 3)
+    assert view.zoom_level == topo.ZOOM_MAX_LEVEL
+    # A pan moves the view: zooming back must not jump to a remembered view
+    view.view_wx += 37.0
+    panned = view.view_wx
+    _zoom(view, -1, 10, 10, 1)
+    expected = panned + 10 / (topo.ZOOM_STEP ** topo.ZOOM_MAX_LEVEL) - 10 / view.zoom
+    assert view.view_wx == pytest.approx(expected)
@@ -1,37 +1,158 @@
 import tkinter as tk
+from tkinter import filedialog, messagebox, simpledialog
+import csv
+import hashlib
+import heapq
+import itertools
+import json
 import math
+import os
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+from fasttopo.theme import (
+    CANVAS_BG, EDGE_COLOR, EDGE_WIDTH, LABEL_COLOR, LEGEND_BG, LEGEND_OUTLINE, NODE_COLORS, PIN_COLOR, PIN_WIDTH,
+)
+from fasttopo.model import (
+    History, NODE_RADIUS, TopologyModel, critical_elements, degree_hotspots, model_digest, node_label, packed_ids,
+    segment_hits_rect, shortest_path,
+)
+from fasttopo.styles import StyleRule, parse_style, style_tag, style_tags
+from fasttopo.instrument import (
+    InputRecorder, PROFILED_METHODS, PROFILE_ENV, PROFILE_HUD_MS, PROFILE_HUD_ROWS, PROFILE_PATH, Profiler,
+    RECORD_PATH, RECORD_SKIP, RECORD_SLOWEST, latency_summary, read_recording,
+)
+from fasttopo.files import export_json, load_topology_file, save_snapshot
+from fasttopo.diff import diff_is_empty, diff_summary, diff_topologies
+from fasttopo.journal import JOURNAL_DIR, Journal, lock_journal, recover_journal, set_aside_journal
+from fasttopo.importers import TopologyImporter, import_topology_file
+from fasttopo.layout import LAYOUTS, LAYOUT_POLL_MS, LayoutJob, apply_layout
+from fasttopo.bundles import EdgeBundler
+from fasttopo.live import LiveFeed, merge_live
+from fasttopo.generators import GENERATORS, generate_fabric, parse_fabric
+from fasttopo.export import export_drawing
 
-NODE_RADIUS = 18
 DRAG_THRESHOLD = 5
 
-EDGE_COLOR = "#cccccc"
-EDGE_WIDTH = 2
 EDGE_HIGHLIGHT_COLOR = "#ffd54f"
 EDGE_HIGHLIGHT_WIDTH = 4
 
+PATH_COLOR = "#ffffff"     # analytics marks (T, K, X, G): outline of nodes, stroke of links
+CRITICAL_COLOR = "#ff5252"
+HOTSPOT_COLOR = "#e040fb"
+COMPONENT_COLORS = ("#80d8ff", "#ccff90", "#b388ff", "#ff80ab", "#a7ffeb", "#ffe57f")
+MARK_WIDTH = 3
+DIFF_ADDED_COLOR = "#69f0ae"   # diff (Ctrl+D): outlines / strokes of what is new since the other version ...
+DIFF_REMOVED_COLOR = "#ff5252" # ... dashed ghosts of what it had and this one has not ...
+DIFF_MOVED_COLOR = "#ffd740"   # ... moved nodes, with a dashed trail from where they were ...
+DIFF_CHANGED_COLOR = "#40c4ff" # ... and nodes and links with another type or other attributes
+
+LIVE_DOWN_COLOR = "#ff1744"    # live state (Ctrl+L): links, and outlines of nodes, that are down ...
+LIVE_FLAP_COLOR = "#ffab00"    # ... or flapping; up links by utilization (first threshold reached)
+LIVE_UTIL_COLORS = ((0.9, "#ff6e40"), (0.7, "#ffee58"))
+
+SITE_RADIUS = 2 * NODE_RADIUS   # a collapsed site is drawn as one bigger square
+SITE_COLOR = "#ffb74d"
+AGG_COLOR = "#b0bec5"          # aggregate links; width grows with the log of the link count
+AGG_MAX_WIDTH = 10
+BUNDLE_COLOR = "#90a4ae"       # bundled links (B): trunks and fans; trunk width grows with the log of the link count
+BUNDLE_MAX_WIDTH = 8
+
+LABEL_FONT = ("Arial", 9)
+
 EDGE_HIT_TOL = 10          # easier to click lines
 PREVIEW_DASH = (6, 4)
 
 ZOOM_MIN = 0.2
 ZOOM_MAX = 4.0
+ZOOM_STEP = 1.1            # zoom = ZOOM_STEP ** level, so in/out steps cancel exactly
+ZOOM_MIN_LEVEL = math.ceil(math.log(ZOOM_MIN) / math.log(ZOOM_STEP))
+ZOOM_MAX_LEVEL = math.floor(math.log(ZOOM_MAX) / math.log(ZOOM_STEP))
+
+OVERLAY_TAGS = ("legend", "overlay")  # screen-fixed items, shifted along with the scroll
+
+FRAME_MS = 16              # ~60 fps; canvas mutations are flushed at most once per frame
+FRAME_MANUAL = "manual"    # FrameScheduler.job of a frame waiting for flush_now() (input replay)
+DRAG_TAG = "dragging"      # canvas tag on the items of the nodes being dragged
+
+CULL_MARGIN = 200          # px beyond the window edges that stay realized (pan headroom)
+LOD_ZOOM = 0.5             # below this zoom: square dots, merged thin link strokes
+LOD_MERGE_PX = 8           # screen cell size used to merge links at low detail
+LOD_EDGE_WIDTH = 1
+LABEL_ZOOM = 0.8           # at or above this zoom: node labels, on realized nodes only
+
+
+# ───────────────── Frame scheduler ─────────────────
+
+class FrameScheduler:
+    """Coalesces redraw requests into at most one flush per frame.
+
+    Event handlers only update state and call request(). The flush runs on
+    the next idle moment if the previous one is at least a frame old,
+    otherwise when the frame is up, so input-to-pixel latency stays under
+    one frame however fast events arrive.
+    """
+
+    def __init__(self, root, flush, interval=FRAME_MS):
+        self.root = root
+        self.flush = flush
+        self.interval = interval
+        self.job = None
+        self.last_flush = 0.0
+        self.manual = False  # frames run only on flush_now() (input replay)
+
+    def request(self):
+        if self.job is not None:
+            return
+        if self.manual:
+            self.job = FRAME_MANUAL
+            return
+        wait_ms = self.interval - (time.perf_counter() - self.last_flush) * 1000.0
+        if wait_ms <= 0:
+            self.job = self.root.after_idle(self._run)
+        else:
+            self.job = self.root.after(int(wait_ms) + 1, self._run)
+
+    def flush_now(self):
+        if self.job is not None and self.job != FRAME_MANUAL:
+            self.root.after_cancel(self.job)
+        self._run()
+
+    def _run(self):
+        self.job = None
+        self.last_flush = time.perf_counter()
+        self.flush()
 
 
 class TopologyTool:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, autosave=None, profile=None):
         self.root = root
         self.root.title("Fast Network Topology Drawer")
 
-        self.canvas = tk.Canvas(root, bg="#0f1115", width=1200, height=800)
+        self.canvas = tk.Canvas(root, bg=CANVAS_BG, width=1200, height=800)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        # Pan is a scroll of the canvas view: 1 unit == 1 pixel, unbounded
+        self.canvas.configure(xscrollincrement=1, yscrollincrement=1, confine=False)
 
         # Modes: neutral | router | switch
         self.mode = "neutral"
 
-        # Data
-        self.nodes = {}      # node_id -> {"type": "router|switch", "seq": int}
-        self.edges = []      # [(line_id, n1, n2), ...]
-        self.edge_map = {}   # line_id -> (n1, n2)
-        self.node_seq = 0
+        # Data (the canvas only renders the model)
+        self.model = TopologyModel()
+        self.node_items = {}  # node_id -> canvas item
+        self.item_nodes = {}  # canvas item -> node_id
+        self.link_items = {}  # link_id -> canvas item (individually drawn links)
+        self.item_links = {}  # canvas item -> link_id
+
+        # Culling / level of detail (see _recull)
+        self.realized_rect = None  # world rect whose contents currently own canvas items
+        self.realized_lod = False
+        self.lod_strokes = {}      # stroke key -> canvas item
+        self.lod_members = {}      # stroke key -> {link_id, ...}
+        self.lod_key = {}          # link_id -> stroke key (None: too short to draw)
 
         # Chain connect (sprout) + preview wire
         self.chain_node = None
@@ -42,6 +163,7 @@ class TopologyTool:
         self.selected_nodes = set()
         self.selection_box = None
         self.selection_start = None
+        self.selection_rect = None  # world rect of the last box-select pass (for incremental diffs)
 
         # Selection (edge)
         self.selected_edge = None
@@ -50,6 +172,13 @@ class TopologyTool:
         self.dragging = False
         self.dragging_group = False
         self.dragging_node = None
+        self.drag_nodes = None   # nodes moved by the current drag (fixed at drag start)
+        self.drag_links = None   # links incident to drag_nodes: the only ones to redraw
+        self.drag_aggs = ()      # aggregate links ending at drag_nodes
+        self.drag_dx = 0         # screen delta accumulated since the last frame
+        self.drag_dy = 0
+        self.drag_wx = 0.0       # world delta of the whole drag (one undo step)
+        self.drag_wy = 0.0
 
         # Placement (router/switch)
         self.pending_place = False
@@ -70,82 +199,257 @@ class TopologyTool:
         self.panning = False
         self.pan_last = None
 
-        # Zoom
+        # View transform. Items live in canvas space (world * zoom); the window
+        # shows canvas space scrolled so that world (view_wx, view_wy) is at its top-left.
+        self.zoom_level = 0
         self.zoom = 1.0
+        self.view_wx = 0.0
+        self.view_wy = 0.0
+        self.canvas_scroll = (0, 0)   # scroll actually applied to the Tk canvas
+        self.zoom_views = {}          # level -> (pivot_x, pivot_y, view_wx, view_wy) of the current wheel pivot
+
+        # Render state flushed once per frame by _render_frame
+        self.frame = FrameScheduler(root, self._render_frame)
+        self.view_dirty = False        # scroll and/or culling out of date
+        self.reproject_dirty = False   # zoom changed: every item's coords are stale
+        self.preview_dirty = False
+        self.preview_wanted = False
+        self.preview_end = (0, 0)      # screen point the preview wire should reach
+        self.selbox_end = None         # screen point the selection box should reach
+        self.pending_highlights = {}   # node_id -> on/off, applied at the next frame
+        self.pending_edge_styles = {}  # link_id -> needs its own item? restyled at the next frame
+        self.sites_dirty = False       # collapsed sites changed: their items are redrawn at the next frame
+        self.label_items = {}          # node_id -> text item; labeled realized nodes, at LABEL_ZOOM or above
 
         # Arrow navigation state (neighbor-walk)
         self.nav_curr = None
         self.nav_prev = None
 
+        # Last search (see find_node): F3 steps through its results
+        self.find_query = ""
+        self.find_results = []
+        self.find_index = 0
+
+        # File the topology was last saved to / opened from
+        self.file_path = None
+
+        # Streaming import in progress (see import_topology)
+        self.importer = None
+        self.import_steps = None   # importer.run() generator
+        self.import_job = None     # pending after() id
+        self.import_fit = False    # zoom to fit when done (the topology started out empty)
+
+        # Auto-layout running on a worker thread (see start_layout)
+        self.layout_job = None
+        self.layout_poll = None    # pending after() id
+        self.layout_moved = set()  # nodes moved or pinned by hand during the job: not overwritten
+        self.layout_warm = False   # positions come from a finished layout: refine, don't restart
+        self.layout_fit = False    # cold layout: zoom to fit when positions arrive
+        self.layout_applied = False  # positions were written back: record one undo step at the end
+
+        # Undo/redo (see undo); import_nodes/import_links collect one import as one step
+        self.history = History()
+        self.history.listener = self._on_history_step
+        self.import_nodes = []
+        self.import_links = []
+
+        # Crash-safe autosave journal in the autosave directory (see Journal); None: off
+        self.journal = None
+
+        # Collapsed sites (see collapse_site): one item each, plus one per aggregate link
+        self.site_items = {}   # site -> (square, label or None)
+        self.agg_items = {}    # aggregate link key -> (line, count label or None)
+
+        # Graph analytics marked on the canvas (see show_analysis), refreshed as the topology changes
+        self.analysis = None           # "path" | "components" | "critical" | "hotspots" | "diff" | None
+        self.analysis_ends = None      # (a, b): the two nodes of the "path" analysis
+        self.analysis_version = None   # model state the marks were computed for
+        self.marked_nodes = {}         # node_id -> outline color
+        self.marked_links = {}         # link_id -> stroke color
+        self.diff_base = None          # TopologyModel the "diff" analysis compares with (see show_diff)
+        self.diff_name = None
+        self.diff = None               # the last diff_topologies(diff_base, model)
+        self.diff_moved = {}           # moved node -> [x, y] in diff_base
+        self.diff_removed_nodes = set()  # ids in diff_base, drawn as ghosts
+        self.diff_removed_links = set()
+
+        # Style rules (see add_style), applied to the canvas by tag at the next frame
+        self.styles = []               # StyleRule, in order: later rules win
+        self.style_resets = []         # removed or replaced rules whose items go back to the defaults
+        self.styles_dirty = False
+        self.pending_retags = set()    # nodes whose attributes changed: their item tags are redone
+
+        # Edge bundling (see start_bundling): links drawn as shared trunks instead of one item each
+        self.bundler = None
+        self.bundle_job = None        # pending after() id while the bundler has work
+        self.bundle_model = None      # model the bundler last got a snapshot of
+        self.bundles_dirty = False    # topology changed: a new snapshot goes to the bundler at the next frame
+        self.bundle_items = {}        # shape -> canvas item
+        self.bundle_shapes = {}       # shape -> (world coords, count) as drawn
+        self.pending_bundles = {}     # shape -> (world coords, count) or None, drawn at the next frame
+
+        # Live link/node state (see start_live): colors by state, over everything but marks and selection
+        self.live_feed = None
+        self.live_job = None          # pending after() id
+        self.live_link_states = {}    # (a, b) -> (state, util) as received, by end names
+        self.live_node_states = {}    # name -> (state, util)
+        self.live_links = {}          # link_id -> stroke color (links in a state worth showing)
+        self.live_nodes = {}          # node_id -> outline color
+        self.live_down = 0            # links and nodes colored down
+        self.live_names = {}          # node name -> node_id, built for live_version
+        self.live_version = None      # topology state the states were last matched against
+
+        # Latency profiling (see Profiler); None: off, which costs nothing
+        self.profiler = None
+        self.profile_path = PROFILE_PATH
+        self.hud_job = None
+
+        # Input recording and replay (see InputRecorder); bindings maps (target, sequence) -> handler
+        self.bindings = {}
+        self.recorder = None
+        self.record_path = RECORD_PATH
+
         self.draw_legend()
         self.bind_events()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        if autosave is not None:
+            self._open_journal(autosave)
+        if profile:
+            self.start_profiling(None if profile in (True, "1") else profile)
         self.update_title()
 
     # ───────────────── UI ─────────────────
 
     def draw_legend(self):
-        self.canvas.create_rectangle(10, 10, 320, 180, fill="#1a1d23", outline="#444", tags="legend")
+        self.canvas.create_rectangle(10, 10, 320, 180, fill=LEGEND_BG, outline=LEGEND_OUTLINE, tags=OVERLAY_TAGS)
         self.canvas.create_text(165, 25, text="LEGEND / CONTROLS", fill="white",
-                                font=("Arial", 11, "bold"), tags="legend")
+                                font=("Arial", 11, "bold"), tags=OVERLAY_TAGS)
 
-        self.canvas.create_oval(30, 45, 60, 75, fill="#4fc3f7", outline="", tags="legend")
-        self.canvas.create_text(205, 60, text="Router (R) - click to place", fill="white", tags="legend")
+        self.canvas.create_oval(30, 45, 60, 75, fill=NODE_COLORS["router"], outline="", tags=OVERLAY_TAGS)
+        self.canvas.create_text(205, 60, text="Router (R) - click to place", fill="white", tags=OVERLAY_TAGS)
 
-        self.canvas.create_rectangle(30, 80, 60, 110, fill="#81c784", outline="", tags="legend")
-        self.canvas.create_text(205, 95, text="Switch (S) - click to place", fill="white", tags="legend")
+        self.canvas.create_rectangle(30, 80, 60, 110, fill=NODE_COLORS["switch"], outline="", tags=OVERLAY_TAGS)
+        self.canvas.create_text(205, 95, text="Switch (S) - click to place", fill="white", tags=OVERLAY_TAGS)
 
-        self.canvas.create_line(30, 130, 60, 130, fill=EDGE_COLOR, width=EDGE_WIDTH, tags="legend")
-        self.canvas.create_text(205, 130, text="Neutral (ESC) - pan/zoom/select", fill="white", tags="legend")
+        self.canvas.create_line(30, 130, 60, 130, fill=EDGE_COLOR, width=EDGE_WIDTH, tags=OVERLAY_TAGS)
+        self.canvas.create_text(205, 130, text="Neutral (ESC) - pan/zoom/select", fill="white", tags=OVERLAY_TAGS)
 
-        self.canvas.create_text(165, 155, text="Delete (D) - delete link or node", fill="#cccccc", tags="legend")
-        self.canvas.create_text(165, 172, text="Clear (C)", fill="#ff8a80", tags="legend")
+        self.canvas.create_text(165, 155, text="Delete (D) - delete link or node", fill="#cccccc", tags=OVERLAY_TAGS)
+        self.canvas.create_text(165, 172, text="Clear (C) - undo Ctrl+Z, redo Ctrl+Y", fill="#ff8a80", tags=OVERLAY_TAGS)
 
     def bind_events(self):
-        self.root.bind("r", lambda e: self.set_mode("router"))
-        self.root.bind("s", lambda e: self.set_mode("switch"))
-        self.root.bind("c", lambda e: self.clear_topology())
+        self._bind("root", "r", lambda e: self.set_mode("router"))
+        self._bind("root", "s", lambda e: self.set_mode("switch"))
+        self._bind("root", "c", lambda e: self.clear_topology())
 
         # ESC is the primary "neutral + free pan/zoom" key
-        self.root.bind("<Escape>", self.on_escape_to_neutral)
-
-        self.root.bind("d", lambda e: self.delete_selected())
-        self.root.bind("D", lambda e: self.delete_selected())
+        self._bind("root", "<Escape>", self.on_escape_to_neutral)
+
+        self._bind("root", "d", lambda e: self.delete_selected())
+        self._bind("root", "D", lambda e: self.delete_selected())
+
+        self._bind("root", "<Control-s>", lambda e: self.save_topology())
+        self._bind("root", "<Control-o>", lambda e: self.open_topology())
+        self._bind("root", "<Control-i>", lambda e: self.import_topology())
+        self._bind("root", "<Control-e>", lambda e: self.export_topology())
+
+        self._bind("root", "<Control-z>", lambda e: self.undo())
+        self._bind("root", "<Control-y>", lambda e: self.redo())
+        self._bind("root", "<Control-Z>", lambda e: self.redo())
+
+        self._bind("root", "<F12>", lambda e: self.toggle_profiling())
+        self._bind("root", "<F9>", lambda e: self.toggle_recording())
+        self._bind("root", "<Control-l>", lambda e: self.toggle_live())
+        self._bind("root", "<Control-r>", lambda e: self.ask_style())
+        self._bind("root", "<Control-R>", lambda e: self.clear_styles())
+        self._bind("root", "<Control-f>", lambda e: self.ask_find())
+        self._bind("root", "<F3>", lambda e: self.find_next())
+        self._bind("root", "<F2>", lambda e: self.rename_selected())
+        self._bind("root", "<Control-d>", lambda e: self.toggle_diff())
+
+        # Auto-layout; ESC stops it, P pins the selection in place
+        self._bind("root", "l", lambda e: self.start_layout("force", warm=self.layout_warm))
+        self._bind("root", "L", lambda e: self.start_layout("force"))
+        self._bind("root", "h", lambda e: self.start_layout("layered"))
+        self._bind("root", "o", lambda e: self.start_layout("radial", root=self._focus_node()))
+        self._bind("root", "p", lambda e: self.toggle_pin())
+        self._bind("root", "b", lambda e: self.toggle_bundling())
+
+        # Graph analytics; the same key again (or ESC) hides them
+        self._bind("root", "t", lambda e: self.show_analysis("path"))
+        self._bind("root", "k", lambda e: self.show_analysis("components"))
+        self._bind("root", "x", lambda e: self.show_analysis("critical"))
+        self._bind("root", "g", lambda e: self.show_analysis("hotspots"))
+
+        # Sites: group the selection, collapse (E) and expand (Shift+E, or click a collapsed site)
+        self._bind("root", "<Control-g>", lambda e: self.group_selected())
+        self._bind("root", "<Control-G>", lambda e: self.ungroup_selected())
+        self._bind("root", "e", lambda e: self.collapse_selected())
+        self._bind("root", "E", lambda e: self.expand_all())
 
         # Any arrow key: move to a connected neighbor (no jumping)
         def _arrow(_e):
             self.navigate_neighbor()
         for key in ("<Left>", "<Right>", "<Up>", "<Down>"):
-            self.root.bind(key, _arrow)
+            self._bind("root", key, _arrow)
 
-        self.canvas.bind("<Button-1>", self.on_mouse_down)
-        self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
-        self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
+        self._bind("canvas", "<Button-1>", self.on_mouse_down)
+        self._bind("canvas", "<B1-Motion>", self.on_mouse_drag)
+        self._bind("canvas", "<ButtonRelease-1>", self.on_mouse_up)
 
         # Pan (right click drag on empty space) — Button-3 (Windows/Linux), Button-2 (some mac trackpads)
-        self.canvas.bind("<Button-3>", self.on_pan_down)
-        self.canvas.bind("<B3-Motion>", self.on_pan_drag)
-        self.canvas.bind("<ButtonRelease-3>", self.on_pan_up)
-        self.canvas.bind("<Button-2>", self.on_pan_down)
-        self.canvas.bind("<B2-Motion>", self.on_pan_drag)
-        self.canvas.bind("<ButtonRelease-2>", self.on_pan_up)
+        self._bind("canvas", "<Button-3>", self.on_pan_down)
+        self._bind("canvas", "<B3-Motion>", self.on_pan_drag)
+        self._bind("canvas", "<ButtonRelease-3>", self.on_pan_up)
+        self._bind("canvas", "<Button-2>", self.on_pan_down)
+        self._bind("canvas", "<B2-Motion>", self.on_pan_drag)
+        self._bind("canvas", "<ButtonRelease-2>", self.on_pan_up)
 
         # Zoom
-        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)  # Windows/macOS
-        self.canvas.bind("<Button-4>", lambda e: self.on_linux_wheel(+1, e))  # Linux
-        self.canvas.bind("<Button-5>", lambda e: self.on_linux_wheel(-1, e))  # Linux
+        self._bind("canvas", "<MouseWheel>", self.on_mouse_wheel)  # Windows/macOS
+        self._bind("canvas", "<Button-4>", lambda e: self.on_linux_wheel(+1, e))  # Linux
+        self._bind("canvas", "<Button-5>", lambda e: self.on_linux_wheel(-1, e))  # Linux
 
         # Preview wire follow
-        self.canvas.bind("<Motion>", self.on_mouse_move)
+        self._bind("canvas", "<Motion>", self.on_mouse_move)
+
+        # Window resize changes what is visible
+        self._bind("canvas", "<Configure>", lambda e: self._mark_view_dirty())
+
+    def _bind(self, target, sequence, handler):
+        """Bind handler on the root window or the canvas, keeping it in bindings for replay."""
+        self.bindings[(target, sequence)] = handler
+        if self.recorder is not None and sequence not in RECORD_SKIP:
+            handler = self.recorder.wrap(target, sequence, handler)
+        (self.root if target == "root" else self.canvas).bind(sequence, handler)
+
+    def _rebind(self):
+        """Bind the events (and the frame flush) again after profiling or recording started or stopped."""
+        self.bind_events()
+        flush = self._render_frame
+        if self.recorder is not None:
+            flush = self.recorder.frame(flush)
+        self.frame.flush = flush
 
     def update_title(self):
-        self.root.title(f"Mode: {self.mode.upper()}")
+        busy = " — laying out (ESC stops)" if self.layout_job is not None else ""
+        if self.bundler is not None:
+            busy += " — links bundled (B)"
+        if self.live_feed is not None:
+            busy += f" — live ({self.live_down:,} down)"
+        if self.recorder is not None:
+            busy += " — recording input (F9 stops)"
+        self.root.title(f"Mode: {self.mode.upper()}{busy}")
 
     # ───────────────── ESC => Neutral ─────────────────
 
     def on_escape_to_neutral(self, event=None):
         # Neutral mode + clear ALL highlights/selections so pan/zoom is always available
         self.mode = "neutral"
+        self.cancel_import()
+        self.cancel_layout()
         self.cancel_transients(keep_selection=False)
+        self.hide_analysis()
         self.update_title()
 
     def cancel_transients(self, keep_selection: bool):
@@ -158,6 +462,7 @@ class TopologyTool:
         self.place_start = None
 
         # Stop drags
+        self._end_drag()
         self.dragging = False
         self.dragging_group = False
         self.dragging_node = None
@@ -206,14 +511,12 @@ class TopologyTool:
         self.selected_nodes.clear()
 
     def set_node_highlight(self, node, on: bool):
-        if on:
-            self.canvas.itemconfigure(node, outline="#ffd54f", width=3)
-        else:
-            self.canvas.itemconfigure(node, outline="", width=0)
+        self.pending_highlights[node] = on
+        self.frame.request()
 
     def _apply_focus(self, node):
         """Highlight node, make it the chain head, but do NOT change nav_prev/nav_curr here."""
-        if node not in self.nodes:
+        if node not in self.model.nodes:
             return
         self.deselect_edge()
         self.clear_selection()
@@ -229,8 +532,10 @@ class TopologyTool:
         self.clear_selection()
 
         self.selection_start = (x, y)
+        self.selection_rect = None
+        cx, cy = self.screen_to_canvas(x, y)
         self.selection_box = self.canvas.create_rectangle(
-            x, y, x, y,
+            cx, cy, cx, cy,
             outline="#4fc3f7", dash=(4, 2),
             tags=("ui",)
         )
@@ -245,7 +550,25 @@ class TopologyTool:
             self._remove_preview()
             return
 
+        self.preview_wanted = True
+        self.preview_end = (x, y)
+        self.preview_dirty = True
+        self.frame.request()
+
+    def _remove_preview(self):
+        self.preview_wanted = False
+        self.preview_dirty = True
+        self.frame.request()
+
+    def _draw_preview(self):
+        if not self.preview_wanted or self.chain_node not in self.model.nodes:
+            if self.preview_line is not None:
+                self.canvas.delete(self.preview_line)
+                self.preview_line = None
+            return
+
         x1, y1 = self.get_center(self.chain_node)
+        x, y = self.screen_to_canvas(*self.preview_end)
 
         if self.preview_line is None:
             self.preview_line = self.canvas.create_line(
@@ -259,11 +582,6 @@ class TopologyTool:
         else:
             self.canvas.coords(self.preview_line, x1, y1, x, y)
 
-    def _remove_preview(self):
-        if self.preview_line is not None:
-            self.canvas.delete(self.preview_line)
-            self.preview_line = None
-
     def on_mouse_move(self, event):
         self.last_cursor = (event.x, event.y)
         self._ensure_preview(event.x, event.y)
@@ -276,22 +594,23 @@ class TopologyTool:
 
         # Determine anchor current node
         cur = None
-        if self.nav_curr is not None and self.nav_curr in self.nodes:
+        nodes = self.model.nodes
+        if self.nav_curr is not None and self.nav_curr in nodes:
             cur = self.nav_curr
-        elif self.chain_node is not None and self.chain_node in self.nodes:
+        elif self.chain_node is not None and self.chain_node in nodes:
             cur = self.chain_node
             self.nav_curr = cur
             self.nav_prev = None
         elif len(self.selected_nodes) == 1:
             cur = next(iter(self.selected_nodes))
-            if cur in self.nodes:
+            if cur in nodes:
                 self.nav_curr = cur
                 self.nav_prev = None
         if cur is None:
             return
 
-        adj = self.build_adjacency()
-        neighbors = [n for n in adj.get(cur, []) if n in self.nodes]
+        hidden = self.model.sites.hidden
+        neighbors = [n for n in self.model.neighbors(cur) if n not in hidden]
         if not neighbors:
             return
 
@@ -306,12 +625,14 @@ class TopologyTool:
         self._apply_focus(nxt)
 
     def _choose_next_neighbor(self, prev, cur, neighbors):
-        cx, cy = self.get_center(cur)
+        # World coordinates: directions are zoom/pan invariant and need no canvas reads
+        pos = self.model.position
+        cx, cy = pos(cur)
 
         # First step: bias “to the right” if possible (stable, no jumping)
-        if prev is None or prev not in self.nodes:
+        if prev is None or prev not in self.model.nodes:
             def key(n):
-                nx, ny = self.get_center(n)
+                nx, ny = pos(n)
                 dx = nx - cx
                 dy = abs(ny - cy)
                 # Prefer biggest dx (rightward), then smallest vertical offset
@@ -319,12 +640,12 @@ class TopologyTool:
             return max(neighbors, key=key)
 
         # Subsequent steps: “go straight” based on previous direction
-        px, py = self.get_center(prev)
+        px, py = pos(prev)
         vinx, viny = (cx - px), (cy - py)
         vin_norm = math.hypot(vinx, viny)
         if vin_norm == 0:
             # fallback: same as first step
-            return max(neighbors, key=lambda n: (self.get_center(n)[0] - cx, -abs(self.get_center(n)[1] - cy)))
+            return max(neighbors, key=lambda n: (pos(n)[0] - cx, -abs(pos(n)[1] - cy)))
 
         candidates = [n for n in neighbors if n != prev]
         if not candidates:
@@ -334,7 +655,7 @@ class TopologyTool:
         best_key = None
 
         for n in candidates:
-            nx, ny = self.get_center(n)
+            nx, ny = pos(n)
             voutx, vouty = (nx - cx), (ny - cy)
             vout_norm = math.hypot(voutx, vouty)
             if vout_norm == 0:
@@ -357,27 +678,677 @@ class TopologyTool:
 
         return best
 
-    def build_adjacency(self):
-        adj = {n: [] for n in self.nodes}
-        for _, n1, n2 in self.edges:
-            if n1 in self.nodes and n2 in self.nodes:
-                adj[n1].append(n2)
-                adj[n2].append(n1)
-        return adj
+    # ───────────────── Graph analytics (T, K, X, G, Ctrl+D) ─────────────────
+    #
+    # T: shortest path between the two selected nodes, K: connected components
+    # (all but the largest colored), X: single points of failure (articulation
+    # nodes and bridges), G: degree hot spots, Ctrl+D: diff against another
+    # version. Marks recolor node outlines and link strokes; a panel under the
+    # legend sums them up. Any edit while one is shown recomputes it at the next
+    # frame. What a diff removed has no item of its own: dashed ghosts from the
+    # other version stand in for it, drawn like items for the realized region.
+
+    def show_analysis(self, kind):
+        """Mark one analysis on the canvas, or hide it if it is already shown."""
+        ends = None
+        if kind == "path" and len(self.selected_nodes) == 2:
+            ends = tuple(sorted(self.selected_nodes))
+        if kind == self.analysis and (ends is None or ends == self.analysis_ends):
+            self.hide_analysis()
+            return
+        self.analysis = kind
+        self.analysis_ends = ends
+        self._refresh_analysis()
+
+    def hide_analysis(self):
+        if self.analysis is None:
+            return
+        self.analysis = self.analysis_ends = self.analysis_version = None
+        self.diff_base = self.diff = None
+        self.diff_moved, self.diff_removed_nodes, self.diff_removed_links = {}, set(), set()
+        self._set_marks({}, {})
+        self.canvas.delete("analytics", "diff")
+
+    def _refresh_analysis(self):
+        model = self.model
+        self.analysis_version = (model.components.version, len(model.nodes))
+        nodes, links = {}, {}
+        if self.analysis == "path":
+            found = shortest_path(model, *self.analysis_ends) if self.analysis_ends else None
+            if self.analysis_ends is None:
+                text = "Path (T): select two nodes first"
+            elif not all(n in model.nodes for n in self.analysis_ends):
+                text = "Path: an end node was deleted"
+            elif found is None:
+                text = "Path: the two nodes are not connected"
+            else:
+                nodes = dict.fromkeys(found[0], PATH_COLOR)
+                links = dict.fromkeys(found[1], PATH_COLOR)
+                text = f"Path: {len(found[1]):,} hops"
+        elif self.analysis == "components":
+            groups = model.components.groups(model)
+            for i, group in enumerate(groups[1:]):
+                nodes.update(dict.fromkeys(group, COMPONENT_COLORS[i % len(COMPONENT_COLORS)]))
+            links = {ln: nodes[n1] for ln, (n1, _n2) in model.links.items() if n1 in nodes}
+            text = f"Components: {len(groups):,} (largest {len(groups[0]) if groups else 0:,} nodes)"
+        elif self.analysis == "critical":
+            points, bridges = critical_elements(model)
+            nodes = dict.fromkeys(points, CRITICAL_COLOR)
+            links = dict.fromkeys(bridges, CRITICAL_COLOR)
+            text = f"Single points of failure: {len(points):,} nodes, {len(bridges):,} links"
+        elif self.analysis == "diff":
+            diff = self.diff = diff_topologies(self.diff_base, model)
+            for kind, color in (("changed", DIFF_CHANGED_COLOR), ("moved", DIFF_MOVED_COLOR),
+                                ("added", DIFF_ADDED_COLOR)):
+                nodes.update(dict.fromkeys((rec["id"] for rec in diff["nodes"][kind]), color))
+            for kind, color in (("changed", DIFF_CHANGED_COLOR), ("added", DIFF_ADDED_COLOR)):
+                links.update(dict.fromkeys((rec["id"] for rec in diff["links"][kind]), color))
+            self.diff_moved = {rec["id"]: rec["from"] for rec in diff["nodes"]["moved"]}
+            self.diff_removed_nodes = {rec["id"] for rec in diff["nodes"]["removed"]}
+            self.diff_removed_links = {rec["id"] for rec in diff["links"]["removed"]}
+            text = f"Diff vs {self.diff_name}: " + diff_summary(diff)
+        else:
+            hot = degree_hotspots(model)
+            nodes = dict.fromkeys((n for n, _degree in hot), HOTSPOT_COLOR)
+            text = f"Hot spots: {len(hot)} nodes" + (f", degree {hot[-1][1]} to {hot[0][1]}" if hot else "")
+        self._set_marks(nodes, links)
+        self._draw_analysis_panel(text)
+        self._draw_diff_ghosts()
+
+    def _set_marks(self, nodes, links):
+        """Replace the marks, restyling only the nodes and links whose mark changed."""
+        old_nodes, old_links = self.marked_nodes, self.marked_links
+        self.marked_nodes, self.marked_links = nodes, links
+        for n in old_nodes.keys() | nodes.keys():
+            if old_nodes.get(n) != nodes.get(n):
+                self.pending_highlights[n] = n in self.selected_nodes
+        for ln in old_links.keys() | links.keys():
+            if old_links.get(ln) != links.get(ln) and (ln in self.link_items or ln in self.lod_key):
+                self.pending_edge_styles[ln] = ln in links or ln in self.live_links or ln == self.selected_edge
+        self.frame.request()
+
+    def _draw_analysis_panel(self, text):
+        self.canvas.delete("analytics")
+        sx, sy = self.canvas_scroll  # overlay items follow the scroll actually applied
+        tags = OVERLAY_TAGS + ("analytics",)
+        self.canvas.create_rectangle(10 + sx, 190 + sy, max(320, 30 + 7 * len(text)) + sx, 216 + sy,
+                                     fill=LEGEND_BG, outline=LEGEND_OUTLINE, tags=tags)
+        self.canvas.create_text(22 + sx, 203 + sy, text=text, anchor="w", fill="white", tags=tags)
+
+    def toggle_diff(self):
+        if self.analysis == "diff":
+            self.hide_analysis()
+            return
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Compare with",
+            filetypes=[("Topology files", "*.topo *.json"), ("All files", "*")],
+        )
+        if not path:
+            return
+        try:
+            self.show_diff(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Diff failed", f"{path}: {e}", parent=self.root)
+
+    def show_diff(self, base, name=None):
+        """Mark what changed since base: a TopologyModel, or a file load_topology_file opens."""
+        if not isinstance(base, TopologyModel):
+            name = name or os.path.basename(base)
+            base = load_topology_file(base)
+        self.diff_base = base
+        self.diff_name = name or "base"
+        self.analysis = "diff"
+        self.analysis_ends = None
+        self._refresh_analysis()
+        return self.diff
+
+    def _draw_diff_ghosts(self):
+        """Dashed ghosts of removed nodes and links, and a trail to each moved node from where it was."""
+        canvas = self.canvas
+        canvas.delete("diff")
+        base, region = self.diff_base, self.realized_rect
+        if self.analysis != "diff" or base is None or region is None:
+            return
+        z = self.zoom
+        r = NODE_RADIUS * z
+        tags = ("diff",)
+        for link in base.links_in_rect(*region) & self.diff_removed_links:
+            x1, y1, x2, y2 = base.segment(link)
+            canvas.create_line(x1 * z, y1 * z, x2 * z, y2 * z, fill=DIFF_REMOVED_COLOR, width=EDGE_WIDTH,
+                               dash=PREVIEW_DASH, tags=tags)
+        for node in base.nodes_in_rect(*region) & self.diff_removed_nodes:
+            x, y = base.position(node)
+            canvas.create_rectangle(x * z - r, y * z - r, x * z + r, y * z + r, outline=DIFF_REMOVED_COLOR,
+                                    width=MARK_WIDTH, dash=PREVIEW_DASH, tags=tags)
+        moved = self.diff_moved
+        if moved:
+            for node in [n for n in self.node_items if n in moved]:
+                (x0, y0), (x1, y1) = moved[node], self.model.position(node)
+                canvas.create_line(x0 * z, y0 * z, x1 * z, y1 * z, fill=DIFF_MOVED_COLOR, dash=PREVIEW_DASH,
+                                   tags=tags)
+                canvas.create_oval(x0 * z - r, y0 * z - r, x0 * z + r, y0 * z + r, outline=DIFF_MOVED_COLOR,
+                                   dash=PREVIEW_DASH, tags=tags)
+        canvas.tag_lower("diff")
+
+    # ───────────────── Styles (Ctrl+R, Ctrl+Shift+R) ─────────────────
+    #
+    # Rules change the canvas only through tag expressions: the next frame resets
+    # the items of removed rules to the defaults, then configures every rule in
+    # order, one itemconfigure each. Selection, analytics marks and live state
+    # still win over rules, so those few items are restyled after them.
+
+    def ask_style(self):
+        spec = simpledialog.askstring("Style", "Style rule, e.g. link speed=100G: color=#ff5252 width=4",
+                                      parent=self.root)
+        if not spec or not spec.strip():
+            return
+        try:
+            self.add_style(spec)
+        except ValueError as e:
+            messagebox.showerror("Style", str(e), parent=self.root)
+
+    def add_style(self, rule):
+        """Append a rule (a StyleRule or its text form, see parse_style); it wins over earlier ones."""
+        if isinstance(rule, str):
+            rule = parse_style(rule)
+        self.styles.append(rule)
+        self._styles_changed()
+        return rule
+
+    def set_style(self, rule, color=None, width=None):
+        """Replace rule by one matching the same items with a new color / width; returns the new rule."""
+        new = StyleRule(rule.target, rule.match, color, width)
+        self.styles[self.styles.index(rule)] = new
+        self.style_resets.append(rule)
+        self._styles_changed()
+        return new
+
+    def remove_style(self, rule):
+        self.styles.remove(rule)
+        self.style_resets.append(rule)
+        self._styles_changed()
+
+    def clear_styles(self):
+        self.style_resets += self.styles
+        self.styles = []
+        self._styles_changed()
+
+    def _styles_changed(self):
+        self.styles_dirty = True
+        self.frame.request()
+
+    def _apply_styles(self):
+        canvas = self.canvas
+        resets, self.style_resets = self.style_resets, []
+        self.styles_dirty = False
+        for rule in resets:
+            if rule.target == "node":
+                for kind, fill in NODE_COLORS.items():
+                    canvas.itemconfigure(f"{rule.expr}&&{style_tag('kind', kind)}", fill=fill)
+            else:
+                canvas.itemconfigure(rule.expr, fill=EDGE_COLOR, width=self._edge_width())
+        for rule in self.styles:
+            canvas.itemconfigure(rule.expr, **rule.options())
+        for link in itertools.chain(self.marked_links, self.live_links, (self.selected_edge,)):
+            if link in self.link_items:
+                self.pending_edge_styles[link] = True
+
+    # ───────────────── Live state (Ctrl+L) ─────────────────
+    #
+    # A LiveFeed coalesces events on its thread; _poll_live takes the batch once
+    # per frame, so the mainloop never waits on the source and each link or node
+    # is restyled at most once a frame. States are kept by their ends as
+    # received, and matched against the topology again whenever it changes, so
+    # links drawn or imported later pick up their state too. Links in a state
+    # worth showing keep their own item at every zoom, like analytics marks.
+
+    def toggle_live(self):
+        if self.live_feed is not None:
+            self.stop_live()
+            return
+        source = simpledialog.askstring("Live state", "Read state events from (a file, unix:PATH, or - for stdin):",
+                                        parent=self.root)
+        if source and source.strip():
+            self.start_live(source.strip())
+
+    def start_live(self, source):
+        self.stop_live()
+        try:
+            self.live_feed = LiveFeed(source).start()
+        except OSError as e:
+            self.live_feed = None
+            messagebox.showerror("Live state", f"{source}: {e}", parent=self.root)
+            return
+        self.live_job = self.root.after(FRAME_MS, self._poll_live)
+        self.update_title()
+
+    def stop_live(self):
+        """Stop reading state events and remove their colors."""
+        if self.live_feed is not None:
+            self.live_feed.stop()
+            self.live_feed = None
+        if self.live_job is not None:
+            self.root.after_cancel(self.live_job)
+            self.live_job = None
+        self.live_link_states.clear()
+        self.live_node_states.clear()
+        self._set_live({}, {})
+        self.live_version = None
+        self.update_title()
+
+    def _poll_live(self):
+        self.live_job = None
+        feed = self.live_feed
+        if feed is None:
+            return
+        done = feed.done  # read first: events merged before it are then in take()
+        links, nodes = feed.take()
+        if links or nodes or self._live_model_version() != self.live_version:
+            self._apply_live(links, nodes)
+        if feed.error is not None:
+            self.stop_live()
+            messagebox.showerror("Live state", f"{feed.source}: {feed.error}", parent=self.root)
+            return
+        if not done:  # an ended source leaves its last states shown until Ctrl+L
+            self.live_job = self.root.after(FRAME_MS, self._poll_live)
+
+    def _live_model_version(self):
+        model = self.model
+        return id(model), model._next_node_id, model._next_link_id, len(model.nodes), len(model.links)
+
+    def _apply_live(self, links, nodes):
+        """Merge a batch of received states and restyle what changed.
+
+        Only the batch is matched while the topology stays the same; once it
+        changed, every known state is matched again (names may now resolve).
+        """
+        for key, (state, util) in links.items():
+            merge_live(self.live_link_states, key, state, util)
+        for key, (state, util) in nodes.items():
+            merge_live(self.live_node_states, key, state, util)
+        version = self._live_model_version()
+        if version != self.live_version:
+            self.live_version = version
+            self.live_names = {str(a["name"]): n for n, a in self.model.attrs.items() if "name" in a}
+            link_colors, node_colors = {}, {}
+            for (a, b), state in self.live_link_states.items():
+                link, color = self._live_link(a, b), self._live_color(*state)
+                if link is not None and color is not None:
+                    link_colors[link] = color
+            for name, state in self.live_node_states.items():
+                node, color = self._live_node(name), self._live_color(*state)
+                if node is not None and color is not None:
+                    node_colors[node] = color
+            self._set_live(link_colors, node_colors)
+        else:
+            for a, b in links:
+                link = self._live_link(a, b)
+                if link is not None:
+                    self._color_live_link(link, self._live_color(*self.live_link_states[a, b]))
+            for name in nodes:
+                node = self._live_node(name)
+                if node is not None:
+                    self._color_live_node(node, self._live_color(*self.live_node_states[name]))
+        self.frame.request()
+        self.update_title()
+
+    def _live_node(self, name):
+        node = self.live_names.get(name)
+        if node is None and name.isdigit() and int(name) in self.model.nodes:
+            node = int(name)
+        return node
+
+    def _live_link(self, a, b):
+        a, b = self._live_node(a), self._live_node(b)
+        return None if a is None or b is None else self.model.link_between(a, b)
+
+    @staticmethod
+    def _live_color(state, util):
+        if state == "down":
+            return LIVE_DOWN_COLOR
+        if state == "flapping":
+            return LIVE_FLAP_COLOR
+        if util is not None:
+            for threshold, color in LIVE_UTIL_COLORS:
+                if util >= threshold:
+                    return color
+        return None
+
+    def _set_live(self, links, nodes):
+        """Replace the live colors, restyling only the nodes and links whose color changed."""
+        for n in [n for n in self.live_nodes if n not in nodes]:
+            self._color_live_node(n, None)
+        for n, color in nodes.items():
+            self._color_live_node(n, color)
+        for ln in [ln for ln in self.live_links if ln not in links]:
+            self._color_live_link(ln, None)
+        for ln, color in links.items():
+            self._color_live_link(ln, color)
+        self.frame.request()
+
+    def _color_live_node(self, node, color):
+        old = self.live_nodes.get(node)
+        if old == color:
+            return
+        self.live_down += (color == LIVE_DOWN_COLOR) - (old == LIVE_DOWN_COLOR)
+        if color is None:
+            del self.live_nodes[node]
+        else:
+            self.live_nodes[node] = color
+        self.pending_highlights[node] = node in self.selected_nodes
+
+    def _color_live_link(self, link, color):
+        old = self.live_links.get(link)
+        if old == color:
+            return
+        self.live_down += (color == LIVE_DOWN_COLOR) - (old == LIVE_DOWN_COLOR)
+        if color is None:
+            del self.live_links[link]
+        else:
+            self.live_links[link] = color
+        if link in self.link_items or link in self.lod_key:
+            self.pending_edge_styles[link] = color is not None or link in self.marked_links or link == self.selected_edge
+
+    # ───────────────── Find / rename (Ctrl+F, F3, F2) ─────────────────
+    #
+    # Ctrl+F looks a name up in the model's label index (prefixes first, then
+    # substrings) and jumps to the first match: its site is expanded, the view
+    # zooms in far enough for labels, centers on it and selects it. F3 goes on
+    # to the next match, F2 renames the focused node (one undo step).
+
+    def ask_find(self):
+        query = simpledialog.askstring("Find", "Node name or label (or part of it):", parent=self.root,
+                                       initialvalue=self.find_query)
+        if query and query.strip():
+            self.find_node(query)
+
+    def find_node(self, query):
+        """Jump to the first node whose label matches query; returns the matches (F3 visits the rest)."""
+        self.find_query = query
+        self.find_results = self.model.labels.search(query)
+        self.find_index = 0
+        if not self.find_results:
+            messagebox.showinfo("Find", f"No node matches {query!r}.", parent=self.root)
+            return []
+        self.jump_to(self.find_results[0])
+        return self.find_results
+
+    def find_next(self):
+        nodes = self.model.nodes
+        results = self.find_results = [n for n in self.find_results if n in nodes]
+        if not results:
+            self.ask_find()
+            return
+        self.find_index = (self.find_index + 1) % len(results)
+        self.jump_to(results[self.find_index])
+
+    def jump_to(self, node):
+        """Center the view on node, zoomed in to at least LABEL_ZOOM, and select it."""
+        model = self.model
+        if node not in model.nodes:
+            return
+        site = model.sites.of.get(node)
+        if site in model.sites.collapsed:
+            self.expand_site(site)
+        if self.zoom < LABEL_ZOOM:
+            self.zoom_level = min(ZOOM_MAX_LEVEL, math.ceil(math.log(LABEL_ZOOM) / math.log(ZOOM_STEP)))
+            self.zoom = ZOOM_STEP ** self.zoom_level
+            self.reproject_dirty = True
+        w, h = self._window_size()
+        x, y = model.position(node)
+        self.view_wx = x - w / 2 / self.zoom
+        self.view_wy = y - h / 2 / self.zoom
+        self._mark_view_dirty()
+        self.nav_prev = None
+        self.nav_curr = node
+        self._apply_focus(node)
+
+    def rename_selected(self):
+        node = self._focus_node()
+        if node is None:
+            return
+        name = simpledialog.askstring("Rename", "Node name (empty: none):", parent=self.root,
+                                      initialvalue=node_label(self.model, node) or "")
+        if name is not None:
+            self.rename_node(node, name)
+
+    def rename_node(self, node, name):
+        """Make name the node's label: it becomes the "name" attribute and any "label" attribute goes."""
+        model = self.model
+        old = model.attrs.get(node)
+        new = {k: v for k, v in (old or {}).items() if k not in ("name", "label")}
+        name = name.strip()
+        if name:
+            new["name"] = name
+        if new == (old or {}):
+            return
+        model.set_attrs(node, new)
+        self.history.record(("attrs", ((node, dict(old) if old else None, new or None),)))
+
+    # ───────────────── Sites (Ctrl+G, E, Shift+E) ─────────────────
+    #
+    # Ctrl+G puts the selection in a named site (Ctrl+Shift+G takes it out), E
+    # collapses the selection's sites (all sites when nothing is selected), and
+    # clicking a collapsed site or Shift+E expands it again. A collapsed site is
+    # one square plus one weighted line per neighboring end, so collapsing and
+    # expanding only create and destroy the items of that site.
+
+    def group_selected(self, site=None):
+        """Put the selected nodes in a site (asks for its name unless given)."""
+        if not self.selected_nodes:
+            return
+        if site is None:
+            site = simpledialog.askstring("Site", "Site / pod name:", parent=self.root)
+            if not site:
+                return
+        self._set_site(self.selected_nodes, site)
+
+    def ungroup_selected(self):
+        self._set_site(self.selected_nodes, None)
+
+    def _set_site(self, nodes, site):
+        model = self.model
+        changes = []
+        for n in nodes:
+            old = model.attrs.get(n)
+            if (old or {}).get("site") == site:
+                continue
+            new = {k: v for k, v in (old or {}).items() if k != "site"}
+            if site is not None:
+                new["site"] = site
+            model.set_attrs(n, new)
+            changes.append((n, dict(old) if old else None, new or None))
+        if not changes:
+            return
+        self.history.record(("attrs", tuple(changes)))
+        if site in model.sites.collapsed:  # joining a collapsed site hides the nodes
+            self._forget_hidden()
+            self._unrealize_all()
+            self._mark_view_dirty()
+        self.sites_dirty = True
+        self.frame.request()
+
+    def collapse_selected(self):
+        sites = self.model.sites
+        if self.selected_nodes:
+            names = {sites.of[n] for n in self.selected_nodes if n in sites.of}
+        else:
+            names = sites.members.keys() - sites.collapsed
+        for site in sorted(names):
+            self.collapse_site(site)
+
+    def expand_all(self):
+        for site in sorted(self.model.sites.collapsed):
+            self.expand_site(site)
+
+    def collapse_site(self, site):
+        model = self.model
+        sites = model.sites
+        if site not in sites.members or site in sites.collapsed or self.drag_nodes is not None:
+            return
+        members = sites.members[site]
+        doomed = []
+        for n in members:
+            self._unrealize_node(n, doomed)
+        for ln in model.incident_links(members):
+            self._unrealize_link(ln, doomed)
+        if doomed:
+            self.canvas.delete(*doomed)
+        sites.collapse(model, site)
+        self._forget_hidden()
+        self._bundles_changed()
+        self.sites_dirty = True
+        self.frame.request()
+
+    def expand_site(self, site):
+        model = self.model
+        sites = model.sites
+        if site not in sites.collapsed:
+            return
+        sites.expand(model, site)
+        members = sites.members[site]
+        links = model.incident_links(members)
+        if sites.hidden:
+            links = [ln for ln in links if not (model.links[ln][0] in sites.hidden or model.links[ln][1] in sites.hidden)]
+        self._realize_new(members, links)
+        self.sites_dirty = True
+        self.frame.request()
+
+    def _forget_hidden(self):
+        """Drop selection, chain and navigation state that points into collapsed sites."""
+        hidden = self.model.sites.hidden
+        self.selected_nodes -= hidden
+        if self.chain_node in hidden:
+            self.chain_node = None
+            self._remove_preview()
+        if self.nav_curr in hidden or self.nav_prev in hidden:
+            self.nav_curr = None
+            self.nav_prev = None
+        if self.selected_edge is not None and not hidden.isdisjoint(self.model.links.get(self.selected_edge, ())):
+            self.deselect_edge()
+
+    def get_site_at(self, x, y):
+        """Collapsed site whose square contains screen point (x, y); nearest wins."""
+        model = self.model
+        wx, wy = self.screen_to_world(x, y)
+        best, best_d = None, SITE_RADIUS
+        for site in model.sites.collapsed:
+            cx, cy = model.sites.center(model, site)
+            d = max(abs(wx - cx), abs(wy - cy))
+            if d <= best_d:
+                best, best_d = site, d
+        return best
+
+    # ───────────────── Edge bundling (B) ─────────────────
+    #
+    # An EdgeBundler thread routes the links into trunks (see EdgeBundles). Every
+    # change to the topology sends it one snapshot at the next frame; while it
+    # has work the shapes it finished are picked up every FRAME_MS and drawn at
+    # the next frame, only those that changed. Links that need their own item
+    # (selected, dragged, marked, live) still get one on top of the bundles.
+
+    def toggle_bundling(self):
+        if self.bundler is None:
+            self.start_bundling()
+        else:
+            self.stop_bundling()
+
+    def start_bundling(self):
+        if self.bundler is not None:
+            return
+        self.bundler = EdgeBundler().start()
+        self._bundles_changed()
+        self._unrealize_all()
+        self._mark_view_dirty()
+        self.update_title()
+
+    def stop_bundling(self):
+        if self.bundler is None:
+            return
+        self.bundler.stop()
+        self.bundler = self.bundle_model = None
+        self.bundles_dirty = False
+        if self.bundle_job is not None:
+            self.root.after_cancel(self.bundle_job)
+            self.bundle_job = None
+        self.canvas.delete(*self.bundle_items.values())
+        self.bundle_items.clear()
+        self.bundle_shapes.clear()
+        self.pending_bundles.clear()
+        self._unrealize_all()
+        self._mark_view_dirty()
+        self.update_title()
+
+    def _bundles_changed(self):
+        if self.bundler is not None:
+            self.bundles_dirty = True
+            self.frame.request()
+
+    def _send_bundles(self):
+        self.bundles_dirty = False
+        self.bundle_model = self.model
+        self.bundler.update(self.model)
+        if self.bundle_job is None:
+            self.bundle_job = self.root.after(FRAME_MS, self._poll_bundles)
+
+    def _poll_bundles(self):
+        self.bundle_job = None
+        bundler = self.bundler
+        busy = bundler.busy()  # read first: shapes finished before it are then in take()
+        self.pending_bundles.update(bundler.take())
+        if self.pending_bundles:
+            self.frame.request()
+        if bundler.error is not None:
+            messagebox.showerror("Bundling failed", str(bundler.error), parent=self.root)
+            self.stop_bundling()
+        elif busy:
+            self.bundle_job = self.root.after(FRAME_MS, self._poll_bundles)
+
+    def _draw_bundles(self):
+        pending, self.pending_bundles = self.pending_bundles, {}
+        canvas = self.canvas
+        z = self.zoom
+        doomed = []
+        for shape, value in pending.items():
+            item = self.bundle_items.get(shape)
+            if value is None:
+                self.bundle_shapes.pop(shape, None)
+                if item is not None:
+                    doomed.append(self.bundle_items.pop(shape))
+                continue
+            points, count = self.bundle_shapes[shape] = value
+            coords = [c * z for c in points]
+            width = self._bundle_width(shape, count)
+            if item is None:
+                item = canvas.create_line(*coords, fill=BUNDLE_COLOR, width=width, smooth=shape[0] == "trunk",
+                                          tags=("topo",))
+                canvas.tag_lower(item)
+                self.bundle_items[shape] = item
+            else:
+                canvas.coords(item, *coords)
+                canvas.itemconfigure(item, width=width)
+        if doomed:
+            canvas.delete(*doomed)
+
+    def _bundle_width(self, shape, count):
+        if shape[0] == "fan":
+            return LOD_EDGE_WIDTH
+        return min(BUNDLE_MAX_WIDTH, self._edge_width() + math.log2(count))
 
     # ───────────────── Edge selection ─────────────────
 
-    def select_edge(self, line_id):
-        if self.selected_edge == line_id:
+    def select_edge(self, link):
+        if self.selected_edge == link:
             return
         self.deselect_edge()
-        self.selected_edge = line_id
-        self.canvas.itemconfigure(self.selected_edge, fill=EDGE_HIGHLIGHT_COLOR, width=EDGE_HIGHLIGHT_WIDTH)
+        self.selected_edge = link
+        self.pending_edge_styles[link] = True
+        self.frame.request()
 
     def deselect_edge(self):
         if self.selected_edge is not None:
-            if self.selected_edge in self.edge_map:
-                self.canvas.itemconfigure(self.selected_edge, fill=EDGE_COLOR, width=EDGE_WIDTH)
+            self.pending_edge_styles[self.selected_edge] = False
+            self.frame.request()
             self.selected_edge = None
 
     # ───────────────── Delete (D) ─────────────────
@@ -400,35 +1371,72 @@ class TopologyTool:
                 self.nav_prev = None
             return
 
-    def _delete_edge(self, line_id):
-        self.canvas.delete(line_id)
-        self.edge_map.pop(line_id, None)
-        self.edges = [(ln, n1, n2) for (ln, n1, n2) in self.edges if ln != line_id]
+    def _delete_edge(self, link):
+        self.history.record(("remove", self.model.take_rows((), [link])))
+        self.model.remove_link(link)
+        doomed = []
+        self._unrealize_link(link, doomed)
+        if doomed:
+            self.canvas.delete(*doomed)
 
     def _delete_nodes(self, nodes_to_delete: set):
         self.deselect_edge()
 
-        to_remove = []
-        for (ln, n1, n2) in self.edges:
-            if n1 in nodes_to_delete or n2 in nodes_to_delete:
-                to_remove.append(ln)
-        for ln in to_remove:
-            self._delete_edge(ln)
+        # Only the removed rows are kept for undo, never a snapshot of the rest
+        model = self.model
+        self.history.record(("remove", model.take_rows(nodes_to_delete, model.incident_links(nodes_to_delete))))
 
+        doomed_items = []
+        for ln in model.remove_nodes(nodes_to_delete):
+            self._unrealize_link(ln, doomed_items)
         for n in nodes_to_delete:
-            if n in self.nodes:
-                self.canvas.delete(n)
-                self.nodes.pop(n, None)
+            self._unrealize_node(n, doomed_items)
+
+        # One Tcl call for the whole selection
+        if doomed_items:
+            self.canvas.delete(*doomed_items)
 
     # ───────────────── Clear topology ─────────────────
 
-    def clear_topology(self):
+    def clear_topology(self, record=True):
+        self.cancel_import()
+        self.cancel_layout()
+        self.layout_warm = False
+        self._end_drag()
+        model = self.model
+        if record and model.nodes:
+            self.history.record(("clear", model.take_rows(list(model.ids), list(model.links)), model.node_seq))
         self.canvas.delete("all")
-        self.nodes.clear()
-        self.edges.clear()
-        self.edge_map.clear()
-        self.node_seq = 0
+        self.preview_line = None
+        self.bundle_items.clear()
+        self.bundle_shapes.clear()
+        self.pending_bundles.clear()
+        self.pending_highlights.clear()
+        self.pending_edge_styles.clear()
+        self.analysis = self.analysis_ends = self.analysis_version = None
+        self.diff_base = self.diff = None
+        self.marked_nodes = {}
+        self.marked_links = {}
+        self.model.clear()
+        self.node_items.clear()
+        self.item_nodes.clear()
+        self.label_items.clear()
+        self.link_items.clear()
+        self.item_links.clear()
+        self.lod_strokes.clear()
+        self.lod_members.clear()
+        self.lod_key.clear()
+        self.site_items.clear()
+        self.agg_items.clear()
+        self.sites_dirty = False
+        self.realized_rect = None
+        self.realized_lod = False
+        self.reproject_dirty = False
+        self.zoom_level = 0
         self.zoom = 1.0
+        self.view_wx = 0.0
+        self.view_wy = 0.0
+        self._sync_scroll()
 
         self.mode = "neutral"
         self.chain_node = None
@@ -447,6 +1455,668 @@ class TopologyTool:
         self.draw_legend()
         self.update_title()
 
+    # ───────────────── Undo / redo (Ctrl+Z / Ctrl+Y) ─────────────────
+
+    def undo(self):
+        self._step_history(self.history.undo)
+
+    def redo(self):
+        self._step_history(self.history.redo)
+
+    def _step_history(self, step):
+        if self.dragging or self.dragging_group:
+            return
+        self.cancel_import()
+        self.cancel_layout()
+        cmd = step(self.model)
+        if cmd is None:
+            return
+        self.layout_warm = False
+
+        # Drop references to elements the step removed
+        model = self.model
+        self.selected_nodes &= model.nodes.keys()
+        self._forget_hidden()
+        if self.selected_edge not in model.links:
+            self.selected_edge = None
+        if self.chain_node not in model.nodes:
+            self.chain_node = None
+            self._remove_preview()
+        self.preview_dirty = True
+        if self.nav_curr not in model.nodes:
+            self.nav_curr = None
+            self.nav_prev = None
+        elif self.nav_prev not in model.nodes:
+            self.nav_prev = None
+        self.pending_highlights.clear()
+        self.pending_edge_styles.clear()
+        touched = self._history_elements(cmd)
+        if touched is None:
+            self._unrealize_all()
+            self._mark_view_dirty()
+        else:
+            self._redraw_elements(*touched)
+        self.update_title()
+
+    def _history_elements(self, cmd):
+        """(nodes, links) whose items a History step may have changed; None if the whole view must go."""
+        model = self.model
+        nodes, links = set(), set()
+        for step in (cmd[1] if cmd[0] == "steps" else (cmd,)):
+            op = step[0]
+            if op == "clear":
+                return None
+            if op in ("add", "remove"):
+                step_nodes, step_links = packed_ids(step[1])
+                nodes.update(step_nodes)
+                links.update(step_links)
+            elif op == "attrs":
+                if model.sites.collapsed and any((old or {}).get("site") != (new or {}).get("site")
+                                                 for _node, old, new in step[1]):
+                    return None  # nodes joined or left a collapsed site: shown or hidden
+                nodes.update(node for node, _old, _new in step[1])
+            else:  # move, place, kinds
+                nodes.update(step[1])
+        links.update(model.incident_links(nodes))
+        return nodes, links
+
+    def _redraw_elements(self, nodes, links):
+        """Drop the items of these nodes and links, then draw those that still exist and are in view."""
+        model = self.model
+        doomed = []
+        for ln in links:
+            self._unrealize_link(ln, doomed)
+        for n in nodes:
+            self._unrealize_node(n, doomed)
+        if doomed:
+            self.canvas.delete(*doomed)
+        self._realize_new([n for n in nodes if n in model.nodes], [ln for ln in links if ln in model.links])
+        if self.selected_edge in links:
+            self.pending_edge_styles[self.selected_edge] = True
+        self.sites_dirty = True  # collapsed sites' centers and aggregate links follow their members
+        self.frame.request()
+
+    # ───────────────── Autosave journal ─────────────────
+    #
+    # Every History step is also appended to a Journal, whose thread does all the
+    # disk work. On the next start the last session is recovered from it, so a
+    # crash or closing the window loses at most the last JOURNAL_SYNC_S of edits.
+    # A second window finds the directory locked and runs without autosave.
+
+    def _open_journal(self, directory):
+        try:
+            lock = lock_journal(directory)
+        except OSError as e:
+            messagebox.showwarning("Autosave", f"Autosave is off: {e}", parent=self.root)
+            return
+        if lock is None:
+            # Another window journals there: leave its session alone, and this one unsaved
+            messagebox.showwarning("Autosave", f"Autosave is off: another window is autosaving to {directory}.",
+                                   parent=self.root)
+            return
+        try:
+            model = recover_journal(directory)
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            # Keep the unreadable files for a later look; the new journal must not overwrite them
+            try:
+                kept = "\nThe autosave files were kept as: " + ", ".join(set_aside_journal(directory))
+            except OSError as moving:
+                lock.close()
+                messagebox.showwarning("Autosave", f"Could not recover the last session: {e}\n"
+                                       f"Autosave is off: {moving}", parent=self.root)
+                return
+            messagebox.showwarning("Autosave", f"Could not recover the last session: {e}{kept}", parent=self.root)
+            model = None
+        if model is not None and model.nodes:
+            self.model = model
+            self.zoom_to_fit()
+        self.journal = Journal(directory, lock=lock).start(self.model)
+
+    def _on_history_step(self, cmd, forward):
+        if self.journal is not None:
+            self.journal.append(cmd, forward)
+        for step in (cmd[1] if cmd[0] == "steps" else (cmd,)):
+            if step[0] == "attrs":  # styled attributes or labels may have changed: retag the nodes' items
+                self.pending_retags.update(node for node, _old, _new in step[1])
+                self.live_version = None  # names too: live states are matched again
+                self.frame.request()
+        if self.analysis is not None:
+            if self.analysis == "diff":
+                self.analysis_version = None  # moves and attribute edits count too
+            self.frame.request()  # the marks are recomputed at the next frame
+        self._bundles_changed()
+
+    def on_close(self):
+        self.stop_recording()  # first: the recorded session ends as it was, not as closing leaves it
+        self.stop_live()
+        self.stop_bundling()
+        # Pending import/layout/drag steps reach the journal before it closes
+        self.cancel_import()
+        self.cancel_layout()
+        self._end_drag()
+        if self.journal is not None:
+            self.journal.close()
+        self.stop_profiling()
+        self.root.destroy()
+
+    # ───────────────── Profiling (F12) ─────────────────
+    #
+    # Profiling wraps PROFILED_METHODS on this instance (and rebinds the events to
+    # the wrappers); turning it off removes them again, so when it is off every
+    # handler runs untouched. A HUD next to the legend lists the slowest handlers
+    # and the canvas item counts; the trace is written when profiling stops,
+    # including on exit.
+
+    def toggle_profiling(self):
+        if self.profiler is None:
+            self.start_profiling()
+        else:
+            self.stop_profiling()
+
+    def start_profiling(self, path=None):
+        if self.profiler is not None:
+            return
+        if path:
+            self.profile_path = path
+        self.profiler = Profiler()
+        self._instrument()
+        self._draw_hud()
+
+    def stop_profiling(self):
+        """Stop timing, remove the HUD and write the trace to profile_path."""
+        profiler = self.profiler
+        if profiler is None:
+            return
+        self.profiler = None
+        self._instrument()
+        if self.hud_job is not None:
+            self.root.after_cancel(self.hud_job)
+            self.hud_job = None
+        self.canvas.delete("hud")
+        if profiler.stats:
+            try:
+                profiler.dump(self.profile_path)
+            except OSError as e:
+                messagebox.showerror("Profile", f"Could not write {self.profile_path}: {e}", parent=self.root)
+
+    def _instrument(self):
+        """Wrap PROFILED_METHODS while profiling (unwrap otherwise) and rebind the events to match."""
+        for name in PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+            if self.profiler is not None:
+                setattr(self, name, self.profiler.wrap(name, getattr(self, name)))
+        self._rebind()
+
+    def _draw_hud(self):
+        self.hud_job = None
+        profiler = self.profiler
+        if profiler is None:
+            return
+        items = {"nodes": len(self.node_items), "links": len(self.link_items), "strokes": len(self.lod_strokes),
+                 "sites": len(self.site_items) + len(self.agg_items)}
+        profiler.counter("canvas items", **items)
+        lines = [f"{'handler':<24}{'calls':>7}{'p50':>8}{'p95':>8}{'p99':>8} ms"]
+        for name, s in itertools.islice(profiler.summary().items(), PROFILE_HUD_ROWS):
+            lines.append(f"{name[:24]:<24}{s['calls']:>7}{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}{s['p99_ms']:>8.2f}")
+        lines.append("items: " + ", ".join(f"{count:,} {kind}" for kind, count in items.items()))
+
+        self.canvas.delete("hud")
+        sx, sy = self.canvas_scroll  # overlay items follow the scroll actually applied
+        tags = OVERLAY_TAGS + ("hud",)
+        self.canvas.create_rectangle(330 + sx, 10 + sy, 760 + sx, 22 + 14 * len(lines) + sy,
+                                     fill=LEGEND_BG, outline=LEGEND_OUTLINE, tags=tags)
+        self.canvas.create_text(340 + sx, 16 + sy, text="\n".join(lines), anchor="nw", fill="white",
+                                font=("Courier", 9), tags=tags)
+        self.hud_job = self.root.after(PROFILE_HUD_MS, self._draw_hud)
+
+    # ───────────────── Input recording / replay (F9) ─────────────────
+    #
+    # Recording wraps the bound handlers (see _bind) so every event is written
+    # down before it is handled, and marks every frame. replay() calls the same
+    # handlers with the recorded fields and runs frames at the markers only, then
+    # reports each event's latency and whether the session ended in the state it
+    # ended in when recorded. Dialogs (save, open, group) and the background work
+    # of imports and layouts are outside that: sessions using them replay, but
+    # may not match.
+
+    def toggle_recording(self):
+        if self.recorder is None:
+            self.start_recording()
+        else:
+            self.stop_recording()
+
+    def start_recording(self, path=None):
+        if self.recorder is not None:
+            return
+        if path:
+            self.record_path = path
+        if self.frame.job is not None:
+            self.frame.flush_now()  # the recording starts from a drawn, settled state
+        header = {"window": list(self._window_size()), "state": self.state_digest()}
+        try:
+            self.recorder = InputRecorder(self.record_path, header)
+        except OSError as e:
+            messagebox.showerror("Record", f"Could not write {self.record_path}: {e}", parent=self.root)
+            return
+        self._rebind()
+        self.update_title()
+
+    def stop_recording(self):
+        """Stop recording and close the file with the digest of the final state."""
+        recorder = self.recorder
+        if recorder is None:
+            return
+        if self.frame.job is not None:
+            self.frame.flush_now()  # still recorded: the last frame is part of the session
+        self.recorder = None
+        recorder.close({"events": recorder.count, "state": self.state_digest(), "model": model_digest(self.model)})
+        self._rebind()
+        self.update_title()
+
+    def state_digest(self):
+        """model_digest extended with the interaction state: mode, view, selection, gesture in progress."""
+        ui = [self.mode, self.zoom_level, self.view_wx, self.view_wy, sorted(self.selected_nodes), self.selected_edge,
+              self.chain_node, self.nav_curr, self.down_kind, self.dragging, self.panning, self.pending_place,
+              sorted(self.model.sites.collapsed), self.analysis]
+        data = model_digest(self.model) + json.dumps(ui, separators=(",", ":"), default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def replay(self, path, speed=0.0, done=None):
+        """Feed a recording to the bound handlers; done(report) gets the latencies and state digests.
+
+        speed 0 replays as fast as possible before returning (the report is also
+        returned); otherwise the recorded pauses, divided by speed, are kept on
+        the Tk event loop. Either way frames run at the recorded markers only.
+        """
+        header, events, trailer = read_recording(path)
+        if self.frame.job is not None:
+            self.frame.flush_now()
+        self.frame.manual = True
+        initial = self.state_digest()
+        timer = Profiler()
+        latencies = [None] * len(events)  # ms per recorded event or frame; None: no such binding here
+        perf = time.perf_counter
+        begin = perf()
+
+        def play(i):
+            _t, target, sequence, event = events[i]
+            start = perf()
+            if target is None:
+                self.frame.flush_now()
+                self.root.update_idletasks()  # the canvas redraw is part of the frame
+                sequence = "frame"
+            else:
+                handler = self.bindings.get((target, sequence))
+                if handler is None:
+                    return
+                handler(event)
+            duration = perf() - start
+            timer.record(sequence, start, duration)
+            latencies[i] = 1000 * duration
+
+        def finish():
+            self.frame.manual = False
+            if self.frame.job == FRAME_MANUAL:  # requested after the last marker
+                self.frame.job = None
+                self.frame.request()
+            final = self.state_digest()
+            handled = [(ms, i) for i, ms in enumerate(latencies) if ms is not None and events[i][1] is not None]
+            report = {
+                "recording": path,
+                "events": len(handled),
+                "frames": sum(1 for event in events if event[1] is None),
+                "skipped": latencies.count(None),
+                "recorded_s": events[-1][0] if events else 0.0,
+                "replay_s": perf() - begin,
+                "latency_ms": latency_summary([ms for ms, _i in handled]),
+                "handlers": timer.summary(),
+                "slowest": [[i, events[i][2], ms] for ms, i in heapq.nlargest(RECORD_SLOWEST, handled)],
+                "window_match": header.get("window") == list(self._window_size()),
+                "initial_match": header.get("state") == initial,
+                "state": final,
+                "expected": trailer.get("state"),
+                "match": final == trailer.get("state"),
+                "per_event_ms": latencies,
+            }
+            if done is not None:
+                done(report)
+            return report
+
+        if speed <= 0:
+            for i in range(len(events)):
+                play(i)
+            return finish()
+
+        def step(i):
+            while i < len(events):
+                wait = begin + events[i][0] / speed - perf()
+                if wait > 0.001:
+                    self.root.after(int(wait * 1000), step, i)
+                    return
+                play(i)
+                i += 1
+            finish()
+        step(0)
+        return None
+
+    # ───────────────── Save / open (Ctrl+S / Ctrl+O) ─────────────────
+
+    def save_topology(self, path=None):
+        if path is None:
+            path = filedialog.asksaveasfilename(
+                parent=self.root,
+                initialfile=os.path.basename(self.file_path) if self.file_path else "",
+                defaultextension=".topo",
+                filetypes=[("Topology snapshot", "*.topo"), ("JSON export", "*.json")],
+            )
+            if not path:
+                return
+        try:
+            if path.lower().endswith(".json"):
+                export_json(self.model, path)
+            else:
+                save_snapshot(self.model, path)
+        except OSError as e:
+            messagebox.showerror("Save failed", str(e), parent=self.root)
+            return
+        self.file_path = path
+
+    def open_topology(self, path=None):
+        if path is None:
+            path = filedialog.askopenfilename(
+                parent=self.root,
+                filetypes=[("Topology files", "*.topo *.json"), ("All files", "*")],
+            )
+            if not path:
+                return
+        try:
+            model = load_topology_file(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Open failed", f"{path}: {e}", parent=self.root)
+            return
+        self._set_model(model)
+        self.file_path = path
+
+    def _set_model(self, model):
+        """Replace the whole topology; items are (re)created lazily by the next frame."""
+        self.clear_topology(record=False)
+        self.history.clear()
+        self.model = model
+        if self.journal is not None:
+            self.journal.rebase(model)
+        self.zoom_to_fit()
+
+    def zoom_to_fit(self):
+        box = self.model.bbox()
+        if box is None:
+            return
+        w, h = self._window_size()
+        x0, y0, x1, y1 = box
+        pad = 2 * NODE_RADIUS
+        z = min(w / (x1 - x0 + 2 * pad), h / (y1 - y0 + 2 * pad))
+        level = math.floor(math.log(z) / math.log(ZOOM_STEP))
+        self.zoom_level = max(ZOOM_MIN_LEVEL, min(0, level))
+        self.zoom = ZOOM_STEP ** self.zoom_level
+        self.view_wx = (x0 + x1) / 2 - w / 2 / self.zoom
+        self.view_wy = (y0 + y1) / 2 - h / 2 / self.zoom
+        self.reproject_dirty = True
+        self._mark_view_dirty()
+
+    # ───────────────── Export drawing (Ctrl+E) ─────────────────
+
+    def export_topology(self, path=None):
+        if path is None:
+            stem = os.path.splitext(os.path.basename(self.file_path))[0] if self.file_path else ""
+            path = filedialog.asksaveasfilename(
+                parent=self.root,
+                initialfile=stem,
+                defaultextension=".svg",
+                filetypes=[("SVG drawing", "*.svg"), ("PNG image", "*.png"), ("PDF document", "*.pdf"),
+                           ("Compressed SVG", "*.svgz")],
+            )
+            if not path:
+                return
+        try:
+            export_drawing(self.model, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Export failed", str(e), parent=self.root)
+
+    # ───────────────── Import (Ctrl+I) ─────────────────
+    #
+    # The importer runs on the UI thread in slices of about one frame: each slice
+    # bulk-inserts a batch into the model, and the next frame realizes only the
+    # part of it that is on screen. ESC stops the import and keeps what arrived.
+
+    def import_topology(self, path=None, fmt=None):
+        if self.import_steps is not None:
+            return
+        if path is None:
+            path = filedialog.askopenfilename(
+                parent=self.root,
+                filetypes=[("Neighbor dumps, edge lists, graphs", "*.txt *.log *.csv *.tsv *.graphml *.xml *.dot *.gv"),
+                           ("All files", "*")],
+            )
+            if not path:
+                return
+        self.importer = TopologyImporter(self.model, progress=self._import_progress)
+        self.import_fit = not self.model.nodes
+        self.import_steps = self.importer.run(path, fmt)
+        self.import_job = self.root.after_idle(self._import_step)
+
+    def _import_step(self):
+        self.import_job = None
+        deadline = time.perf_counter() + FRAME_MS / 1000
+        try:
+            for _stats in self.import_steps:
+                self.import_nodes.extend(self.importer.last_nodes)
+                self.import_links.extend(self.importer.last_links)
+                self._realize_new(self.importer.last_nodes, self.importer.last_links)
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                self._finish_import()
+                return
+        except (OSError, ValueError, ET.ParseError, csv.Error) as e:
+            self._finish_import()
+            messagebox.showerror("Import failed", str(e), parent=self.root)
+            return
+        self.import_job = self.root.after(1, self._import_step)
+
+    def _realize_new(self, nodes, links):
+        """Draw just the freshly added elements that fall inside the realized region."""
+        if self.realized_rect is None:
+            self._mark_view_dirty()
+            return
+        rect = self.realized_rect
+        model = self.model
+        hidden = model.sites.hidden
+        for n in model.filter_in_rect(nodes, *rect):
+            if n not in hidden:
+                self._draw_node(n)
+        if self.bundler is not None:
+            self._bundles_changed()
+            return
+        for ln in links:
+            if hidden and not hidden.isdisjoint(model.links[ln]):
+                continue
+            if segment_hits_rect(*model.segment(ln), *rect):
+                if self.realized_lod:
+                    self._lod_add(ln)
+                else:
+                    self._draw_link(ln)
+
+    def _import_progress(self, stats):
+        done = f" {100 * stats['bytes'] // stats['total_bytes']}%" if stats["total_bytes"] else ""
+        self.root.title(f"Mode: {self.mode.upper()} — importing{done}: {stats['nodes']:,} nodes, "
+                        f"{stats['links']:,} links ({stats['bytes_per_s'] / 1e6:.1f} MB/s)")
+
+    def _finish_import(self):
+        if self.import_job is not None:
+            self.root.after_cancel(self.import_job)
+            self.import_job = None
+        refined = []
+        if self.import_steps is not None:
+            self.import_steps.close()
+            self.import_steps = None
+            refined = self.importer.refinements()
+            self.importer = None
+        if self.import_nodes or self.import_links or refined:
+            # One undo step for the whole import, including what it changed on nodes it only refined
+            model = self.model
+            nodes = [n for n in self.import_nodes if n in model.nodes]
+            links = [ln for ln in self.import_links if ln in model.links]
+            cmd = ("add", model.take_rows(nodes, links))
+            self.history.record(("steps", (cmd, *refined)) if refined else cmd)
+            self.import_nodes = []
+            self.import_links = []
+        # Nodes that already existed may have been refined (kind, position): redraw the view
+        self._unrealize_all()
+        self.layout_warm = False
+        if self.import_fit:
+            self.zoom_to_fit()
+        self._mark_view_dirty()
+        self.update_title()
+
+    def cancel_import(self):
+        if self.import_steps is not None:
+            self._finish_import()
+
+    # ───────────────── Bulk insert (scripting, generators) ─────────────────
+    #
+    # create_node/connect_nodes follow the mouse flow and draw every item.
+    # Scripts insert through the model's bulk calls instead: the whole insert is
+    # one undo step, and only what ends up on screen is drawn, once, at the end.
+
+    def add_bulk(self, build, *args, **options):
+        """Run build(model, *args, **options), which bulk-inserts and returns the new (nodes, links)."""
+        self.cancel_import()
+        self.cancel_layout()
+        self._end_drag()
+        fit = not self.model.nodes
+        nodes, links = build(self.model, *args, **options)
+        self.history.record(("add", self.model.take_rows(nodes, links)))
+        self.layout_warm = False
+        if fit:
+            self.zoom_to_fit()
+        else:
+            self._realize_new(nodes, links)
+        self.update_title()
+        return nodes, links
+
+    def generate(self, spec):
+        """Add a standard fabric, e.g. generate("spine-leaf:64,2048") (see GENERATORS)."""
+        return self.add_bulk(generate_fabric, spec)
+
+    # ───────────────── Auto-layout (L, Shift+L, H, O; pin with P) ─────────────────
+    #
+    # The layout runs on a LayoutJob thread over a snapshot of the model. Every
+    # LAYOUT_POLL_MS the newest positions are written back and the view redrawn;
+    # nodes dragged or pinned meanwhile keep the position the user gave them.
+
+    def start_layout(self, algorithm, **options):
+        if not self.model.nodes:
+            return
+        self.cancel_layout()
+        self.layout_job = LayoutJob(self.model, algorithm, **options).start()
+        self.layout_moved = set()
+        self.layout_applied = False
+        self.layout_fit = not options.get("warm")
+        self.layout_poll = self.root.after(LAYOUT_POLL_MS, self._poll_layout)
+        self.update_title()
+
+    def _poll_layout(self):
+        self.layout_poll = None
+        job = self.layout_job
+        if self.dragging or self.dragging_group:  # redrawing would drop the items being dragged
+            self.layout_poll = self.root.after(LAYOUT_POLL_MS, self._poll_layout)
+            return
+        done = job.done  # read first: positions published before it are then in take()
+        latest = job.take()
+        if latest is not None:
+            self._apply_layout(job, *latest, fit=self.layout_fit)
+        if not done:
+            self.layout_fit = False
+            self.layout_poll = self.root.after(LAYOUT_POLL_MS, self._poll_layout)
+            return
+        self.layout_job = None
+        self._record_layout(job)
+        if job.error is not None:
+            messagebox.showerror("Layout failed", str(job.error), parent=self.root)
+        else:
+            self.layout_warm = True
+        self.update_title()
+
+    def _apply_layout(self, job, xs, ys, fit=False):
+        ids = job.ids
+        if self.layout_moved:
+            keep = [i for i, n in enumerate(ids) if n not in self.layout_moved]
+            ids = [ids[i] for i in keep]
+            xs = [xs[i] for i in keep]
+            ys = [ys[i] for i in keep]
+        self.model.set_positions(ids, xs, ys)
+        self.layout_applied = True
+        self._unrealize_all()
+        self._bundles_changed()
+        if fit:
+            self.zoom_to_fit()
+        if self.chain_node is not None:
+            self.preview_dirty = True
+        self._mark_view_dirty()
+
+    def cancel_layout(self):
+        """Stop a running layout; positions applied so far stay."""
+        if self.layout_job is None:
+            return
+        self.layout_job.cancel()
+        self._record_layout(self.layout_job)
+        self.layout_job = None
+        if self.layout_poll is not None:
+            self.root.after_cancel(self.layout_poll)
+            self.layout_poll = None
+        self.update_title()
+
+    def _record_layout(self, job):
+        """One undo step for a whole layout run: start and end positions of the nodes it placed."""
+        if not self.layout_applied:
+            return
+        self.layout_applied = False
+        rows = self.model.nodes
+        xs, ys = self.model.xs, self.model.ys
+        keep = [i for i, n in enumerate(job.ids) if n in rows and n not in self.layout_moved]
+        ids = array("q", (job.ids[i] for i in keep))
+        self.history.record(("place", ids,
+                             array("d", (job.xs[i] for i in keep)), array("d", (job.ys[i] for i in keep)),
+                             array("d", (xs[rows[n]] for n in ids)), array("d", (ys[rows[n]] for n in ids))))
+
+    def _focus_node(self):
+        if len(self.selected_nodes) == 1:
+            return next(iter(self.selected_nodes))
+        return self.nav_curr if self.nav_curr in self.model.nodes else None
+
+    def toggle_pin(self):
+        """Pin the selected nodes (or unpin them if they all are)."""
+        nodes = set(self.selected_nodes)
+        if not nodes and self._focus_node() is not None:
+            nodes = {self._focus_node()}
+        if not nodes:
+            return
+        attrs = self.model.attrs
+        pin = not all(attrs.get(n, {}).get("pinned") for n in nodes)
+        before = {n: dict(attrs[n]) if n in attrs else None for n in nodes}
+        for n in nodes:
+            if pin:
+                attrs.setdefault(n, {})["pinned"] = True
+            elif n in attrs:
+                attrs[n].pop("pinned", None)
+                if not attrs[n]:
+                    del attrs[n]
+            self.pending_highlights[n] = n in self.selected_nodes
+        self.history.record(("attrs", tuple((n, old, dict(attrs[n]) if n in attrs else None)
+                                            for n, old in before.items())))
+        if pin and self.layout_job is not None:
+            self.layout_moved.update(nodes)
+        self.frame.request()
+
     # ───────────────── Pan (right drag empty space) ─────────────────
 
     def on_pan_down(self, event):
@@ -473,7 +2143,10 @@ class TopologyTool:
         dy = event.y - self.pan_last[1]
         self.pan_last = (event.x, event.y)
 
-        self.canvas.move("topo", dx, dy)
+        # O(1): shift the view, not the items
+        self.view_wx -= dx / self.zoom
+        self.view_wy -= dy / self.zoom
+        self._mark_view_dirty()
         self.last_cursor = (event.x, event.y)
 
     def on_pan_up(self, event):
@@ -493,24 +2166,35 @@ class TopologyTool:
         self._apply_zoom(direction, event.x, event.y)
 
     def _apply_zoom(self, direction, pivot_x, pivot_y):
-        factor = 1.1 if direction > 0 else 0.9
-
-        new_zoom = self.zoom * factor
-        if new_zoom < ZOOM_MIN:
-            factor = ZOOM_MIN / self.zoom
-            new_zoom = ZOOM_MIN
-        elif new_zoom > ZOOM_MAX:
-            factor = ZOOM_MAX / self.zoom
-            new_zoom = ZOOM_MAX
-
-        if abs(factor - 1.0) < 1e-6:
+        level = self.zoom_level + (1 if direction > 0 else -1)
+        level = max(ZOOM_MIN_LEVEL, min(ZOOM_MAX_LEVEL, level))
+        if level == self.zoom_level:
             return
 
-        self.zoom = new_zoom
-        self.canvas.scale("topo", pivot_x, pivot_y, factor, factor)
+        # Keep the world point under the cursor fixed on screen. Views reached
+        # around one pivot are kept per level: zooming back restores them
+        # exactly instead of piling up float error. Any other view change
+        # (pan, fit, another pivot) starts over.
+        views = self.zoom_views
+        here = (pivot_x, pivot_y, self.view_wx, self.view_wy)
+        if views.get(self.zoom_level) != here:
+            views.clear()
+            views[self.zoom_level] = here
+        wx, wy = self.view_wx + pivot_x / self.zoom, self.view_wy + pivot_y / self.zoom
+        self.zoom_level = level
+        self.zoom = ZOOM_STEP ** level
+        if level in views:
+            self.view_wx, self.view_wy = views[level][2:]
+        else:
+            self.view_wx = wx - pivot_x / self.zoom
+            self.view_wy = wy - pivot_y / self.zoom
+            views[level] = (pivot_x, pivot_y, self.view_wx, self.view_wy)
+
+        # Wheel bursts collapse into one re-projection per frame
+        self.reproject_dirty = True
+        self._mark_view_dirty()
 
         # Preview is UI (not scaled). Rebuild it.
-        self._remove_preview()
         self._ensure_preview(*self.last_cursor)
 
     # ───────────────── Mouse events (left) ─────────────────
@@ -527,6 +2211,11 @@ class TopologyTool:
         self.pre_press_chain = self.chain_node
         self.chain_set_on_press = False
 
+        site = self.get_site_at(event.x, event.y)
+        if site is not None:
+            self.expand_site(site)
+            return
+
         node = self.get_node_at(event.x, event.y)
         if node:
             self.down_kind = "node"
@@ -611,19 +2300,16 @@ class TopologyTool:
             dy = event.y - self.mouse_down_pos[1]
             self.mouse_down_pos = (event.x, event.y)
 
-            if self.dragging_group:
-                for n in self.selected_nodes:
-                    self.canvas.move(n, dx, dy)
-            else:
-                self.canvas.move(self.dragging_node, dx, dy)
-
-            self.update_edges()
+            if self.drag_nodes is None:
+                self._begin_drag(self.selected_nodes if self.dragging_group else (self.dragging_node,))
+            self._queue_drag(dx, dy)
             return
 
         # Update selection box
         if self.down_kind == "selectbox" and self.selection_box and self.selection_start:
             x0, y0 = self.selection_start
-            self.canvas.coords(self.selection_box, x0, y0, event.x, event.y)
+            self.selbox_end = (event.x, event.y)
+            self.frame.request()
             self.update_group_selection(x0, y0, event.x, event.y)
 
     def on_mouse_up(self, event):
@@ -646,7 +2332,7 @@ class TopologyTool:
                 clicked = self.down_node
                 src = self.pre_press_chain
 
-                if src is not None and src in self.nodes and src != clicked:
+                if src is not None and src in self.model.nodes and src != clicked:
                     if not self.edge_exists(src, clicked):
                         self.connect_nodes(src, clicked)
 
@@ -660,6 +2346,7 @@ class TopologyTool:
                     self.nav_curr = clicked
                     self._apply_focus(clicked)
 
+            self._end_drag()
             self.dragging = False
             self.dragging_group = False
             self.dragging_node = None
@@ -691,127 +2378,756 @@ class TopologyTool:
     # ───────────────── Nodes / edges ─────────────────
 
     def create_node(self, x, y):
-        if self.mode == "router":
-            node = self.canvas.create_oval(
-                x - NODE_RADIUS, y - NODE_RADIUS,
-                x + NODE_RADIUS, y + NODE_RADIUS,
-                fill="#4fc3f7", outline="", width=0,
-                tags=("topo",)
-            )
-            self.nodes[node] = {"type": "router", "seq": self.node_seq}
-            self.node_seq += 1
-            return node
-
-        if self.mode == "switch":
-            node = self.canvas.create_rectangle(
-                x - NODE_RADIUS, y - NODE_RADIUS,
-                x + NODE_RADIUS, y + NODE_RADIUS,
-                fill="#81c784", outline="", width=0,
-                tags=("topo",)
-            )
-            self.nodes[node] = {"type": "switch", "seq": self.node_seq}
-            self.node_seq += 1
-            return node
-
-        return None
+        if self.mode not in ("router", "switch"):
+            return None
+        wx, wy = self.screen_to_world(x, y)
+        node = self.model.add_node(self.mode, wx, wy)
+        self.history.record(("add", self.model.take_rows([node])))
+        self._draw_node(node)
+        return node
 
     def connect_nodes(self, n1, n2):
+        if n1 == n2 or self.model.link_exists(n1, n2):
+            return self.model.link_between(n1, n2)
+        link = self.model.add_link(n1, n2)
+        self.history.record(("add", self.model.take_rows((), [link])))
+        if self.bundler is None:  # else the bundles take it in
+            self._draw_link(link)
+        return link
+
+    # ───────────────── Frame flush ─────────────────
+
+    def _mark_view_dirty(self):
+        self.view_dirty = True
+        self.frame.request()
+
+    def _render_frame(self):
+        """Push all state changed since the last frame to the canvas, in one pass."""
+        if self.view_dirty:
+            reproject = self.reproject_dirty
+            self.view_dirty = self.reproject_dirty = False
+            self._sync_scroll()
+            self._recull(force=reproject, reproject=reproject)
+
+        self._flush_drag()
+
+        if self.analysis is not None and self.analysis_version != (self.model.components.version,
+                                                                   len(self.model.nodes)):
+            self._refresh_analysis()
+
+        if self.sites_dirty or self.model.sites.dirty:
+            self._refresh_sites()
+
+        if self.bundler is not None:
+            if self.bundles_dirty or self.bundle_model is not self.model:
+                self._send_bundles()
+            if self.pending_bundles:
+                self._draw_bundles()
+
+        if self.pending_retags:
+            pending, self.pending_retags = self.pending_retags, set()
+            for node in pending:
+                item = self.node_items.get(node)
+                if item is not None and node in self.model.nodes:
+                    kind = self.model.kind(node)
+                    tags = style_tags("node", self.model.attrs.get(node), kind)
+                    extra = [DRAG_TAG] if DRAG_TAG in self.canvas.gettags(item) else []
+                    self.canvas.itemconfigure(item, tags=("topo", *tags, *extra), fill=self._node_fill(kind, tags))
+                    self._refresh_label(node)
+
+        if self.styles_dirty:
+            self._apply_styles()
+
+        if self.pending_highlights:
+            pending, self.pending_highlights = self.pending_highlights, {}
+            for node, on in pending.items():
+                item = self.node_items.get(node)
+                if item is None:
+                    continue
+                outline, width = ("#ffd54f", 3) if on else self._rest_outline(node)
+                self.canvas.itemconfigure(item, outline=outline, width=width)
+
+        if self.pending_edge_styles:
+            pending, self.pending_edge_styles = self.pending_edge_styles, {}
+            for link, on in pending.items():
+                if link not in self.model.links:
+                    continue
+                if on:
+                    item = self._realize_link(link)
+                elif link in self.link_items:
+                    item = self.link_items[link]
+                else:
+                    continue
+                fill, width = self._link_style(link)
+                self.canvas.itemconfigure(item, fill=fill, width=width)
+
+        if self.selbox_end is not None:
+            if self.selection_box is not None and self.selection_start is not None:
+                self.canvas.coords(self.selection_box, *self.screen_to_canvas(*self.selection_start),
+                                   *self.screen_to_canvas(*self.selbox_end))
+            self.selbox_end = None
+
+        if self.preview_dirty:
+            self.preview_dirty = False
+            self._draw_preview()
+
+    # ───────────────── Rendering (viewport culling + LOD) ─────────────────
+    #
+    # Only nodes/links inside the viewport (plus CULL_MARGIN) own canvas items.
+    # Below LOD_ZOOM nodes become plain squares and links collapse into one thin
+    # stroke per pair of LOD_MERGE_PX screen cells. Links that must be addressed
+    # individually (selected, being dragged) are "detached" and keep their own item;
+    # links marked by an analysis or colored by live state keep their own item too
+    # while they are in view. With bundling on (B) those are the only link items:
+    # the bundles, drawn whole, stand in for all the others.
+
+    def _window_size(self):
+        w = self.canvas.winfo_width()
+        h = self.canvas.winfo_height()
+        if w <= 1 or h <= 1:  # not mapped yet
+            w, h = int(self.canvas.cget("width")), int(self.canvas.cget("height"))
+        return w, h
+
+    def _view_rect(self, margin=0):
+        """World rect covered by the window, grown by margin pixels."""
+        w, h = self._window_size()
+        x0, y0 = self.screen_to_world(-margin, -margin)
+        x1, y1 = self.screen_to_world(w + margin, h + margin)
+        return x0, y0, x1, y1
+
+    def _recull(self, force=False, reproject=False):
+        """Create/destroy items so that exactly the margin-grown viewport is realized.
+
+        Cheap when the view is still inside the realized region (the common pan
+        case). reproject=True also refreshes the coords of surviving items.
+        """
+        lod = self.zoom < LOD_ZOOM
+        if lod != self.realized_lod:
+            self._unrealize_all()
+            self.realized_lod = lod
+            force = True
+
+        if not force and self.realized_rect is not None:
+            vx0, vy0, vx1, vy1 = self._view_rect(NODE_RADIUS * self.zoom)
+            rx0, ry0, rx1, ry1 = self.realized_rect
+            if rx0 <= vx0 and ry0 <= vy0 and vx1 <= rx1 and vy1 <= ry1:
+                return
+
+        region = self._view_rect(CULL_MARGIN)
+        self.realized_rect = region
+        model = self.model
+        want_nodes = model.nodes_in_rect(*region)
+        marked = self.marked_links
+        if self.live_links:
+            marked = marked.keys() | self.live_links.keys()
+        if self.bundler is not None:  # the bundles stand in for every other link
+            want_links = {ln for ln in marked if ln in model.links and segment_hits_rect(*model.segment(ln), *region)}
+        else:
+            want_links = model.links_in_rect(*region)
+        hidden = model.sites.hidden
+        if hidden:  # members of collapsed sites, and their links, are drawn as the site
+            want_nodes -= hidden
+            ends = model.links
+            want_links = {ln for ln in want_links if ends[ln][0] not in hidden and ends[ln][1] not in hidden}
+        keep_nodes = set(self.drag_nodes or ())
+        detached = set(self.drag_links or ())
+        if self.selected_edge is not None:
+            detached.add(self.selected_edge)
+
+        doomed = []
+        for n in [n for n in self.node_items if n not in want_nodes and n not in keep_nodes]:
+            self._unrealize_node(n, doomed)
+        for ln in [ln for ln in self.link_items
+                   if ln not in detached and (ln not in want_links or (lod and ln not in marked))]:
+            self._unrealize_link(ln, doomed)
+        if lod:
+            if reproject:
+                # Stroke keys are screen cells, so a zoom change invalidates all of them
+                for ln in list(self.lod_key):
+                    self._lod_remove(ln, doomed)
+            else:
+                for ln in [ln for ln in self.lod_key if ln not in want_links or ln in detached or ln in marked]:
+                    self._lod_remove(ln, doomed)
+        if doomed:
+            self.canvas.delete(*doomed)
+
+        if reproject:
+            self._reproject_all()
+
+        for n in want_nodes:
+            if n not in self.node_items:
+                self._draw_node(n)
+        for ln in want_links:
+            if ln in self.link_items:
+                continue
+            if lod and ln not in detached and ln not in marked:
+                if ln not in self.lod_key:
+                    self._lod_add(ln)
+            else:
+                self._draw_link(ln)
+        self._refresh_sites(force=True)
+        if self.analysis == "diff":
+            self._draw_diff_ghosts()
+
+    def _unrealize_all(self):
+        self.canvas.delete(*self.node_items.values(), *self.label_items.values(), *self.link_items.values(),
+                           *self.lod_strokes.values(),
+                           *(item for items in self.site_items.values() for item in items if item is not None),
+                           *(item for items in self.agg_items.values() for item in items if item is not None))
+        self.site_items.clear()
+        self.agg_items.clear()
+        self.node_items.clear()
+        self.item_nodes.clear()
+        self.label_items.clear()
+        self.link_items.clear()
+        self.item_links.clear()
+        self.lod_strokes.clear()
+        self.lod_members.clear()
+        self.lod_key.clear()
+        self.realized_rect = None
+
+    def _refresh_sites(self, force=False):
+        """Bring collapsed site and aggregate link items in the realized region up to date.
+
+        Their number grows with the collapsed sites in view, not with the
+        devices inside them, so force (a recull) simply redraws them all;
+        otherwise only aggregate links whose count changed are redrawn.
+        """
+        sites = self.model.sites
+        doomed = []
+        if force or self.sites_dirty:
+            for items in self.site_items.values():
+                doomed.extend(item for item in items if item is not None)
+            self.site_items.clear()
+            dirty = list(self.agg_items)
+        else:
+            dirty = sites.dirty
+        for key in dirty:
+            items = self.agg_items.pop(key, None)
+            if items is not None:
+                doomed.extend(item for item in items if item is not None)
+        self.sites_dirty = False
+        sites.dirty.clear()
+        if doomed:
+            self.canvas.delete(*doomed)
+        rect = self.realized_rect
+        if rect is None or not sites.collapsed:
+            return
+        x0, y0, x1, y1 = rect
+        model = self.model
+        for site in sites.collapsed:
+            if site not in self.site_items:
+                cx, cy = sites.center(model, site)
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    self._draw_site(site)
+        for key in sites.agg:
+            if key not in self.agg_items and segment_hits_rect(*self._agg_segment(key), *rect):
+                self._draw_agg(key)
+
+    def _agg_segment(self, key):
+        """World segment of an aggregate link: its ends are site centers or nodes."""
+        model = self.model
+        a, b = (model.sites.center(model, end) if type(end) is str else model.position(end) for end in key)
+        return a[0], a[1], b[0], b[1]
+
+    def _draw_site(self, site):
+        cx, cy = self.world_to_canvas(*self.model.sites.center(self.model, site))
+        r = SITE_RADIUS * self.zoom
+        square = self.canvas.create_rectangle(cx - r, cy - r, cx + r, cy + r, fill=SITE_COLOR,
+                                              outline=LEGEND_OUTLINE, width=2, tags=("topo",))
+        label = None
+        if not self.realized_lod:
+            label = self.canvas.create_text(cx, cy + r + 10, fill="white", tags=("topo",),
+                                            text=f"{site} ({len(self.model.sites.members[site]):,})")
+        self.site_items[site] = (square, label)
+
+    def _draw_agg(self, key):
+        x1, y1, x2, y2 = self._agg_segment(key)
+        z = self.zoom
+        count = self.model.sites.agg[key]
+        line = self.canvas.create_line(x1 * z, y1 * z, x2 * z, y2 * z, fill=AGG_COLOR, tags=("topo",),
+                                       width=min(AGG_MAX_WIDTH, self._edge_width() + math.log2(count)))
+        self.canvas.tag_lower(line)
+        label = None
+        if count > 1 and not self.realized_lod:
+            label = self.canvas.create_text((x1 + x2) / 2 * z, (y1 + y2) / 2 * z, text=f"{count:,}",
+                                            fill=AGG_COLOR, tags=("topo",))
+        self.agg_items[key] = (line, label)
+
+    def _place_agg(self, key):
+        """Move an aggregate link's items to where its ends are now."""
+        line, label = self.agg_items[key]
+        x1, y1, x2, y2 = self._agg_segment(key)
+        z = self.zoom
+        self.canvas.coords(line, x1 * z, y1 * z, x2 * z, y2 * z)
+        if label is not None:
+            self.canvas.coords(label, (x1 + x2) / 2 * z, (y1 + y2) / 2 * z)
+
+    def _draw_node(self, node):
+        kind = self.model.kind(node)
+        x1, y1, x2, y2 = self._node_bbox(node)
+        tags = style_tags("node", self.model.attrs.get(node), kind)
+        fill = self._node_fill(kind, tags)
+        outline, width = ("#ffd54f", 3) if node in self.selected_nodes else self._rest_outline(node)
+        if self.realized_lod or kind != "router":
+            item = self.canvas.create_rectangle(
+                x1, y1, x2, y2,
+                fill=fill, outline=outline, width=width,
+                tags=("topo", *tags)
+            )
+        else:
+            item = self.canvas.create_oval(
+                x1, y1, x2, y2,
+                fill=fill, outline=outline, width=width,
+                tags=("topo", *tags)
+            )
+        self.node_items[node] = item
+        self.item_nodes[item] = node
+        if self.zoom >= LABEL_ZOOM:
+            self._draw_label(node)
+        return item
+
+    def _draw_label(self, node):
+        text = node_label(self.model, node)
+        if text is None:
+            return
+        x, y = self.get_center(node)
+        self.label_items[node] = self.canvas.create_text(x, y + (NODE_RADIUS + 2) * self.zoom, text=text, anchor="n",
+                                                         fill=LABEL_COLOR, font=LABEL_FONT, tags=("topo",))
+
+    def _refresh_label(self, node):
+        """Bring a realized node's label in line with its attributes."""
+        item = self.label_items.get(node)
+        text = node_label(self.model, node)
+        if item is None:
+            if self.zoom >= LABEL_ZOOM:
+                self._draw_label(node)
+        elif text is None:
+            self.canvas.delete(self.label_items.pop(node))
+        else:
+            self.canvas.itemconfigure(item, text=text)
+
+    def _unrealize_node(self, node, doomed):
+        item = self.node_items.pop(node, None)
+        if item is not None:
+            self.item_nodes.pop(item, None)
+            doomed.append(item)
+            label = self.label_items.pop(node, None)
+            if label is not None:
+                doomed.append(label)
+
+    def _draw_link(self, link):
+        n1, n2 = self.model.links[link]
         x1, y1 = self.get_center(n1)
         x2, y2 = self.get_center(n2)
+        fill, width = self._link_style(link)
         line = self.canvas.create_line(
             x1, y1, x2, y2,
-            fill=EDGE_COLOR, width=EDGE_WIDTH,
-            tags=("topo",)
+            fill=fill, width=width,
+            tags=("topo", *style_tags("link", self.model.link_attrs.get(link)))
         )
-        self.edges.append((line, n1, n2))
-        self.edge_map[line] = (n1, n2)
+        self.link_items[link] = line
+        self.item_links[line] = link
         self.canvas.tag_lower(line)
+        return line
+
+    def _rest_outline(self, node):
+        """Outline of an unselected node: its analytics mark, else its live state, else a thin ring if pinned."""
+        color = self.marked_nodes.get(node) or self.live_nodes.get(node)
+        if color is not None:
+            return color, MARK_WIDTH
+        if self.model.attrs.get(node, {}).get("pinned"):
+            return PIN_COLOR, PIN_WIDTH
+        return "", 0
+
+    def _link_style(self, link):
+        """(fill, width) of a link's own item."""
+        if link == self.selected_edge:
+            return EDGE_HIGHLIGHT_COLOR, EDGE_HIGHLIGHT_WIDTH
+        color = self.marked_links.get(link) or self.live_links.get(link)
+        if color is not None:
+            return color, MARK_WIDTH
+        fill, width = EDGE_COLOR, self._edge_width()
+        if self.styles:
+            tags = set(style_tags("link", self.model.link_attrs.get(link)))
+            for rule in self.styles:
+                if rule.target == "link" and rule.matches(tags):
+                    fill = rule.color or fill
+                    width = rule.width or width
+        return fill, width
+
+    def _node_fill(self, kind, tags):
+        """Fill of a node item: the last style rule matching its tags, else its kind's color."""
+        fill = NODE_COLORS[kind]
+        if self.styles:
+            tags = set(tags)
+            for rule in self.styles:
+                if rule.target == "node" and rule.color is not None and rule.matches(tags):
+                    fill = rule.color
+        return fill
+
+    def _edge_width(self):
+        return LOD_EDGE_WIDTH if self.realized_lod else EDGE_WIDTH
+
+    def _realize_node(self, node):
+        item = self.node_items.get(node)
+        return item if item is not None else self._draw_node(node)
+
+    def _realize_link(self, link):
+        """Give a link its own item (detaching it from a LOD stroke if needed)."""
+        item = self.link_items.get(link)
+        if item is not None:
+            return item
+        doomed = []
+        self._lod_remove(link, doomed)
+        if doomed:
+            self.canvas.delete(*doomed)
+        return self._draw_link(link)
+
+    def _unrealize_link(self, link, doomed):
+        item = self.link_items.pop(link, None)
+        if item is not None:
+            self.item_links.pop(item, None)
+            doomed.append(item)
+        self._lod_remove(link, doomed)
+
+    def _lod_add(self, link):
+        x1, y1, x2, y2 = self.model.segment(link)
+        q = LOD_MERGE_PX / self.zoom
+        a = (int(x1 // q), int(y1 // q))
+        b = (int(x2 // q), int(y2 // q))
+        if a == b:
+            self.lod_key[link] = None  # shorter than a merge cell: not drawn at this zoom
+            return
+        key = (a, b) if a <= b else (b, a)
+        self.lod_key[link] = key
+        members = self.lod_members.get(key)
+        if members is not None:
+            members.add(link)
+            return
+        self.lod_members[key] = {link}
+        (ax, ay), (bx, by) = key
+        stroke = self.canvas.create_line(
+            (ax + 0.5) * LOD_MERGE_PX, (ay + 0.5) * LOD_MERGE_PX,
+            (bx + 0.5) * LOD_MERGE_PX, (by + 0.5) * LOD_MERGE_PX,
+            fill=EDGE_COLOR, width=LOD_EDGE_WIDTH,
+            tags=("topo",)
+        )
+        self.lod_strokes[key] = stroke
+        self.canvas.tag_lower(stroke)
 
-    def update_edges(self):
-        for line, n1, n2 in self.edges:
-            if n1 not in self.nodes or n2 not in self.nodes:
+    def _lod_remove(self, link, doomed):
+        if link not in self.lod_key:
+            return
+        key = self.lod_key.pop(link)
+        if key is None:
+            return
+        members = self.lod_members[key]
+        members.discard(link)
+        if not members:
+            del self.lod_members[key]
+            doomed.append(self.lod_strokes.pop(key))
+
+    def update_edges(self, links=None):
+        """Re-project realized links from the model; all of them unless an iterable of link ids is given."""
+        model_links = self.model.links
+        items = self.link_items
+        if links is None:
+            links = list(items)
+        for link in links:
+            item = items.get(link)
+            ends = model_links.get(link)
+            if item is None or ends is None:
                 continue
-            x1, y1 = self.get_center(n1)
-            x2, y2 = self.get_center(n2)
-            self.canvas.coords(line, x1, y1, x2, y2)
+            x1, y1 = self.get_center(ends[0])
+            x2, y2 = self.get_center(ends[1])
+            self.canvas.coords(item, x1, y1, x2, y2)
+
+    def _reproject_all(self):
+        """Recompute every item's coords from world positions (exact; never accumulates error)."""
+        coords = self.canvas.coords
+        nodes = list(self.node_items)
+        xs, ys = self.model.positions(nodes)
+        z = self.zoom
+        r = NODE_RADIUS * z
+        for node, x, y in zip(nodes, xs, ys):
+            coords(self.node_items[node], x * z - r, y * z - r, x * z + r, y * z + r)
+        if z < LABEL_ZOOM:
+            if self.label_items:
+                self.canvas.delete(*self.label_items.values())
+                self.label_items.clear()
+        else:
+            labels = self.label_items
+            dy = r + 2 * z
+            for node, x, y in zip(nodes, xs, ys):
+                item = labels.get(node)
+                if item is not None:
+                    coords(item, x * z, y * z + dy)
+                else:
+                    self._draw_label(node)
+        width = self._edge_width()
+        for link, item in self.link_items.items():
+            if link != self.selected_edge and link not in self.marked_links and link not in self.live_links:
+                self.canvas.itemconfigure(item, width=width)
+        if any(rule.width is not None for rule in self.styles):
+            self.styles_dirty = True  # rule widths again, later in this frame
+        for shape, item in self.bundle_items.items():
+            points, count = self.bundle_shapes[shape]
+            coords(item, *(c * z for c in points))
+            self.canvas.itemconfigure(item, width=self._bundle_width(shape, count))
+        self.update_edges()
+
+    # ───────────────── Drag (coalesced per frame) ─────────────────
+
+    def _begin_drag(self, nodes):
+        self.drag_nodes = [n for n in nodes if n in self.model.nodes]
+        if self.layout_job is not None:
+            self.layout_moved.update(self.drag_nodes)
+        self.drag_links = self.model.incident_links(self.drag_nodes)
+        for n in self.drag_nodes:
+            self.canvas.addtag_withtag(DRAG_TAG, self._realize_node(n))
+            if n in self.label_items:
+                self.canvas.addtag_withtag(DRAG_TAG, self.label_items[n])
+        hidden = self.model.sites.hidden
+        for ln in self.drag_links:
+            if not hidden or hidden.isdisjoint(self.model.links[ln]):
+                self._realize_link(ln)
+        if self.agg_items:
+            dragged = set(self.drag_nodes)
+            self.drag_aggs = [key for key in self.agg_items if key[1] in dragged]
+        self.drag_dx = self.drag_dy = 0
+        self.drag_wx = self.drag_wy = 0.0
+
+    def _queue_drag(self, dx, dy):
+        self.drag_dx += dx
+        self.drag_dy += dy
+        self.frame.request()
+
+    def _flush_drag(self):
+        """Apply the motion accumulated this frame: one model pass, one canvas.move, incident links only."""
+        dx, dy = self.drag_dx, self.drag_dy
+        self.drag_dx = self.drag_dy = 0
+        if self.drag_nodes is None or (dx == 0 and dy == 0):
+            return
+
+        nodes = self.model.nodes
+        self.drag_nodes = [n for n in self.drag_nodes if n in nodes]
+        self.model.translate(self.drag_nodes, dx / self.zoom, dy / self.zoom, self.drag_links)
+        self.drag_wx += dx / self.zoom
+        self.drag_wy += dy / self.zoom
+        self.canvas.move(DRAG_TAG, dx, dy)
+        self.update_edges(self.drag_links)
+        for key in self.drag_aggs:
+            if key in self.agg_items:
+                self._place_agg(key)
+
+    def _end_drag(self):
+        if self.drag_nodes is None:
+            return
+        self._flush_drag()
+        if self.drag_nodes and (self.drag_wx or self.drag_wy):
+            # The whole drag is one delta, however many frames it took
+            self.history.record(("move", array("q", self.drag_nodes), self.drag_wx, self.drag_wy))
+        self.canvas.dtag(DRAG_TAG, DRAG_TAG)
+        self.drag_nodes = None
+        self.drag_links = None
+        self.drag_aggs = ()
+        self._recull(force=True)
 
     def edge_exists(self, a, b):
-        for _, n1, n2 in self.edges:
-            if (n1 == a and n2 == b) or (n1 == b and n2 == a):
-                return True
-        return False
+        return self.model.link_exists(a, b)
 
     # ───────────────── Selection box logic ─────────────────
 
     def update_group_selection(self, x1, y1, x2, y2):
-        new_sel = set()
-        minx, maxx = min(x1, x2), max(x1, x2)
-        miny, maxy = min(y1, y2), max(y1, y2)
+        wx1, wy1 = self.screen_to_world(x1, y1)
+        wx2, wy2 = self.screen_to_world(x2, y2)
+        rect = (min(wx1, wx2), min(wy1, wy2), max(wx1, wx2), max(wy1, wy2))
 
-        for node in self.nodes:
-            cx, cy = self.get_center(node)
-            if minx <= cx <= maxx and miny <= cy <= maxy:
-                new_sel.add(node)
+        model = self.model
+        if self.selection_rect is None:
+            candidates = model.grid.query(*rect)
+        else:
+            # Only nodes in cells that entered/left the box (or sit on its edges) can change
+            candidates = model.grid.query_changed(self.selection_rect, rect)
+        self.selection_rect = rect
+
+        candidates = list(candidates)
+        inside_set = model.filter_in_rect(candidates, *rect) - model.sites.hidden
+        selected = self.selected_nodes
+        for node in candidates:
+            inside = node in inside_set
+            if inside and node not in selected:
+                selected.add(node)
+                self.set_node_highlight(node, True)
+            elif not inside and node in selected:
+                selected.discard(node)
+                self.set_node_highlight(node, False)
 
-        for node in list(self.selected_nodes - new_sel):
-            self.set_node_highlight(node, False)
-        for node in list(new_sel - self.selected_nodes):
-            self.set_node_highlight(node, True)
+    # ───────────────── View transform ─────────────────
 
-        self.selected_nodes = new_sel
+    def _scroll(self):
+        """Integer canvas-space scroll for the current view (Tk scrolls whole pixels)."""
+        return round(self.view_wx * self.zoom), round(self.view_wy * self.zoom)
 
-    # ───────────────── Hit testing helpers ─────────────────
+    def _sync_scroll(self):
+        sx, sy = self._scroll()
+        dx, dy = sx - self.canvas_scroll[0], sy - self.canvas_scroll[1]
+        if dx or dy:
+            self.canvas.xview_scroll(dx, "units")
+            self.canvas.yview_scroll(dy, "units")
+            self.canvas.move("overlay", dx, dy)
+            self.canvas_scroll = (sx, sy)
 
-    def get_center(self, node):
-        x1, y1, x2, y2 = self.canvas.coords(node)
-        return (x1 + x2) / 2, (y1 + y2) / 2
+    def world_to_canvas(self, x, y):
+        return x * self.zoom, y * self.zoom
 
-    def get_node_at(self, x, y):
-        for item in self.canvas.find_overlapping(x, y, x, y):
-            if item in self.nodes:
-                return item
-        return None
+    def world_to_screen(self, x, y):
+        sx, sy = self._scroll()
+        return x * self.zoom - sx, y * self.zoom - sy
 
-    def _dist_point_to_segment(self, px, py, x1, y1, x2, y2):
-        vx, vy = x2 - x1, y2 - y1
-        wx, wy = px - x1, py - y1
+    def screen_to_world(self, x, y):
+        sx, sy = self._scroll()
+        return (x + sx) / self.zoom, (y + sy) / self.zoom
 
-        c1 = vx * wx + vy * wy
-        if c1 <= 0:
-            return ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
+    def screen_to_canvas(self, x, y):
+        sx, sy = self._scroll()
+        return x + sx, y + sy
 
-        c2 = vx * vx + vy * vy
-        if c2 <= c1:
-            return ((px - x2) ** 2 + (py - y2) ** 2) ** 0.5
+    def _node_bbox(self, node):
+        cx, cy = self.get_center(node)
+        r = NODE_RADIUS * self.zoom
+        return cx - r, cy - r, cx + r, cy + r
 
-        b = c1 / c2
-        bx, by = x1 + b * vx, y1 + b * vy
-        return ((px - bx) ** 2 + (py - by) ** 2) ** 0.5
+    # ───────────────── Hit testing helpers ─────────────────
 
-    def get_edge_at(self, x, y):
-        items = self.canvas.find_overlapping(
-            x - EDGE_HIT_TOL, y - EDGE_HIT_TOL,
-            x + EDGE_HIT_TOL, y + EDGE_HIT_TOL
-        )
-        candidates = [it for it in items if it in self.edge_map]
-        if not candidates:
-            return None
-        if len(candidates) == 1:
-            return candidates[0]
+    def get_center(self, node):
+        """Node center in canvas space."""
+        return self.world_to_canvas(*self.model.position(node))
 
-        best = None
-        best_d = float("inf")
-        for line in candidates:
-            x1, y1, x2, y2 = self.canvas.coords(line)
-            d = self._dist_point_to_segment(x, y, x1, y1, x2, y2)
-            if d < best_d:
-                best_d = d
-                best = line
+    def get_node_at(self, x, y):
+        return self.model.node_at(*self.screen_to_world(x, y), NODE_RADIUS, skip=self.model.sites.hidden)
 
-        return best if best_d <= EDGE_HIT_TOL else None
+    def get_edge_at(self, x, y):
+        wx, wy = self.screen_to_world(x, y)
+        return self.model.link_at(wx, wy, EDGE_HIT_TOL / self.zoom, skip=self.model.sites.hidden)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fast Network Topology Drawer")
+    parser.add_argument("file", nargs="?", help="topology to open (.topo snapshot or .json export)")
+    parser.add_argument("--import", dest="imports", action="append", default=[], metavar="FILE",
+                        help="stream a neighbor dump, CSV edge list, GraphML or DOT file into the topology")
+    parser.add_argument("--generate", action="append", default=[], metavar="FABRIC",
+                        help="add a standard fabric: " + ", ".join(f"{name}:{usage}" for name, (_, usage)
+                                                                   in GENERATORS.items()))
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), help="lay the topology out before showing it")
+    parser.add_argument("--export", metavar="FILE",
+                        help="write the topology to an .svg, .svgz, .png or .pdf drawing and exit (no window)")
+    parser.add_argument("--no-autosave", action="store_true",
+                        help=f"don't journal edits to {JOURNAL_DIR} (nor restore the last session from it)")
+    parser.add_argument("--style", action="append", default=[], metavar="RULE",
+                        help='style nodes or links by attribute, e.g. "link speed=100G: color=#ff5252 width=4"')
+    parser.add_argument("--diff", metavar="BEFORE",
+                        help="print what changed since BEFORE as JSON and exit (status 1 if anything did)")
+    parser.add_argument("--bundle", action="store_true", help="draw links as bundled trunks (B toggles it)")
+    parser.add_argument("--live", metavar="SOURCE",
+                        help="color links and nodes by state events from SOURCE: a file (followed), unix:PATH or -")
+    parser.add_argument("--record", metavar="FILE", help="record the session's input to FILE (F9 toggles recording)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay recorded input, print the latency report as JSON and exit (implies --no-autosave)")
+    parser.add_argument("--replay-speed", type=float, default=0.0, metavar="FACTOR",
+                        help="replay at FACTOR times the recorded pace (default 0: as fast as possible)")
+    args = parser.parse_args()
+    if args.replay:
+        try:
+            read_recording(args.replay)
+        except (OSError, ValueError) as e:
+            parser.error(f"--replay {args.replay}: {e}")
+    for spec in args.generate:
+        try:
+            parse_fabric(spec)
+        except ValueError as e:
+            parser.error(f"--generate {spec}: {e}")
+    for spec in args.style:
+        try:
+            parse_style(spec)
+        except ValueError as e:
+            parser.error(f"--style {spec}: {e}")
+
+    if args.export or args.diff:
+        if not args.file and not args.imports and not args.generate:
+            parser.error(f"{'--export' if args.export else '--diff'} needs a topology file, --import or --generate")
+        try:
+            model = load_topology_file(args.file) if args.file else TopologyModel()
+        except (OSError, ValueError, KeyError, ET.ParseError, csv.Error) as e:
+            parser.error(f"{args.file}: {e}")
+        for path in args.imports:
+            try:
+                import_topology_file(path, model)
+            except (OSError, ValueError, KeyError, ET.ParseError, csv.Error) as e:
+                parser.error(f"--import {path}: {e}")
+        for spec in args.generate:
+            generate_fabric(model, spec)
+        if args.layout:
+            apply_layout(model, args.layout)
+        if args.export:
+            try:
+                export_drawing(model, args.export)
+            except (OSError, ValueError, KeyError, ET.ParseError, csv.Error) as e:
+                parser.error(f"--export {args.export}: {e}")
+        if args.diff:
+            try:
+                diff = diff_topologies(load_topology_file(args.diff), model)
+            except (OSError, ValueError, KeyError) as e:
+                parser.error(f"--diff {args.diff}: {e}")
+            json.dump(diff, sys.stdout, indent=1)
+            print()
+            print(diff_summary(diff), file=sys.stderr)
+            sys.exit(0 if diff_is_empty(diff) else 1)
+        sys.exit(0)
+
     root = tk.Tk()
-    app = TopologyTool(root)
+    app = TopologyTool(root, autosave=None if args.no_autosave or args.replay else JOURNAL_DIR,
+                       profile=os.environ.get(PROFILE_ENV))
+    if args.file:
+        app.open_topology(args.file)
+    for spec in args.style:
+        app.add_style(spec)
+    if args.bundle:
+        app.start_bundling()
+    if args.live:
+        app.start_live(args.live)
+    # Imports, fabrics and the layout go through the app, one after the other, so that
+    # each streams into the window and is an undo step (and a journal record) of its own
+    startup = [(app.import_topology, path) for path in args.imports]
+    startup += [(app.generate, spec) for spec in args.generate]
+    if args.layout:
+        startup.append((app.start_layout, args.layout))
+
+    def _started():
+        if (args.imports or args.generate) and not args.layout:
+            app.zoom_to_fit()  # a layout fits the view itself
+        if args.record:
+            app.start_recording(args.record)
+        if args.replay:
+            def _replayed(report):
+                print(json.dumps(report, indent=1))
+                app.on_close()
+            root.wait_visibility(app.canvas)  # replay against the window at its real size
+            app.replay(args.replay, args.replay_speed, _replayed)
+
+    def _startup():
+        if app.import_steps is not None or app.layout_job is not None:
+            root.after(LAYOUT_POLL_MS, _startup)
+            return
+        if not startup:
+            _started()
+            return
+        step, arg = startup.pop(0)
+        step(arg)
+        root.after_idle(_startup)
+    root.after_idle(_startup)
     root.mainloop()